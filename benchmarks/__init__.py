@@ -0,0 +1,44 @@
+"""Benchmarks for the facility management app.
+
+Each module is runnable with ``python -m benchmarks.<name>`` from the project
+root. Benchmarks run against a throwaway test database, never db.sqlite3.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'facility_mgmt.settings')
+    # a throwaway file cache: .cache/ (or Redis) is the dev server's, and bodies
+    # cached from the benchmark database must not reach it (nor its cache.clear())
+    cache_dir = tempfile.mkdtemp(prefix='benchmark-cache-')
+    atexit.register(shutil.rmtree, cache_dir, ignore_errors=True)
+    os.environ['CACHE_DIR'] = cache_dir
+    os.environ.pop('REDIS_URL', None)
+    import django
+    django.setup()
+
+
+@contextmanager
+def test_database(verbosity=0, name=None):
+    """Create and migrate a test database for the duration of the block.
+
+    ``name`` overrides the test database name, e.g. a file path so SQLite runs on
+    disk rather than in memory.
+    """
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    if name:
+        connection.settings_dict['TEST']['NAME'] = name
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        teardown_test_environment()
@@ -0,0 +1,177 @@
+"""Compare the JSON APIs served through WSGI and ASGI at high concurrency.
+
+Seeds one campus (benchmarks.datasets) in an on-disk SQLite database, then
+drives api_floors, api_rooms, api_equipments and api_status_counts with
+``--clients`` concurrent clients, three times against the same data:
+
+- wsgi: Django's WSGIHandler on a pool of ``--threads`` worker threads, like a
+  threaded WSGI server (gunicorn gthread, mod_wsgi), on the sync views.
+- asgi: facility_mgmt.asgi.application awaited directly on one event loop,
+  like a single uvicorn worker, on the same sync views.
+- asgi-async: the same application on the async twins (``/api/async/...``).
+
+Both run in-process, with no network or HTTP parsing, so the numbers compare the
+two handler stacks and the sync vs async views behind them. Each client picks
+random parent ids, so part of the requests miss the versioned body cache and
+hit the database. Latency includes the time spent waiting for a worker.
+
+    python -m benchmarks.asgi --size M --clients 200 --requests 5000 --threads 8
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlencode
+
+from benchmarks import setup_django, test_database
+
+
+def request_mix(rng, total, ids, suffix=''):
+    """``total`` ``(path, query string)`` pairs spread over the four APIs (``suffix='_async'``: their async twins)."""
+    from django.urls import reverse
+
+    apis = [
+        (reverse(f'api_floors{suffix}'), 'building', ids['building']),
+        (reverse(f'api_rooms{suffix}'), 'floor', ids['floor']),
+        (reverse(f'api_equipments{suffix}'), 'room', ids['room']),
+        (reverse(f'api_status_counts{suffix}'), 'building', ids['building']),
+    ]
+    mix = []
+    for _ in range(total):
+        path, param, choices = rng.choice(apis)
+        mix.append((path, urlencode({param: rng.choice(choices)})))
+    return mix
+
+
+def wsgi_environ(path, query):
+    return {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+        'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': BytesIO(),
+        'wsgi.errors': BytesIO(), 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+
+
+def wsgi_call(app, path, query):
+    status = []
+    body = app(wsgi_environ(path, query), lambda s, headers, exc_info=None: status.append(s))
+    try:
+        b''.join(body)
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    return int(status[0].split()[0])
+
+
+async def asgi_call(app, path, query):
+    sent = []
+    request = {'type': 'http.request', 'body': b'', 'more_body': False}
+    disconnect = asyncio.Event()
+
+    async def receive():
+        nonlocal request
+        if request:
+            message, request = request, None
+            return message
+        # Django listens for a client disconnect while the view runs
+        await disconnect.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'root_path': '',
+        'query_string': query.encode(), 'headers': [(b'host', b'testserver')],
+        'server': ('testserver', 80), 'client': ('127.0.0.1', 0),
+    }
+    await app(scope, receive, send)
+    disconnect.set()
+    return next(m['status'] for m in sent if m['type'] == 'http.response.start')
+
+
+async def drive(call, mix, clients):
+    """Run ``mix`` through ``call`` from ``clients`` concurrent clients; returns latencies and elapsed time."""
+    queue = iter(mix)
+    latencies = []
+    errors = 0
+
+    async def client():
+        nonlocal errors
+        for path, query in queue:
+            start = time.perf_counter()
+            status = await call(path, query)
+            latencies.append(time.perf_counter() - start)
+            errors += status != 200
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return latencies, time.perf_counter() - started, errors
+
+
+def report(name, latencies, elapsed, errors):
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    print(f'{name:>10} {len(latencies) / elapsed:>10.0f} {cuts[49] * 1000:>9.1f} {cuts[94] * 1000:>9.1f} '
+          f'{cuts[98] * 1000:>9.1f} {max(latencies) * 1000:>9.1f} {errors:>7}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', default='S', choices=['S', 'M', 'L', 'XL'])
+    parser.add_argument('--clients', type=int, default=200, help='concurrent clients')
+    parser.add_argument('--requests', type=int, default=5000, help='requests per run')
+    parser.add_argument('--threads', type=int, default=8, help='WSGI worker threads')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from django.core.cache import cache
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connection
+    from core.models import Building, Floor, Room
+    from benchmarks.datasets import seed
+    from facility_mgmt.asgi import application
+
+    if connection.vendor != 'sqlite':
+        parser.error('this benchmark compares the SQLite setup (unset DB_ENGINE)')
+
+    with test_database(name=os.path.join(tempfile.mkdtemp(), 'asgi.sqlite3')):
+        seed(args.size, args.seed)
+        ids = {
+            'building': list(Building.objects.values_list('pk', flat=True)),
+            'floor': list(Floor.objects.values_list('pk', flat=True)),
+            'room': list(Room.objects.values_list('pk', flat=True)),
+        }
+        connection.close()
+        mix = request_mix(random.Random(args.seed), args.requests, ids)
+        async_mix = request_mix(random.Random(args.seed), args.requests, ids, suffix='_async')
+        wsgi = WSGIHandler()
+        pool = ThreadPoolExecutor(args.threads)
+
+        async def wsgi_async(path, query):
+            return await asyncio.get_running_loop().run_in_executor(pool, wsgi_call, wsgi, path, query)
+
+        async def asgi_async(path, query):
+            return await asgi_call(application, path, query)
+
+        print(f'{args.requests} requests from {args.clients} clients, size {args.size}, '
+              f'{args.threads} WSGI threads')
+        print(f'{"":>10} {"req/s":>10} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"max ms":>9} {"errors":>7}')
+        for name, call, requests in (('wsgi', wsgi_async, mix), ('asgi', asgi_async, mix),
+                                     ('asgi-async', asgi_async, async_mix)):
+            # same starting point for each: empty body cache, then a short warm-up
+            cache.clear()
+            asyncio.run(drive(call, requests[:args.clients], args.clients))
+            report(name, *asyncio.run(drive(call, requests, args.clients)))
+        pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Benchmark the free-room finder (``core.bookings.available_rooms``).
+
+Seeds one building per room count and grows the booking history step by step,
+timing the anti-join at every step. With ``booking_room_status_time_idx`` the
+latency follows the number of rooms and stays flat as bookings grow.
+
+    python -m benchmarks.available_rooms --rooms 100 400 --bookings 10000 100000 300000
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from benchmarks import setup_django, test_database
+
+
+def seed_rooms(building_code, count):
+    from core.models import Building, Floor, Room
+
+    building = Building.objects.create(code=building_code, name=f'Bench {building_code}')
+    floors = Floor.objects.bulk_create(
+        Floor(building=building, number=str(n)) for n in range(1, count // 20 + 2)
+    )
+    Room.objects.bulk_create(
+        Room(floor=floors[i % len(floors)], code=f'{building_code}-{i:04d}') for i in range(count)
+    )
+    return building, list(Room.objects.filter(floor__building=building).values_list('pk', flat=True))
+
+
+def seed_bookings(room_ids, user, count, now, rng):
+    """Historical bookings, mostly finished, plus a few active ones in the future."""
+    from core.models import RoomBooking
+
+    statuses = (
+        [RoomBooking.STATUS_COMPLETED] * 6 + [RoomBooking.STATUS_REJECTED] * 2
+        + [RoomBooking.STATUS_APPROVED, RoomBooking.STATUS_PENDING]
+    )
+    batch = []
+    for _ in range(count):
+        status = rng.choice(statuses)
+        if status in (RoomBooking.STATUS_APPROVED, RoomBooking.STATUS_PENDING):
+            start = now + timedelta(hours=rng.randrange(1, 24 * 60))
+        else:
+            start = now - timedelta(hours=rng.randrange(1, 24 * 730))
+        batch.append(RoomBooking(
+            room_id=rng.choice(room_ids), user=user, purpose='bench', status=status,
+            start_time=start, end_time=start + timedelta(hours=rng.choice((1, 2, 3))),
+        ))
+        if len(batch) >= 5000:
+            RoomBooking.objects.bulk_create(batch)
+            batch = []
+    RoomBooking.objects.bulk_create(batch)
+
+
+def time_query(building, start, end, repeat):
+    from core.bookings import available_rooms
+
+    samples = []
+    found = 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        found = len(list(available_rooms(start, end).filter(floor__building=building).values('id', 'code')))
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples), found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rooms', type=int, nargs='+', default=[100, 400])
+    parser.add_argument('--bookings', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+
+    rng = random.Random(args.seed)
+    with test_database():
+        user = User.objects.create_user('bench')
+        now = timezone.now()
+        start = now + timedelta(days=7)
+        end = start + timedelta(hours=2)
+
+        print(f'{"rooms":>6} {"bookings":>9} {"free":>6} {"median ms":>10}')
+        for i, room_count in enumerate(args.rooms):
+            building, room_ids = seed_rooms(f'B{i}', room_count)
+            seeded = 0
+            for target in sorted(args.bookings):
+                seed_bookings(room_ids, user, target - seeded, now, rng)
+                seeded = target
+                ms, found = time_query(building, start, end, args.repeat)
+                print(f'{room_count:>6} {seeded:>9} {found:>6} {ms:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
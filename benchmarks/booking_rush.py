@@ -0,0 +1,133 @@
+"""Fire concurrent, overlapping booking requests and count double bookings.
+
+Many threads each send booking requests for random one-hour windows on a
+15-minute grid across a few rooms, so most requests collide. Every request goes
+through core.bookings.admit_booking. At the end the database is searched for
+pairs of active bookings of the same room that overlap, and the run reports
+admitted bookings per second. Exits with status 1 if any double booking is
+found.
+
+``--naive`` runs the old check-then-save view logic instead, with the database
+guard dropped, to show the race the admission path closes.
+
+    python -m benchmarks.booking_rush --threads 16 --requests 4000 --rooms 10
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from importlib import import_module
+
+from benchmarks import setup_django, test_database
+
+
+def seed(rooms):
+    from django.contrib.auth.models import User
+    from core.models import Building, Floor, Room
+
+    floor = Floor.objects.create(building=Building.objects.create(code='R', name='Rush'), number='1')
+    Room.objects.bulk_create(Room(floor=floor, code=f'R{i:03d}') for i in range(rooms))
+    return User.objects.create_user('rush'), list(Room.objects.values_list('pk', flat=True))
+
+
+def naive_admit(booking):
+    # room_booking_create before admission was made atomic
+    from core.bookings import BookingConflict, overlapping_bookings
+
+    if overlapping_bookings(booking.start_time, booking.end_time).filter(room_id=booking.room_id).exists():
+        raise BookingConflict
+    booking.save()
+
+
+def drop_guard(connection):
+    guard = import_module('core.migrations.0011_booking_no_overlap')
+    with connection.cursor() as cursor:
+        for sql in {'sqlite': guard.SQLITE_DROP, 'postgresql': guard.POSTGRESQL_DROP}[connection.vendor]:
+            cursor.execute(sql)
+
+
+def client(admit, user, requests, stats):
+    from django.db import OperationalError, connection
+    from core.bookings import BookingConflict
+    from core.models import RoomBooking
+
+    admitted = refused = failed = 0
+    try:
+        for room_id, start in requests:
+            booking = RoomBooking(room_id=room_id, user=user, purpose='rush',
+                                  start_time=start, end_time=start + timedelta(hours=1))
+            try:
+                admit(booking)
+                admitted += 1
+            except BookingConflict:
+                refused += 1
+            except OperationalError:
+                failed += 1
+    finally:
+        connection.close()
+    stats.append((admitted, refused, failed))
+
+
+def double_bookings():
+    """Active bookings that overlap another active booking of the same room."""
+    from django.db.models import Exists, OuterRef
+    from core.bookings import ACTIVE_STATUSES, overlapping_bookings
+    from core.models import RoomBooking
+
+    clash = overlapping_bookings(OuterRef('start_time'), OuterRef('end_time')).filter(
+        room_id=OuterRef('room_id')).exclude(pk=OuterRef('pk'))
+    return RoomBooking.objects.filter(status__in=ACTIVE_STATUSES).filter(Exists(clash)).count()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=4000, help='total booking requests')
+    parser.add_argument('--rooms', type=int, default=10)
+    parser.add_argument('--hours', type=int, default=48, help='width of the window the requests fall in')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--naive', action='store_true', help='old check-then-save, no database guard')
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from django.db import connection
+    from django.utils import timezone
+    from core.bookings import admit_booking
+
+    path = os.path.join(tempfile.mkdtemp(), 'rush.sqlite3') if connection.vendor == 'sqlite' else None
+    with test_database(name=path):
+        user, room_ids = seed(args.rooms)
+        if args.naive:
+            drop_guard(connection)
+        connection.close()
+
+        rng = random.Random(args.seed)
+        base = timezone.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+        requests = [(rng.choice(room_ids), base + timedelta(minutes=15 * rng.randrange(args.hours * 4)))
+                    for _ in range(args.requests)]
+        stats = []
+        threads = [threading.Thread(target=client, args=(naive_admit if args.naive else admit_booking,
+                                                         user, requests[i::args.threads], stats))
+                   for i in range(args.threads)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+        doubled = double_bookings()
+
+    admitted, refused, failed = (sum(s[i] for s in stats) for i in range(3))
+    print(f'{args.requests} requests from {args.threads} threads on {args.rooms} rooms in {elapsed:.2f}s '
+          f'({args.requests / elapsed:.0f} requests/s)')
+    print(f'admitted {admitted} ({admitted / elapsed:.0f}/s), refused {refused}, failed {failed}')
+    print(f'double bookings: {doubled}')
+    return 1 if doubled else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,37 @@
+"""Parameterized campus datasets for the benchmarks.
+
+``DATASETS`` maps a size name to the arguments of :func:`core.seeding.seed_campus`:
+buildings, floors per building, rooms per floor, devices per room, plus booking
+and maintenance history. Seeding is deterministic for a given ``seed``.
+"""
+
+DATASETS = {
+    'S': dict(buildings=2, floors=3, rooms=8, devices=5, bookings=1_000, requests=1_000),
+    'M': dict(buildings=5, floors=5, rooms=15, devices=10, bookings=20_000, requests=10_000),
+    'L': dict(buildings=20, floors=6, rooms=20, devices=15, bookings=100_000, requests=50_000),
+    'XL': dict(buildings=60, floors=8, rooms=25, devices=20, bookings=400_000, requests=200_000),
+}
+
+
+def seed(size, seed=1):
+    """Create the campus for ``size`` and return the users and a sample of each level."""
+    from django.contrib.auth.models import User
+    from core.models import Building, Floor, Room, Equipment, MaintenanceRequest, RoomBooking
+    from core.seeding import seed_campus
+
+    seed_campus(seed=seed, **DATASETS[size])
+    admin = User.objects.create_superuser('bench-admin', password='bench')
+    user = User.objects.create_user('bench-user', password='bench')
+    building = Building.objects.order_by('pk').first()
+    floor = Floor.objects.filter(building=building).order_by('pk').first()
+    room = Room.objects.filter(floor=floor).order_by('pk').first()
+    return {
+        'admin': admin,
+        'user': user,
+        'building': building,
+        'floor': floor,
+        'room': room,
+        'equipment': Equipment.objects.filter(room=room).order_by('pk').first(),
+        'request': MaintenanceRequest.objects.order_by('pk').first(),
+        'booking': RoomBooking.objects.order_by('pk').first(),
+    }
@@ -0,0 +1,71 @@
+"""Time global search queries on the FTS5 index against the LIKE fallback.
+
+Seeds one campus (benchmarks.datasets; ``--devices`` and ``--requests`` scale the
+indexed rows up to a million and more) in an on-disk SQLite database, then runs
+each query ``--repeat`` times through core.search's FTS5 path and through the
+``icontains`` fallback used on other backends.
+
+    python -m benchmarks.search --size XL --devices 40 --requests 500000 --repeat 20
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks import setup_django, test_database
+
+QUERIES = ('máy chiếu', 'may chieu phong 101', 'dieu hoa tang 3', 'TB001', 'sự cố', 'micro hội trường')
+
+
+def timed(run, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        hits = run()
+        times.append(time.perf_counter() - start)
+    return hits, times
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', default='M', choices=['S', 'M', 'L', 'XL'])
+    parser.add_argument('--devices', type=int, help='devices per room (overrides the dataset)')
+    parser.add_argument('--requests', type=int, help='maintenance requests (overrides the dataset)')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from django.db import connection
+    from benchmarks.datasets import DATASETS
+    from core import search
+    from core.seeding import seed_campus
+
+    if connection.vendor != 'sqlite':
+        parser.error('this benchmark measures the SQLite FTS5 index (unset DB_ENGINE)')
+
+    dataset = dict(DATASETS[args.size], bookings=0)
+    for name in ('devices', 'requests'):
+        if getattr(args, name) is not None:
+            dataset[name] = getattr(args, name)
+
+    with test_database(name=os.path.join(tempfile.mkdtemp(), 'search.sqlite3')):
+        started = time.perf_counter()
+        seed_campus(seed=args.seed, **dataset)
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {search.TABLE}')
+            rows = cursor.fetchone()[0]
+        print(f'{rows} indexed rows, seeded in {time.perf_counter() - started:.0f}s')
+        print(f'{"query":<24} {"fts p50":>9} {"fts p95":>9} {"like p50":>9} {"like p95":>9} {"hits":>5}')
+        for q in QUERIES:
+            hits, fts = timed(lambda: search._fts_search(q, None, search.SEARCH_LIMIT), args.repeat)
+            _, like = timed(lambda: search._fallback_search(q, None, search.SEARCH_LIMIT), max(1, args.repeat // 5))
+            cuts = [statistics.quantiles(t, n=20, method='inclusive') if len(t) > 1 else [t[0]] * 19
+                    for t in (fts, like)]
+            print(f'{q:<24} {cuts[0][9] * 1000:>8.1f}ms {cuts[0][18] * 1000:>7.1f}ms '
+                  f'{cuts[1][9] * 1000:>7.1f}ms {cuts[1][18] * 1000:>7.1f}ms {len(hits):>5}')
+
+
+if __name__ == '__main__':
+    main()
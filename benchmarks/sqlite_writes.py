@@ -0,0 +1,141 @@
+"""Stress concurrent writers against the SQLite profile (core.db, settings.SQLITE_PRAGMAS).
+
+Runs the same workload twice on a fresh on-disk database: first with SQLite's
+defaults (rollback journal, synchronous=FULL, deferred transactions), then with
+the profile (WAL, synchronous=NORMAL, busy_timeout, IMMEDIATE transactions).
+Every thread loops over a read-then-write transaction shaped like a booking
+request (count overlapping bookings of a room, then insert one) while reader
+threads keep listing bookings, and the run reports committed writes per second
+and "database is locked" failures.
+
+    python -m benchmarks.sqlite_writes --writers 8 --readers 4 --seconds 5
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from benchmarks import setup_django, test_database
+
+
+def seed(rooms):
+    from django.contrib.auth.models import User
+    from core.models import Building, Floor, Room
+
+    floor = Floor.objects.create(building=Building.objects.create(code='S', name='Stress'), number='1')
+    Room.objects.bulk_create(Room(floor=floor, code=f'S{i:03d}') for i in range(rooms))
+    return User.objects.create_user('stress'), list(Room.objects.values_list('pk', flat=True))
+
+
+def writer(user, room_ids, deadline, stats, seed_value):
+    from django.db import IntegrityError, OperationalError, connection, transaction
+    from django.utils import timezone
+    from core.models import RoomBooking
+
+    rng = random.Random(seed_value)
+    now = timezone.now()
+    ok = locked = 0
+    try:
+        while time.monotonic() < deadline:
+            room_id = rng.choice(room_ids)
+            start = now + timedelta(minutes=rng.randrange(60 * 24 * 365))
+            end = start + timedelta(hours=1)
+            try:
+                with transaction.atomic():
+                    RoomBooking.objects.filter(
+                        room_id=room_id, start_time__lt=end, end_time__gt=start,
+                    ).count()
+                    RoomBooking.objects.create(room_id=room_id, user=user, purpose='stress',
+                                               start_time=start, end_time=end)
+                ok += 1
+            except IntegrityError:
+                # slot already taken: refused by the booking_no_overlap guard, not a lock failure
+                pass
+            except OperationalError:
+                locked += 1
+    finally:
+        connection.close()
+    stats.append(('write', ok, locked))
+
+
+def reader(deadline, stats):
+    from django.db import OperationalError, connection
+    from core.models import RoomBooking
+
+    ok = locked = 0
+    try:
+        while time.monotonic() < deadline:
+            try:
+                list(RoomBooking.objects.order_by('-created_at', '-id').values_list('pk', flat=True)[:25])
+                ok += 1
+            except OperationalError:
+                locked += 1
+    finally:
+        connection.close()
+    stats.append(('read', ok, locked))
+
+
+def run(profile, args):
+    from django.conf import settings
+    from django.db import connection
+    from django.db.backends.signals import connection_created
+    from core.db import configure_connection
+
+    options = connection.settings_dict['OPTIONS']
+    saved_mode = options.pop('transaction_mode', None)
+    if profile:
+        if saved_mode:
+            options['transaction_mode'] = saved_mode
+    else:
+        connection_created.disconnect(configure_connection, dispatch_uid='core.configure_connection')
+    path = os.path.join(tempfile.mkdtemp(), 'stress.sqlite3')
+    try:
+        with test_database(name=path):
+            user, room_ids = seed(args.rooms)
+            connection.close()
+            deadline = time.monotonic() + args.seconds
+            stats = []
+            threads = [threading.Thread(target=writer, args=(user, room_ids, deadline, stats, i))
+                       for i in range(args.writers)]
+            threads += [threading.Thread(target=reader, args=(deadline, stats)) for _ in range(args.readers)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            journal = connection.cursor().execute('PRAGMA journal_mode').fetchone()[0]
+    finally:
+        connection_created.connect(configure_connection, dispatch_uid='core.configure_connection')
+        if saved_mode:
+            options['transaction_mode'] = saved_mode
+    writes = sum(ok for kind, ok, _ in stats if kind == 'write')
+    reads = sum(ok for kind, ok, _ in stats if kind == 'read')
+    locked = sum(n for _, _, n in stats)
+    name = 'profile' if profile and settings.SQLITE_PRAGMAS else 'defaults'
+    print(f'{name:>9} {journal:>8} {writes / args.seconds:>10.0f} {reads / args.seconds:>9.0f} {locked:>7}')
+    return writes / args.seconds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--rooms', type=int, default=50)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from django.db import connection
+    if connection.vendor != 'sqlite':
+        parser.error('this benchmark needs the SQLite profile (unset DB_ENGINE)')
+
+    print(f'{"run":>9} {"journal":>8} {"writes/s":>10} {"reads/s":>9} {"locked":>7}')
+    baseline = run(False, args)
+    tuned = run(True, args)
+    print(f'write throughput x{tuned / baseline:.1f}' if baseline else 'baseline committed no writes')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""Load benchmark for every URL in core/urls.py.
+
+Seeds an S/M/L/XL campus (benchmarks.datasets) in a throwaway database and
+drives each view through the Django test client as an admin. For every URL
+it records p50/p95/p99 latency, the number of queries and the peak Python
+memory of one request, and writes them to a JSON baseline. ``--compare``
+reruns the suite and fails when a URL's p95 got slower than the baseline by
+more than ``--threshold``, or it issues more queries.
+
+    python -m benchmarks.views --sizes S M --repeat 30 --output bench.json
+    python -m benchmarks.views --sizes S M --compare bench.json --threshold 0.25
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import timedelta
+
+from benchmarks import setup_django, test_database
+
+# long-lived event stream: no response time to measure
+SKIP = {'dashboard_events'}
+# which seeded object fills a bare <pk>, by URL name prefix (first match wins)
+PK_KINDS = (
+    ('room_booking', 'booking'), ('update_room_status', 'room'), ('asset_building', 'building'),
+    ('stats_building', 'building'),
+    ('asset_floor', 'floor'), ('asset_room', 'room'), ('building', 'building'), ('floor', 'floor'),
+    ('room', 'room'), ('equipment', 'equipment'), ('maintenance', 'request'),
+)
+
+
+def query_params(name, objs):
+    now = objs['now']
+    return {
+        'api_floors': {'building': objs['building'].pk},
+        'api_rooms': {'floor': objs['floor'].pk},
+        'api_equipments': {'room': objs['room'].pk},
+        'api_equipment_search': {'q': 'TB0'},
+        'api_available_rooms': {'building': objs['building'].pk, 'start': (now + timedelta(days=3)).isoformat(),
+                                'end': (now + timedelta(days=3, hours=2)).isoformat()},
+        'api_hierarchy': {'building': objs['building'].pk},
+        'maintenance_create': {'room': objs['room'].pk},
+        'maintenance_export': {'format': 'csv', 'building': objs['building'].pk},
+        'room_booking_export': {'format': 'csv', 'building': objs['building'].pk},
+    }.get(name.removesuffix('_async'), {})
+
+
+def url_cases(objs):
+    """``(name, method, path, params)`` for every named route of the core app.
+
+    A route whose ``<pk>`` matches no ``PK_KINDS`` prefix is reported and skipped.
+    """
+    from django.urls import reverse
+    from core.urls import urlpatterns
+
+    for pattern in urlpatterns:
+        name = pattern.name
+        if not name or name in SKIP:
+            continue
+        kwargs = {}
+        for param in pattern.pattern.converters:
+            if param == 'user_id':
+                kwargs[param] = objs['user'].pk
+            elif param.endswith('_pk'):
+                kwargs[param] = objs[param[:-3]].pk
+            else:
+                kind = next((kind for prefix, kind in PK_KINDS if name.startswith(prefix)), None)
+                if kind is None:
+                    print(f'skipped {name}: add its <{param}> to PK_KINDS', file=sys.stderr)
+                    break
+                kwargs[param] = objs[kind].pk
+        else:
+            yield name, 'get', reverse(name, kwargs=kwargs), query_params(name, objs)
+    # one write path: a booking request that passes the conflict check
+    yield ('room_booking_create:post', 'post', reverse('room_booking_create', args=[objs['room'].pk]), None)
+
+
+def booking_post(i, objs):
+    start = objs['now'] + timedelta(days=900, hours=2 * i)
+    return {'purpose': 'bench', 'start_time': start.strftime('%Y-%m-%dT%H:%M'),
+            'end_time': (start + timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M')}
+
+
+def fetch(client, method, path, params):
+    response = getattr(client, method)(path, params or {})
+    if response.streaming:
+        size = sum(len(chunk) for chunk in response.streaming_content)
+    else:
+        size = len(response.content)
+    return response.status_code, size
+
+
+def measure(client, case, objs, repeat):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    name, method, path, params = case
+    counter = iter(range(10 ** 9))
+
+    def params_for():
+        return booking_post(next(counter), objs) if params is None else params
+
+    status, size = fetch(client, method, path, params_for())  # warm-up: caches, templates
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fetch(client, method, path, params_for())
+        samples.append((time.perf_counter() - t0) * 1000)
+
+    tracemalloc.start()
+    with CaptureQueriesContext(connection) as ctx:
+        fetch(client, method, path, params_for())
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    cuts = statistics.quantiles(samples, n=100, method='inclusive')
+    return {
+        'path': path, 'status': status, 'bytes': size, 'queries': len(ctx.captured_queries),
+        'p50_ms': round(cuts[49], 3), 'p95_ms': round(cuts[94], 3), 'p99_ms': round(cuts[98], 3),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def run_size(size, repeat, seed_value):
+    from django.test import Client
+    from django.utils import timezone
+    from benchmarks.datasets import seed
+
+    with test_database():
+        t0 = time.perf_counter()
+        objs = seed(size, seed_value)
+        objs['now'] = timezone.now()
+        print(f'[{size}] seeded in {time.perf_counter() - t0:.1f}s', file=sys.stderr)
+        client = Client()
+        client.force_login(objs['admin'])
+        results = {}
+        for case in url_cases(objs):
+            results[case[0]] = measure(client, case, objs, repeat)
+            r = results[case[0]]
+            print(f'[{size}] {case[0]:<28} {r["status"]} p50 {r["p50_ms"]:>8.2f}  p95 {r["p95_ms"]:>8.2f}  '
+                  f'p99 {r["p99_ms"]:>8.2f} ms  {r["queries"]:>3} q  {r["peak_kib"]:>8.1f} KiB', file=sys.stderr)
+        return results
+
+
+def compare(baseline, current, threshold, min_ms=1.0):
+    """Regression messages for URLs measured in both runs.
+
+    A slowdown also has to exceed ``min_ms`` so timer noise on sub-millisecond
+    endpoints is not reported.
+    """
+    problems = []
+    for size, urls in current.items():
+        for name, now in urls.items():
+            before = baseline.get(size, {}).get(name)
+            if not before:
+                continue
+            slower = now['p95_ms'] - before['p95_ms']
+            if now['p95_ms'] > before['p95_ms'] * (1 + threshold) and slower > min_ms:
+                problems.append(f'{size} {name}: p95 {before["p95_ms"]:.2f} -> {now["p95_ms"]:.2f} ms')
+            if now['queries'] > before['queries']:
+                problems.append(f'{size} {name}: queries {before["queries"]} -> {now["queries"]}')
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', default=['S'], choices=['S', 'M', 'L', 'XL'])
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the results as a JSON baseline')
+    parser.add_argument('--compare', metavar='BASELINE', help='compare with a JSON baseline')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed p95 slowdown as a fraction (default %(default)s)')
+    parser.add_argument('--min-ms', type=float, default=1.0,
+                        help='ignore p95 slowdowns smaller than this (default %(default)s ms)')
+    args = parser.parse_args(argv)
+    if args.repeat < 2:
+        parser.error('--repeat must be at least 2')
+
+    setup_django()
+    import django
+
+    results = {size: run_size(size, args.repeat, args.seed) for size in args.sizes}
+    report = {
+        'meta': {'repeat': args.repeat, 'seed': args.seed, 'python': platform.python_version(),
+                 'django': django.get_version(), 'created': time.strftime('%Y-%m-%dT%H:%M:%S')},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f'wrote {args.output}', file=sys.stderr)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        problems = compare(baseline, results, args.threshold, args.min_ms)
+        for problem in problems:
+            print(f'REGRESSION {problem}')
+        if problems:
+            sys.exit(1)
+        print('no regressions')
+
+
+if __name__ == '__main__':
+    main()
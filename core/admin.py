@@ -1,10 +1,55 @@
 from django.contrib import admin
 from .models import Building, Floor, Room, Equipment, MaintenanceRequest
 from django.urls import path
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.contrib.admin import SimpleListFilter
-from .models import RoomBooking
+from .models import BookingSeries, RoomBooking
+from django.core.exceptions import PermissionDenied
+from django.db import IntegrityError, transaction
+from .forms import EquipmentCopyForm
+from .inventory import COLUMNS, import_inventory, read_rows
+from . import versions
+from functools import lru_cache
+
+@lru_cache(maxsize=512)
+def _hierarchy_lookups(kind, pk, version):
+    # ``version`` is only part of the cache key: any change to the list gives a new one
+    if kind == versions.CAMPUS:
+        rows = Building.objects.values_list('id', 'name')
+    elif kind == versions.BUILDING:
+        rows = Floor.objects.filter(building_id=pk).values_list('id', 'name')
+    else:
+        rows = Room.objects.filter(floor_id=pk).values_list('id', 'name')
+    return tuple(rows)
+
+
+def hierarchy_lookups(kind, pk):
+    """Filter choices for the buildings (``CAMPUS``), floors of a building or rooms of a floor.
+
+    Cached per process and per hierarchy version (core.versions), so a changelist
+    hit only queries when the list has changed since the last one.
+    """
+    if kind != versions.CAMPUS and not str(pk or '').isdigit():
+        return []
+    return list(_hierarchy_lookups(kind, pk, versions.get_version(kind, pk)))
+
+
+class HierarchySelectMixin:
+    """Load the building with floor FK choices, whose label goes through it.
+
+    Room and Equipment labels are stored (``location_path``) and need no join.
+    """
+    related_select = {
+        'floor': ('building',),
+    }
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.related_select:
+            kwargs.setdefault('queryset', db_field.related_model._default_manager.select_related(
+                *self.related_select[db_field.name]))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
 
 # Bộ lọc phân cấp cho RoomBooking
 class RoomBookingBuildingFilter(SimpleListFilter):
@@ -12,8 +57,7 @@ class RoomBookingBuildingFilter(SimpleListFilter):
     parameter_name = 'booking_building'
 
     def lookups(self, request, model_admin):
-        buildings = Building.objects.all()
-        return [(b.id, b.name) for b in buildings]
+        return hierarchy_lookups(versions.CAMPUS, versions.TREE_ALL)
 
     def queryset(self, request, queryset):
         if self.value():
@@ -25,11 +69,7 @@ class RoomBookingFloorFilter(SimpleListFilter):
     parameter_name = 'booking_floor'
 
     def lookups(self, request, model_admin):
-        building_id = request.GET.get('booking_building')
-        if building_id:
-            floors = Floor.objects.filter(building_id=building_id)
-            return [(f.id, f.name) for f in floors]
-        return []
+        return hierarchy_lookups(versions.BUILDING, request.GET.get('booking_building'))
 
     def queryset(self, request, queryset):
         if self.value():
@@ -41,11 +81,7 @@ class RoomBookingRoomFilter(SimpleListFilter):
     parameter_name = 'booking_room'
 
     def lookups(self, request, model_admin):
-        floor_id = request.GET.get('booking_floor')
-        if floor_id:
-            rooms = Room.objects.filter(floor_id=floor_id)
-            return [(r.id, r.name) for r in rooms]
-        return []
+        return hierarchy_lookups(versions.FLOOR, request.GET.get('booking_floor'))
 
     def queryset(self, request, queryset):
         if self.value():
@@ -58,8 +94,7 @@ class EquipmentBuildingFilter(SimpleListFilter):
     parameter_name = 'building'
 
     def lookups(self, request, model_admin):
-        buildings = Building.objects.all()
-        return [(b.id, b.name) for b in buildings]
+        return hierarchy_lookups(versions.CAMPUS, versions.TREE_ALL)
 
     def queryset(self, request, queryset):
         if self.value():
@@ -71,11 +106,7 @@ class EquipmentFloorFilter(SimpleListFilter):
     parameter_name = 'floor'
 
     def lookups(self, request, model_admin):
-        building_id = request.GET.get('building')
-        if building_id:
-            floors = Floor.objects.filter(building_id=building_id)
-            return [(f.id, f.name) for f in floors]
-        return []
+        return hierarchy_lookups(versions.BUILDING, request.GET.get('building'))
 
     def queryset(self, request, queryset):
         if self.value():
@@ -87,11 +118,7 @@ class EquipmentRoomFilter(SimpleListFilter):
     parameter_name = 'room'
 
     def lookups(self, request, model_admin):
-        floor_id = request.GET.get('floor')
-        if floor_id:
-            rooms = Room.objects.filter(floor_id=floor_id)
-            return [(r.id, r.name) for r in rooms]
-        return []
+        return hierarchy_lookups(versions.FLOOR, request.GET.get('floor'))
 
     def queryset(self, request, queryset):
         if self.value():
@@ -104,8 +131,7 @@ class RoomBuildingFilter(SimpleListFilter):
     parameter_name = 'building'
 
     def lookups(self, request, model_admin):
-        buildings = Building.objects.all()
-        return [(b.id, b.name) for b in buildings]
+        return hierarchy_lookups(versions.CAMPUS, versions.TREE_ALL)
 
     def queryset(self, request, queryset):
         if self.value():
@@ -117,11 +143,7 @@ class RoomFloorFilter(SimpleListFilter):
     parameter_name = 'floor'
 
     def lookups(self, request, model_admin):
-        building_id = request.GET.get('building')
-        if building_id:
-            floors = Floor.objects.filter(building_id=building_id)
-            return [(f.id, f.name) for f in floors]
-        return []
+        return hierarchy_lookups(versions.BUILDING, request.GET.get('building'))
 
     def queryset(self, request, queryset):
         if self.value():
@@ -134,36 +156,83 @@ class BuildingAdmin(admin.ModelAdmin):
     search_fields = ('code', 'name')
 
 @admin.register(Floor)
-class FloorAdmin(admin.ModelAdmin):
+class FloorAdmin(HierarchySelectMixin, admin.ModelAdmin):
     list_display = ('building', 'number', 'name')
     list_filter = ('building',)
+    list_select_related = ('building',)
+    search_fields = ('building__code', 'number', 'name')
+    autocomplete_fields = ('building',)
+    # the changelist default, made explicit so autocomplete pages are stable too
+    ordering = ('-pk',)
+
+    def get_queryset(self, request):
+        # also used by the autocomplete endpoint, whose labels need the building
+        return super().get_queryset(request).select_related('building')
 
 @admin.register(Room)
-class RoomAdmin(admin.ModelAdmin):
+class RoomAdmin(HierarchySelectMixin, admin.ModelAdmin):
     list_display = ('floor', 'code', 'name', 'status')
+    list_select_related = ('floor__building',)
+    autocomplete_fields = ('floor',)
+    ordering = ('-pk',)
     list_filter = [
         RoomBuildingFilter, 
         RoomFloorFilter,
         'status'
     ]
-    search_fields = ('name', 'code')
+    search_fields = ('name', 'code', '^location_path')
+
+
+def _copy_code(base, n):
+    # n-th free name for a copy of ``base``: base, base-copy, base-copy-2, ...;
+    # ``base`` is cut short where the suffix would not fit in Equipment.code
+    if n == 0:
+        return base
+    suffix = '-copy' if n == 1 else f'-copy-{n}'
+    return base[:Equipment._meta.get_field('code').max_length - len(suffix)] + suffix
+
+
+def copy_plan(equipments, rooms):
+    """Unsaved copies of ``equipments`` for every room in ``rooms`` and how many were renamed.
+
+    Codes already used in the destination rooms are read with one query; collisions,
+    including between the copies themselves, are resolved in memory.
+    """
+    equipments = list(equipments.values('code', 'name', 'description', 'status'))
+    taken = set(Equipment.objects.filter(room__in=rooms).values_list('room_id', 'code'))
+    copies, renamed = [], 0
+    for room in rooms:
+        for eq in equipments:
+            n = 0
+            while (room.pk, _copy_code(eq['code'], n)) in taken:
+                n += 1
+            code = _copy_code(eq['code'], n)
+            taken.add((room.pk, code))
+            renamed += n > 0
+            copies.append(Equipment(room=room, **dict(eq, code=code)))
+    return copies, renamed
+
 
 @admin.register(Equipment)
-class EquipmentAdmin(admin.ModelAdmin):
+class EquipmentAdmin(HierarchySelectMixin, admin.ModelAdmin):
     list_display = ('code', 'name', 'room', 'status')
+    list_select_related = ('room',)
+    autocomplete_fields = ('room',)
+    ordering = ('-pk',)
     list_filter = [
         EquipmentBuildingFilter, 
         EquipmentFloorFilter, 
         EquipmentRoomFilter,
         'status'
     ]
-    search_fields = ('code', 'name')
+    search_fields = ('code', 'name', '^location_path')
     actions = ['copy_to_room']
 
     def get_urls(self):
         urls = super().get_urls()
         custom = [
             path('copy-to-room/', self.admin_site.admin_view(self.copy_to_room_view), name='equipment_copy_to_room'),
+            path('import/', self.admin_site.admin_view(self.import_view), name='equipment_import'),
         ]
         return custom + urls
 
@@ -171,7 +240,7 @@ class EquipmentAdmin(admin.ModelAdmin):
         ids = ','.join(str(i) for i in queryset.values_list('pk', flat=True))
         return redirect(f'copy-to-room/?ids={ids}')
 
-    copy_to_room.short_description = 'Copy selected equipment to another room'
+    copy_to_room.short_description = 'Copy selected equipment to other rooms'
 
     def copy_to_room_view(self, request):
         ids = request.GET.get('ids', '')
@@ -182,36 +251,21 @@ class EquipmentAdmin(admin.ModelAdmin):
         equipments = Equipment.objects.filter(pk__in=pks)
 
         if request.method == 'POST':
-            room_id = request.POST.get('room')
-            room = get_object_or_404(Room, pk=room_id)
-            created = 0
-            renamed = 0
-            from django.db import IntegrityError, transaction
-
-            for eq in equipments:
-                base_code = eq.code
-                new_code = base_code
-                suffix = 1
-                while Equipment.objects.filter(room=room, code=new_code).exists():
-                    suffix += 1
-                    new_code = f"{base_code}-copy" if suffix == 2 else f"{base_code}-copy-{suffix-1}"
-
-                try:
-                    with transaction.atomic():
-                        Equipment.objects.create(
-                            room=room,
-                            code=new_code,
-                            name=eq.name,
-                            description=eq.description,
-                            status=eq.status,
-                        )
-                    created += 1
-                    if new_code != base_code:
-                        renamed += 1
-                except IntegrityError:
-                    messages.warning(request, f'Skipped equipment {eq} due to a uniqueness conflict.')
-
-            msg = f'Created {created} copies in room {room}.'
+            form = EquipmentCopyForm(request.POST)
+            if not form.is_valid():
+                messages.error(request, ' '.join(form.errors['room']))
+                return redirect(request.get_full_path())
+            rooms = list(form.cleaned_data['room'])
+            copies, renamed = copy_plan(equipments, rooms)
+            try:
+                with transaction.atomic():
+                    Equipment.objects.bulk_create(copies, batch_size=1000)
+            except IntegrityError:
+                # another copy into the same rooms committed in between; nothing was written
+                messages.error(request, 'Destination rooms changed during the copy; nothing was copied, please retry.')
+                return redirect(request.get_full_path())
+
+            msg = f"Created {len(copies)} copies in {len(rooms)} room(s): {', '.join(str(r) for r in rooms)}."
             if renamed:
                 msg += f' ({renamed} were renamed to avoid duplicates)'
             messages.success(request, msg)
@@ -226,6 +280,31 @@ class EquipmentAdmin(admin.ModelAdmin):
         )
         return render(request, 'admin/core/equipment_copy_to_room.html', context)
 
+    def import_view(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        if request.method == 'POST' and request.FILES.get('file'):
+            upload = request.FILES['file']
+            try:
+                result = import_inventory(read_rows(upload, upload.name))
+            except ValueError as e:
+                messages.error(request, str(e))
+                return redirect('.')
+            messages.success(request, f'Đã nhập {result.imported}/{result.rows} dòng.')
+            if result.rejected:
+                shown = '; '.join(f'dòng {line}: {reason}' for line, reason in result.rejected[:20])
+                more = len(result.rejected) - 20
+                messages.warning(request, f'{len(result.rejected)} dòng bị bỏ qua: {shown}'
+                                          + (f' (và {more} dòng khác)' if more > 0 else ''))
+            return redirect('..')
+
+        context = dict(
+            self.admin_site.each_context(request),
+            columns=COLUMNS,
+            opts=self.model._meta,
+        )
+        return render(request, 'admin/core/equipment_import.html', context)
+
 class EquipmentStatusFilter(SimpleListFilter):
     title = 'Trạng thái thiết bị'
     parameter_name = 'equipment_status'
@@ -255,8 +334,10 @@ except Exception:
     pass
 
 @admin.register(MaintenanceRequest)
-class MaintenanceRequestAdmin(admin.ModelAdmin):
+class MaintenanceRequestAdmin(HierarchySelectMixin, admin.ModelAdmin):
     list_display = ('id', 'equipment', 'status', 'created_by', 'created_at')
+    list_select_related = ('equipment', 'created_by')
+    autocomplete_fields = ('equipment', 'created_by')
     list_filter = ('status', 'equipment__room__floor__building')
     search_fields = ('equipment__name', 'description')
     
@@ -279,8 +360,10 @@ class MaintenanceRequestAdmin(admin.ModelAdmin):
             pass
 
 @admin.register(RoomBooking)
-class RoomBookingAdmin(admin.ModelAdmin):
+class RoomBookingAdmin(HierarchySelectMixin, admin.ModelAdmin):
     list_display = ['room', 'user', 'purpose', 'start_time', 'end_time', 'status', 'created_at']
+    list_select_related = ['room', 'user']
+    autocomplete_fields = ['room', 'user']
     list_filter = [RoomBookingBuildingFilter, RoomBookingFloorFilter, RoomBookingRoomFilter, 'status', 'start_time', 'created_at']
     search_fields = ['room__name', 'user__username', 'purpose']
     date_hierarchy = 'created_at'
@@ -300,4 +383,18 @@ class RoomBookingAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(BookingSeries)
+class BookingSeriesAdmin(admin.ModelAdmin):
+    list_display = ['room', 'user', 'frequency', 'start_time', 'end_time', 'until', 'count', 'created_at']
+    list_select_related = ['room', 'user']
+    autocomplete_fields = ['room', 'user']
+    list_filter = ['frequency', 'created_at']
+    search_fields = ['room__name', 'user__username', 'purpose']
+    ordering = ('-pk',)
+
+    def has_add_permission(self, request):
+        # series are created from the booking page, which also admits their occurrences
+        return False
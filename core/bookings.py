@@ -0,0 +1,252 @@
+"""Booking housekeeping shared by the views and the ``run_booking_reaper`` command."""
+import random
+import time
+from datetime import timedelta
+
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from . import versions
+from .models import BookingSeries, Room, RoomBooking
+
+ACTIVE_STATUSES = [RoomBooking.STATUS_APPROVED, RoomBooking.STATUS_PENDING]
+
+# finished bookings move approved -> completed, pending -> rejected
+EXPIRED_STATUS = {
+    RoomBooking.STATUS_APPROVED: RoomBooking.STATUS_COMPLETED,
+    RoomBooking.STATUS_PENDING: RoomBooking.STATUS_REJECTED,
+}
+
+
+def active_bookings_at(now):
+    """Bookings (pending or approved) whose time window contains ``now``."""
+    return RoomBooking.objects.filter(
+        status__in=ACTIVE_STATUSES,
+        start_time__lte=now,
+        end_time__gte=now
+    )
+
+
+def overlapping_bookings(start, end):
+    """Active bookings whose time window overlaps ``[start, end)``."""
+    return RoomBooking.objects.filter(
+        status__in=ACTIVE_STATUSES,
+        start_time__lt=end,
+        end_time__gt=start
+    )
+
+
+# name of the database guard against overlapping active bookings (migration 0011)
+OVERLAP_GUARD = 'booking_no_overlap'
+# attempts at admitting a booking when the database is busy, and the first back-off in seconds
+ADMIT_ATTEMPTS = 5
+ADMIT_BACKOFF = 0.05
+
+
+class BookingConflict(Exception):
+    """The booking overlaps an active booking of the same room."""
+
+
+def _lock_room(room_id):
+    # PostgreSQL: row lock on the room serializes admissions per room. SQLite has
+    # no row locks; its IMMEDIATE transactions (settings) take the write lock at
+    # BEGIN, which serializes all admissions, and select_for_update is a no-op.
+    list(Room.objects.select_for_update().filter(pk=room_id).values_list('pk', flat=True))
+
+
+def _admit(write, attempts):
+    """Run ``write()`` in a transaction, retrying it while the database is busy.
+
+    Lock timeouts are retried with jittered exponential back-off, except inside
+    an outer transaction, which a failed statement has already spoilt. A
+    refusal by the database guard becomes :class:`BookingConflict`.
+    """
+    if connection.in_atomic_block:
+        attempts = 1
+    for attempt in range(attempts):
+        try:
+            with transaction.atomic():
+                return write()
+        except IntegrityError as e:
+            if OVERLAP_GUARD in str(e):
+                raise BookingConflict from e
+            raise
+        except OperationalError:
+            # database locked / lock timeout / serialization failure
+            if attempt + 1 == attempts:
+                raise
+            time.sleep(ADMIT_BACKOFF * 2 ** attempt * random.random())
+
+
+def admit_booking(booking, attempts=ADMIT_ATTEMPTS):
+    """Save ``booking`` unless an active booking of its room overlaps it.
+
+    Check and write run in one transaction under a per-room lock, so two
+    concurrent requests for the same slot cannot both pass the check; the
+    database guard (migration 0011) backs it up for every other writer.
+    Raises :class:`BookingConflict` when the slot is taken.
+    """
+    adding = booking._state.adding
+
+    def write():
+        if adding:
+            # a retried insert was rolled back with its transaction
+            booking.pk, booking._state.adding = None, True
+        if booking.status in ACTIVE_STATUSES:
+            _lock_room(booking.room_id)
+            clash = overlapping_bookings(booking.start_time, booking.end_time).filter(room_id=booking.room_id)
+            if booking.pk:
+                clash = clash.exclude(pk=booking.pk)
+            if clash.exists():
+                raise BookingConflict
+        booking.save()
+        return booking
+
+    return _admit(write, attempts)
+
+
+# most occurrences a series may expand to
+MAX_OCCURRENCES = 366
+
+SERIES_STEPS = {
+    BookingSeries.FREQ_DAILY: timedelta(days=1),
+    BookingSeries.FREQ_WEEKLY: timedelta(weeks=1),
+}
+
+
+class SeriesConflict(BookingConflict):
+    """Some occurrences of a series overlap active bookings of the room."""
+
+    def __init__(self, conflicts):
+        super().__init__(conflicts)
+        # (index, start, end) of each conflicting occurrence
+        self.conflicts = conflicts
+
+
+def expand_series(start, end, frequency, until=None, count=None):
+    """``[(start, end), ...]`` of every occurrence, first one included.
+
+    Occurrences keep the wall-clock time of the first one in the current time
+    zone across DST changes. Stops after ``count`` occurrences or the last one
+    starting on or before the date ``until``, and at :data:`MAX_OCCURRENCES`.
+    """
+    step = SERIES_STEPS[frequency]
+    tz = timezone.get_current_timezone()
+    first, duration = timezone.localtime(start, tz).replace(tzinfo=None), end - start
+    limit = min(count or MAX_OCCURRENCES, MAX_OCCURRENCES)
+    occurrences = []
+    while len(occurrences) < limit:
+        local = first + step * len(occurrences)
+        if until and local.date() > until:
+            break
+        occurrence = timezone.make_aware(local, tz)
+        occurrences.append((occurrence, occurrence + duration))
+    return occurrences
+
+
+def find_conflicts(room_id, occurrences):
+    """``[(index, start, end), ...]`` of the occurrences that overlap an active booking of the room.
+
+    One range query fetches the room's active bookings between the first start
+    and the last end, sorted by start; both lists are then swept once: a booking
+    that ends before one occurrence starts ends before every later one too.
+    """
+    if not occurrences:
+        return []
+    occurrences = sorted(enumerate(occurrences), key=lambda o: o[1][0])
+    existing = list(
+        overlapping_bookings(occurrences[0][1][0], max(end for _, (_, end) in occurrences))
+        .filter(room_id=room_id).order_by('start_time').values_list('start_time', 'end_time')
+    )
+    conflicts = []
+    i = 0
+    for n, (start, end) in occurrences:
+        while i < len(existing) and existing[i][1] <= start:
+            i += 1
+        if i < len(existing) and existing[i][0] < end:
+            conflicts.append((n, start, end))
+    return conflicts
+
+
+def admit_series(series, occurrences, skip_conflicts=False, attempts=ADMIT_ATTEMPTS):
+    """Save ``series`` and one pending booking per occurrence with a single ``bulk_create``.
+
+    Runs under the room lock like :func:`admit_booking`. Occurrences that
+    overlap an active booking raise :class:`SeriesConflict` listing all of them,
+    or with ``skip_conflicts`` are left out. Returns ``(bookings, conflicts)``.
+    """
+    def write():
+        series.pk, series._state.adding = None, True
+        _lock_room(series.room_id)
+        conflicts = find_conflicts(series.room_id, occurrences)
+        if conflicts and not skip_conflicts:
+            raise SeriesConflict(conflicts)
+        skipped = {n for n, _, _ in conflicts}
+        series.save()
+        bookings = RoomBooking.objects.bulk_create(
+            RoomBooking(room_id=series.room_id, user_id=series.user_id, purpose=series.purpose,
+                        start_time=start, end_time=end, series=series)
+            for n, (start, end) in enumerate(occurrences) if n not in skipped
+        )
+        return bookings, conflicts
+
+    bookings, conflicts = _admit(write, attempts)
+    # bulk_create skips the signals that keep the room's bookings stamp
+    versions.bump(versions.BOOKINGS, series.room_id)
+    return bookings, conflicts
+
+
+def available_rooms(start, end):
+    """Rooms that are not under maintenance and have no active booking overlapping ``[start, end)``.
+
+    A single NOT EXISTS anti-join; the probe per room is served by
+    ``booking_room_status_time_idx`` so the cost follows the number of rooms,
+    not the size of the booking history.
+    """
+    busy = overlapping_bookings(start, end).filter(room=OuterRef('pk'))
+    return Room.objects.exclude(status=Room.ROOM_MAINTENANCE).filter(~Exists(busy))
+
+
+def expire_bookings(now=None, batch_size=500):
+    """Expire bookings whose end_time has passed, ``batch_size`` rows per transaction.
+
+    Each batch is a short write transaction so SQLite never holds the write
+    lock for long. Returns ``{old_status: rows_updated}``.
+    """
+    now = now or timezone.now()
+    expired = RoomBooking.objects.filter(end_time__lt=now)
+
+    updated = {}
+    for old_status, new_status in EXPIRED_STATUS.items():
+        qs = expired.filter(status=old_status).order_by().values_list('pk', flat=True)
+        updated[old_status] = 0
+        while True:
+            with transaction.atomic():
+                pks = list(qs[:batch_size])
+                if not pks:
+                    break
+                updated[old_status] += RoomBooking.objects.filter(pk__in=pks).update(
+                    status=new_status, updated_at=now
+                )
+    return updated
+
+
+def reconcile_room_status(now=None):
+    """Recompute ``Room.status`` from the bookings active at ``now``.
+
+    Occupied rooms without an active booking become ready, ready rooms with an
+    approved booking running now become occupied. Rooms under maintenance are
+    left alone: that status is set by hand. ``RoomQuerySet.update`` moves the
+    floors' occupancy in FloorStats and bumps the version stamps of their floors
+    and buildings on commit. Returns ``(freed, occupied)``.
+    """
+    now = now or timezone.now()
+    rooms = Room.objects.all()
+    active = active_bookings_at(now).filter(room=OuterRef('pk'))
+    with transaction.atomic():
+        freed = rooms.filter(status=Room.ROOM_OCCUPIED).exclude(Exists(active)).update(status=Room.ROOM_READY)
+        occupied = rooms.filter(status=Room.ROOM_READY).filter(
+            Exists(active.filter(status=RoomBooking.STATUS_APPROVED))
+        ).update(status=Room.ROOM_OCCUPIED)
+    return freed, occupied
@@ -0,0 +1,18 @@
+"""Per-connection database tuning.
+
+The SQLite profile lives in ``settings.SQLITE_PRAGMAS``; PRAGMAs are connection
+state (except ``journal_mode``, which is stored in the file), so they are applied
+whenever Django opens a connection. Other backends are left alone.
+"""
+from django.conf import settings
+
+
+def configure_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
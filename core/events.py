@@ -0,0 +1,118 @@
+"""In-process change broadcaster behind the dashboard's Server-Sent Events stream.
+
+One producer task per process takes a snapshot of the equipment status counts
+and fans out only what changed to every subscribed client. The database cost is therefore one snapshot per tick,
+whatever the number of open dashboards. Local model signals wake the producer
+immediately; changes made by other processes are picked up on the next tick.
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+
+from .models import EquipmentStatusCounter
+
+# seconds between snapshots when no local change wakes the producer
+SNAPSHOT_INTERVAL = 5
+# seconds between keep-alive comments on an idle stream
+HEARTBEAT_INTERVAL = 15
+# events buffered per client; a client that falls behind has its backlog
+# replaced by the full current state
+CLIENT_QUEUE_SIZE = 16
+
+
+def take_snapshot():
+    """Global equipment counts."""
+    return {'counts': EquipmentStatusCounter.for_building().as_dict()}
+
+
+def diff_snapshots(old, new):
+    """Events (``(name, data)`` pairs) needed to move a client from ``old`` to ``new``."""
+    events = []
+    if old is None or old['counts'] != new['counts']:
+        events.append(('counts', new['counts']))
+    return events
+
+
+class ChangeBroadcaster:
+    def __init__(self, snapshot=take_snapshot, interval=SNAPSHOT_INTERVAL):
+        self._take_snapshot = sync_to_async(snapshot)
+        self.interval = interval
+        self.snapshot = None
+        self._subscribers = set()
+        self._task = None
+        self._loop = None
+        self._wake = None
+
+    def subscribe(self):
+        """Register a client and return its ``asyncio.Queue`` of ``(event, data)`` pairs."""
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._wake = asyncio.Event()
+            self.snapshot = None
+            self._task = loop.create_task(self._run())
+        queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        if self.snapshot is not None:
+            # late joiners get the cached state, no query
+            self._send_state(queue)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.discard(queue)
+        if not self._subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def notify(self):
+        """Wake the producer now; safe to call from any thread (e.g. model signals)."""
+        loop, wake = self._loop, self._wake
+        if loop is not None and wake is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(wake.set)
+
+    def _send_state(self, queue):
+        for event in diff_snapshots(None, self.snapshot):
+            queue.put_nowait(event)
+
+    def _publish(self, events):
+        for queue in list(self._subscribers):
+            try:
+                for event in events:
+                    queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # events are diffs, so dropping one would leave the client wrong until
+                # that value changes again: replace its backlog with the full state
+                while not queue.empty():
+                    queue.get_nowait()
+                self._send_state(queue)
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            snapshot = await self._take_snapshot()
+            events = diff_snapshots(self.snapshot, snapshot)
+            self.snapshot = snapshot
+            if events:
+                self._publish(events)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def stream(self, heartbeat=HEARTBEAT_INTERVAL):
+        """Server-Sent Events body for one client; unsubscribes when the client goes away."""
+        queue = self.subscribe()
+        try:
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+                else:
+                    yield f'event: {event}\ndata: {json.dumps(data)}\n\n'
+        finally:
+            self.unsubscribe(queue)
+
+
+broadcaster = ChangeBroadcaster()
@@ -0,0 +1,83 @@
+"""Streaming CSV / JSON Lines exports of maintenance requests and bookings.
+
+Rows come straight from ``values_list(...).iterator(chunk_size)`` so neither model
+instances nor the full result list are ever built; each row is encoded and
+handed to the response as soon as it is read.
+"""
+import csv
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+EXPORT_CHUNK_SIZE = 2000
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+# (output column, queryset lookup)
+MAINTENANCE_COLUMNS = (
+    ('id', 'id'),
+    ('status', 'status'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+    ('building', 'equipment__room__floor__building__code'),
+    ('floor', 'equipment__room__floor__number'),
+    ('room', 'equipment__room__code'),
+    ('equipment_code', 'equipment__code'),
+    ('equipment_name', 'equipment__name'),
+    ('created_by', 'created_by__username'),
+    ('description', 'description'),
+    ('note', 'note'),
+)
+BOOKING_COLUMNS = (
+    ('id', 'id'),
+    ('status', 'status'),
+    ('start_time', 'start_time'),
+    ('end_time', 'end_time'),
+    ('created_at', 'created_at'),
+    ('building', 'room__floor__building__code'),
+    ('floor', 'room__floor__number'),
+    ('room', 'room__code'),
+    ('user', 'user__username'),
+    ('purpose', 'purpose'),
+)
+# a CSV cell starting with one of these runs as a formula in spreadsheet apps
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class _Echo:
+    """Write target for csv.writer that returns the line instead of buffering it."""
+
+    def write(self, value):
+        return value
+
+
+def _local(value):
+    return timezone.localtime(value) if isinstance(value, datetime) and timezone.is_aware(value) else value
+
+
+def _csv_cell(value):
+    if isinstance(value, datetime):
+        return _local(value).isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        # user-entered text: a leading quote makes Excel show it as text
+        return "'" + value
+    return value
+
+
+def export_rows(queryset, columns, fmt, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield the encoded lines of ``queryset`` (``fmt`` is a key of :data:`FORMATS`)."""
+    names = [name for name, _ in columns]
+    rows = queryset.values_list(*(lookup for _, lookup in columns)).iterator(chunk_size=chunk_size)
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        # BOM so spreadsheet apps pick UTF-8 for the Vietnamese text
+        yield '\ufeff' + writer.writerow(names)
+        for row in rows:
+            yield writer.writerow(map(_csv_cell, row))
+    else:
+        encoder = DjangoJSONEncoder(ensure_ascii=False)
+        for row in rows:
+            yield encoder.encode(dict(zip(names, map(_local, row)))) + '\n'
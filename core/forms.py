@@ -1,5 +1,11 @@
 from django import forms
+from django.conf import settings
+from django.urls import reverse_lazy
+from django.utils import timezone
+from django.utils.html import format_html
 from .models import Building, Floor, Room, Equipment, MaintenanceRequest, RoomBooking  # THÊM RoomBooking
+from .models import BookingSeries
+from .bookings import MAX_OCCURRENCES, SERIES_STEPS
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 
@@ -28,11 +34,69 @@ class EquipmentForm(forms.ModelForm):
         fields = ['room', 'code', 'name', 'description', 'status']
 
 
+def equipment_option_label(equipment):
+    """Short option label; needs ``room__floor__building`` to be select_related."""
+    room = equipment.room
+    return f"{equipment.code} - {equipment.name} ({room.floor.building.code} / {room.floor.number} / {room.code})"
+
+
+class EquipmentChoiceField(forms.ModelChoiceField):
+    """Equipment choices labelled from one select_related query instead of ``Equipment.__str__``."""
+
+    def label_from_instance(self, obj):
+        return equipment_option_label(obj)
+
+
+class EquipmentSearchInput(forms.HiddenInput):
+    """Hidden equipment id plus a search box filled from ``api_equipment_search`` as the user types.
+
+    Used instead of a ``<select>`` when the inventory is too large to list; rendering
+    never touches the field's choices.
+    """
+    is_search = True
+    lookup_url = reverse_lazy('api_equipment_search')
+
+    def render(self, name, value, attrs=None, renderer=None):
+        hidden = super().render(name, value, attrs, renderer)
+        target = (attrs or {}).get('id') or self.attrs.get('id') or f'id_{name}'
+        return format_html(
+            '<input type="search" class="equipment-search" data-target="{}" data-lookup-url="{}" '
+            'list="{}_options" placeholder="Nhập mã hoặc tên thiết bị..." autocomplete="off">'
+            '<datalist id="{}_options"></datalist>{}',
+            target, self.lookup_url, target, target, hidden,
+        )
+
+
+class EquipmentCopyForm(forms.Form):
+    """Destination rooms of the admin's "copy to other rooms" action."""
+    room = forms.ModelMultipleChoiceField(
+        queryset=Room.objects.select_related('floor__building'),
+        error_messages={'required': 'No destination room selected.'},
+    )
+
+
 class MaintenanceRequestForm(forms.ModelForm):
+    equipment = EquipmentChoiceField(queryset=Equipment.objects.none())
+
     class Meta:
         model = MaintenanceRequest
         fields = ['equipment', 'description']
 
+    def __init__(self, *args, room=None, building=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        equipments = Equipment.objects.select_related('room__floor__building').order_by('room_id', 'code')
+        if room is not None:
+            equipments = equipments.filter(room=room)
+        elif building is not None:
+            equipments = equipments.filter(room__floor__building=building)
+        field = self.fields['equipment']
+        field.queryset = equipments
+
+        # bounded probe instead of COUNT(*): only needs to know if there are more than the limit
+        limit = settings.EQUIPMENT_SELECT_LIMIT
+        if len(equipments.values_list('pk', flat=True)[:limit + 1]) > limit:
+            field.widget = EquipmentSearchInput()
+
 
 class MaintenanceUpdateForm(forms.ModelForm):
     class Meta:
@@ -64,6 +128,41 @@ class RoomBookingForm(forms.ModelForm):
         }
 
 
+class BookingSeriesForm(forms.ModelForm):
+    skip_conflicts = forms.BooleanField(
+        label='Bỏ qua các buổi bị trùng lịch', required=False,
+        help_text='Nếu không chọn, cả chuỗi sẽ không được đặt khi có buổi bị trùng.',
+    )
+
+    class Meta:
+        model = BookingSeries
+        fields = ['purpose', 'start_time', 'end_time', 'frequency', 'until', 'count']
+        widgets = {
+            'purpose': forms.Textarea(attrs={'rows': 3, 'placeholder': 'Nhập mục đích sử dụng phòng...'}),
+            'start_time': forms.DateTimeInput(attrs={'type': 'datetime-local'}),
+            'end_time': forms.DateTimeInput(attrs={'type': 'datetime-local'}),
+            'until': forms.DateInput(attrs={'type': 'date'}),
+        }
+
+    def clean(self):
+        cleaned = super().clean()
+        start, end = cleaned.get('start_time'), cleaned.get('end_time')
+        frequency, until, count = cleaned.get('frequency'), cleaned.get('until'), cleaned.get('count')
+        if (until is None) == (count is None):
+            raise forms.ValidationError('Chọn một trong hai: lặp đến ngày hoặc số buổi.')
+        if count is not None and not 1 <= count <= MAX_OCCURRENCES:
+            self.add_error('count', f'Số buổi phải từ 1 đến {MAX_OCCURRENCES}.')
+        if start and end and frequency:
+            if end <= start:
+                self.add_error('end_time', 'Thời gian kết thúc phải sau thời gian bắt đầu.')
+            elif end - start > SERIES_STEPS[frequency]:
+                # occurrences of the series would overlap each other
+                self.add_error('end_time', 'Mỗi buổi phải ngắn hơn chu kỳ lặp.')
+            if until and until < timezone.localtime(start).date():
+                self.add_error('until', 'Ngày kết thúc lặp phải sau buổi đầu tiên.')
+        return cleaned
+
+
 class RoomStatusForm(forms.ModelForm):
     class Meta:
         model = Room
@@ -0,0 +1,147 @@
+"""Compact columnar JSON of the building → floor → room → equipment tree.
+
+The maintenance form loads it once and filters client-side instead of making
+three round trips per selection. Each level is an object of parallel arrays;
+``parent`` holds the offset of the parent row in the level above::
+
+    {"buildings": {"id": [1], "code": ["A"], "name": ["Nhà A"]},
+     "floors": {"id": [3], "number": ["1"], "name": [""], "parent": [0]},
+     "rooms": {"id": [7], "code": ["101"], "name": [""], "status": ["ready"], "parent": [0]},
+     "equipments": {"id": [9], "code": ["PC1"], "name": ["Máy tính"], "status": ["ready"], "parent": [0]}}
+
+The body is produced by four flat queries, run in one read transaction so the
+levels agree with each other, and emitted in chunks: each column is spooled to
+a temporary file once it outgrows ``SPOOL_MAX_SIZE``, so large campus-wide trees
+are streamed with bounded memory instead of building one giant string.
+"""
+import json
+from contextlib import contextmanager
+from tempfile import SpooledTemporaryFile
+
+from django.db import connection, transaction
+
+from .models import Building, Equipment, Floor, Room
+
+# values per JSON chunk written to a column
+CHUNK_ROWS = 5000
+# bytes of one column kept in memory before it moves to a temporary file
+SPOOL_MAX_SIZE = 1024 * 1024
+# characters read back from a spool per yielded chunk
+READ_SIZE = 64 * 1024
+
+# (level name, columns, FK to the level above)
+LEVELS = (
+    ('buildings', ('id', 'code', 'name'), None),
+    ('floors', ('id', 'number', 'name'), 'building_id'),
+    ('rooms', ('id', 'code', 'name', 'status'), 'floor_id'),
+    ('equipments', ('id', 'code', 'name', 'status'), 'room_id'),
+)
+
+
+def _querysets(building_id):
+    qs = {
+        'buildings': Building.objects.order_by('code'),
+        'floors': Floor.objects.order_by('building_id', 'number'),
+        'rooms': Room.objects.order_by('floor_id', 'code'),
+        'equipments': Equipment.objects.order_by('room_id', 'code'),
+    }
+    if building_id is not None:
+        qs['buildings'] = qs['buildings'].filter(pk=building_id)
+        qs['floors'] = qs['floors'].filter(building_id=building_id)
+        qs['rooms'] = qs['rooms'].filter(floor__building_id=building_id)
+        qs['equipments'] = qs['equipments'].filter(room__floor__building_id=building_id)
+    return qs
+
+
+def _flush(spools, buffers):
+    for name, values in buffers.items():
+        if values:
+            chunk = json.dumps(values, ensure_ascii=False)[1:-1]
+            spools[name].write(',' + chunk if spools[name].tell() else chunk)
+            values.clear()
+
+
+def _read_level(queryset, fields, parent_field, parent_offsets, keep_offsets):
+    """Spool the columns of one level; returns them and, if asked, ``{id: offset}`` of its rows."""
+    columns = fields + (('parent',) if parent_field else ())
+    spools = {name: SpooledTemporaryFile(SPOOL_MAX_SIZE, mode='w+', encoding='utf-8') for name in columns}
+    buffers = {name: [] for name in columns}
+    offsets, count = {}, 0
+    for row in queryset.values_list(*fields, *((parent_field,) if parent_field else ())).iterator(
+            chunk_size=CHUNK_ROWS):
+        values = row[:len(fields)]
+        if parent_field:
+            parent = parent_offsets.get(row[-1])
+            if parent is None:
+                # orphan: its parent was not part of the level above
+                continue
+            values += (parent,)
+        for name, value in zip(columns, values):
+            buffers[name].append(value)
+        if keep_offsets:
+            offsets[row[0]] = count
+        count += 1
+        if count % CHUNK_ROWS == 0:
+            _flush(spools, buffers)
+    _flush(spools, buffers)
+    return spools, offsets
+
+
+@contextmanager
+def _snapshot():
+    """One consistent view of the data for the level reads, without taking the write lock."""
+    if connection.in_atomic_block:
+        # the caller's transaction already reads one snapshot
+        yield
+    elif connection.vendor == 'sqlite':
+        # atomic() would BEGIN IMMEDIATE (transaction_mode) and hold the write lock for
+        # the whole read; a deferred transaction takes a WAL read snapshot at its first
+        # SELECT and lets writers carry on
+        with connection.cursor() as cursor:
+            cursor.execute('BEGIN DEFERRED')
+        try:
+            yield
+        finally:
+            if connection.connection.in_transaction:
+                with connection.cursor() as cursor:
+                    cursor.execute('COMMIT')
+    else:
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # one snapshot for the whole transaction rather than one per statement
+                with connection.cursor() as cursor:
+                    cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+            yield
+
+
+def hierarchy_chunks(building_id=None):
+    """Yield the JSON document for one building (or the whole campus) piece by piece.
+
+    All rows are read before the first chunk is yielded, so the transaction does
+    not stay open while a slow client downloads the body.
+    """
+    querysets = _querysets(building_id)
+    levels = []
+    try:
+        with _snapshot():
+            parent_offsets = {}
+            for level, (name, fields, parent_field) in enumerate(LEVELS):
+                spools, parent_offsets = _read_level(
+                    querysets[name], fields, parent_field, parent_offsets, keep_offsets=level + 1 < len(LEVELS))
+                levels.append((name, spools))
+
+        yield '{'
+        for level, (name, spools) in enumerate(levels):
+            yield f'{"," if level else ""}"{name}":{{'
+            for i, (field, spool) in enumerate(spools.items()):
+                yield f'{"," if i else ""}"{field}":['
+                spool.seek(0)
+                while chunk := spool.read(READ_SIZE):
+                    yield chunk
+                yield ']'
+            yield '}'
+        yield '}'
+    finally:
+        for _, spools in levels:
+            for spool in spools.values():
+                spool.close()
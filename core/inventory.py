@@ -0,0 +1,217 @@
+"""Bulk inventory import from CSV/XLSX spreadsheets.
+
+Expected header (column order does not matter, extra columns are ignored)::
+
+    building_code, building_name, floor_number, floor_name,
+    room_code, room_name, equipment_code, equipment_name, description, status
+
+Missing buildings, floors and rooms are created; equipment is upserted on
+(room, code). Rows are written in chunks, one transaction per chunk, with a
+handful of queries per chunk whatever its size. ``status`` accepts the stored
+value (``ready``) or its label (``Sẵn sàng``) and defaults to ready.
+"""
+import csv
+import io
+import os
+
+from django.db import transaction
+
+from . import versions
+from .models import Building, Floor, Room, Equipment, EquipmentStatusCounter, FloorStats
+
+COLUMNS = (
+    'building_code', 'building_name', 'floor_number', 'floor_name',
+    'room_code', 'room_name', 'equipment_code', 'equipment_name', 'description', 'status',
+)
+REQUIRED = ('building_code', 'floor_number', 'room_code', 'equipment_code', 'equipment_name')
+DEFAULT_CHUNK_SIZE = 5000
+
+STATUS_VALUES = {value: value for value, _ in Equipment.STATUS_CHOICES}
+STATUS_VALUES.update({label.lower(): value for value, label in Equipment.STATUS_CHOICES})
+
+MAX_LENGTHS = {
+    'building_code': Building._meta.get_field('code').max_length,
+    'building_name': Building._meta.get_field('name').max_length,
+    'floor_number': Floor._meta.get_field('number').max_length,
+    'floor_name': Floor._meta.get_field('name').max_length,
+    'room_code': Room._meta.get_field('code').max_length,
+    'room_name': Room._meta.get_field('name').max_length,
+    'equipment_code': Equipment._meta.get_field('code').max_length,
+    'equipment_name': Equipment._meta.get_field('name').max_length,
+}
+
+
+class ImportResult:
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.rejected = []  # (line number, reason)
+
+    def __str__(self):
+        return f'{self.imported} imported, {len(self.rejected)} rejected, {self.rows} rows read'
+
+
+def read_rows(file, filename):
+    """Yield ``(line number, row dict)`` from a CSV or XLSX file object.
+
+    XLSX needs the optional ``openpyxl`` package.
+    """
+    if os.path.splitext(filename)[1].lower() in ('.xlsx', '.xlsm'):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ValueError('Reading .xlsx files requires openpyxl (pip install openpyxl).')
+        sheet = load_workbook(file, read_only=True, data_only=True).active
+        rows = sheet.iter_rows(values_only=True)
+        header = [str(h or '').strip().lower() for h in next(rows, ())]
+        for line, values in enumerate(rows, start=2):
+            yield line, {h: '' if v is None else str(v) for h, v in zip(header, values)}
+        return
+
+    if not isinstance(file, io.TextIOBase):
+        file = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(file)
+    reader.fieldnames = [(h or '').strip().lower() for h in reader.fieldnames or ()]
+    for row in reader:
+        yield reader.line_num, row
+
+
+def clean_row(row):
+    """Normalised row dict, or raise ``ValueError`` with the reason it is rejected."""
+    row = {c: (row.get(c) or '').strip() for c in COLUMNS}
+    missing = [c for c in REQUIRED if not row[c]]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    too_long = [c for c, n in MAX_LENGTHS.items() if len(row[c]) > n]
+    if too_long:
+        raise ValueError(f"too long: {', '.join(too_long)}")
+    status = STATUS_VALUES.get(row['status'].lower() or Equipment.STATUS_READY)
+    if status is None:
+        raise ValueError(f"unknown status {row['status']!r}")
+    row['status'] = status
+    return row
+
+
+def _ensure(model, keys, build, lookup, created=None):
+    """``{key: pk}`` for ``keys``, creating the missing rows with one bulk insert.
+
+    Keys that had to be inserted are appended to ``created``.
+    """
+    existing = lookup(keys)
+    missing = [k for k in keys if k not in existing]
+    if missing:
+        model.objects.bulk_create([build(k) for k in missing], ignore_conflicts=True)
+        existing.update(lookup(missing))
+        if created is not None:
+            created.extend(missing)
+    return existing
+
+
+def _import_chunk(rows, cache):
+    """Write one chunk of cleaned rows; ``cache`` remembers parent ids across chunks."""
+    names = {}
+    for row in rows:
+        names.setdefault(('b', row['building_code']), row['building_name'] or row['building_code'])
+        names.setdefault(('f', row['building_code'], row['floor_number']), row['floor_name'])
+        names.setdefault(('r', row['building_code'], row['floor_number'], row['room_code']), row['room_name'])
+
+    buildings = cache.setdefault('buildings', {})
+    todo = {row['building_code'] for row in rows} - set(buildings)
+    if todo:
+        versions.bump(versions.CAMPUS, versions.TREE_ALL)
+        buildings.update(_ensure(
+            Building, todo,
+            lambda code: Building(code=code, name=names[('b', code)]),
+            lambda codes: dict(Building.objects.filter(code__in=codes).values_list('code', 'pk')),
+        ))
+
+    floors = cache.setdefault('floors', {})
+    todo = created_floors = {(buildings[row['building_code']], row['floor_number']) for row in rows} - set(floors)
+    if todo:
+        codes = {pk: code for code, pk in buildings.items()}
+        floors.update(_ensure(
+            Floor, todo,
+            lambda k: Floor(building_id=k[0], number=k[1], name=names[('f', codes[k[0]], k[1])]),
+            lambda keys: {
+                (b, n): pk for b, n, pk in Floor.objects.filter(
+                    building_id__in={b for b, _ in keys}, number__in={n for _, n in keys}
+                ).values_list('building_id', 'number', 'pk') if (b, n) in keys
+            },
+        ))
+
+    rooms = cache.setdefault('rooms', {})
+    todo = created_rooms = {
+        (floors[(buildings[row['building_code']], row['floor_number'])], row['room_code']) for row in rows
+    } - set(rooms)
+    if todo:
+        floor_keys = {pk: key for key, pk in floors.items()}
+        codes = {pk: code for code, pk in buildings.items()}
+        new_rooms = []
+        rooms.update(_ensure(
+            Room, todo,
+            lambda k: Room(floor_id=k[0], code=k[1], name=names[(
+                'r', codes[floor_keys[k[0]][0]], floor_keys[k[0]][1], k[1])]),
+            lambda keys: {
+                (f, c): pk for f, c, pk in Room.objects.filter(
+                    floor_id__in={f for f, _ in keys}, code__in={c for _, c in keys}
+                ).values_list('floor_id', 'code', 'pk') if (f, c) in keys
+            },
+            new_rooms,
+        ))
+        if new_rooms:
+            # bulk_create skips Room.save(): fill the labels of the new rooms in one UPDATE
+            Room.objects.filter(pk__in=[rooms[k] for k in new_rooms]).refresh_location_path()
+
+    # bulk inserts skip the signals: new floors and rooms change their parents' lists
+    versions.bump(versions.BUILDING, *{b for b, _ in created_floors})
+    versions.bump(versions.FLOOR, *{f for f, _ in created_rooms})
+
+    # last row wins when a device appears twice in the same chunk
+    equipments = {}
+    for row in rows:
+        room_id = rooms[(floors[(buildings[row['building_code']], row['floor_number'])], row['room_code'])]
+        equipments[(room_id, row['equipment_code'])] = Equipment(
+            room_id=room_id, code=row['equipment_code'], name=row['equipment_name'],
+            description=row['description'], status=row['status'],
+        )
+    Equipment.objects.bulk_create(
+        equipments.values(), counters=False,
+        update_conflicts=True, unique_fields=['room', 'code'],
+        update_fields=['name', 'description', 'status'],
+    )
+    return len(rows)
+
+
+def import_inventory(rows, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """Import ``(line, row dict)`` pairs; returns an :class:`ImportResult`.
+
+    ``progress(result)`` is called after every committed chunk. Status counters are
+    rebuilt once at the end rather than per chunk.
+    """
+    result = ImportResult()
+    cache = {}
+    chunk = []
+
+    def flush():
+        with transaction.atomic():
+            result.imported += _import_chunk(chunk, cache)
+        chunk.clear()
+        if progress:
+            progress(result)
+
+    try:
+        for line, row in rows:
+            result.rows += 1
+            try:
+                chunk.append(clean_row(row))
+            except ValueError as e:
+                result.rejected.append((line, str(e)))
+                continue
+            if len(chunk) >= chunk_size:
+                flush()
+        if chunk:
+            flush()
+    finally:
+        EquipmentStatusCounter.rebuild()
+        FloorStats.rebuild()
+    return result
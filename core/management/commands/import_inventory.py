@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.inventory import DEFAULT_CHUNK_SIZE, import_inventory, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Import buildings, floors, rooms and equipment from a CSV or XLSX file (upserts equipment on room + code).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='.csv (UTF-8) or .xlsx file with a header row')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='rows written per transaction (default %(default)s)')
+
+    def handle(self, *args, **options):
+        path = options['file']
+
+        def progress(result):
+            self.stdout.write(f'  {result.imported} rows imported...')
+
+        try:
+            with open(path, 'rb') as f:
+                result = import_inventory(read_rows(f, path), options['chunk_size'], progress)
+        except (OSError, ValueError) as e:
+            raise CommandError(e)
+
+        for line, reason in result.rejected:
+            self.stderr.write(f'  line {line}: {reason}')
+        self.stdout.write(self.style.SUCCESS(f'Import finished: {result}.'))
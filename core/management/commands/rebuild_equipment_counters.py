@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core.models import EquipmentStatusCounter
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized equipment status counters from the Equipment table.'
+
+    def handle(self, *args, **options):
+        EquipmentStatusCounter.rebuild()
+        total = EquipmentStatusCounter.for_building()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {EquipmentStatusCounter.objects.count()} counter rows '
+            f'({total.total} equipment: {total.as_dict()}).'
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Refill the SQLite full-text search index from the equipment, room and maintenance request tables.'
+
+    def handle(self, *args, **options):
+        rows = rebuild_index()
+        if rows is None:
+            self.stdout.write('No full-text index on this database backend; search uses LIKE queries.')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Indexed {rows} rows.'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from core.models import BuildingStats, FloorStats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-floor and per-building operational statistics from the source tables.'
+
+    def handle(self, *args, **options):
+        FloorStats.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {FloorStats.objects.count()} floor and {BuildingStats.objects.count()} building rows.'
+        ))
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from core.bookings import expire_bookings, reconcile_room_status
+from core.models import RoomBooking
+
+
+class Command(BaseCommand):
+    help = ('Expire finished room bookings (approved -> completed, pending -> rejected) '
+            'and recompute Room.status. Runs forever unless --once is given.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=30,
+                            help='Seconds to sleep between passes (default: 30).')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Bookings updated per transaction (default: 500).')
+        parser.add_argument('--once', action='store_true',
+                            help='Run a single pass and exit, e.g. from cron.')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                self.run_pass(options['batch_size'])
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+    def run_pass(self, batch_size):
+        # long-running process: drop connections that went stale between passes
+        close_old_connections()
+        now = timezone.now()
+        expired = expire_bookings(now=now, batch_size=batch_size)
+        freed, occupied = reconcile_room_status(now=now)
+        close_old_connections()
+        self.stdout.write(
+            f'{now:%Y-%m-%d %H:%M:%S} completed={expired[RoomBooking.STATUS_APPROVED]} '
+            f'rejected={expired[RoomBooking.STATUS_PENDING]} '
+            f'rooms_ready={freed} rooms_occupied={occupied}'
+        )
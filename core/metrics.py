@@ -0,0 +1,213 @@
+"""Per-view request metrics in the Prometheus text format.
+
+:class:`MetricsMiddleware` times every request, counts its SQL queries and the
+time spent in them (``connection.execute_wrapper``), and records the response
+size, keyed by the resolved URL name. Values go into fixed-bucket histograms,
+so memory depends only on the number of URL names, never on traffic.
+:func:`metrics_view` serves them at ``/metrics`` once ``METRICS_ENABLED`` is set,
+to the addresses in ``METRICS_ALLOWED_IPS`` or to holders of ``METRICS_TOKEN``.
+
+The counters live in the process: with several worker processes each one
+reports its own numbers, which Prometheus sums per instance.
+"""
+import hmac
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+
+PREFIX = 'facility'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DB_TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+# requests that did not resolve to a named route (404s, scanners) share one label
+UNMATCHED = 'unmatched'
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def render(self, name, labels):
+        total = 0
+        for le, n in zip((*self.buckets, '+Inf'), self.counts):
+            total += n
+            yield f'{name}_bucket{{{labels},le="{le}"}} {total}'
+        yield f'{name}_sum{{{labels}}} {self.sum:g}'
+        yield f'{name}_count{{{labels}}} {total}'
+
+
+class ViewStats:
+    __slots__ = ('responses', 'queries_total', 'latency', 'db_time', 'queries', 'size')
+
+    def __init__(self):
+        self.responses = {}  # (method, status) -> count
+        self.queries_total = 0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.db_time = Histogram(DB_TIME_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.size = Histogram(SIZE_BUCKETS)
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def reset(self):
+        with self._lock:
+            self._views = {}
+
+    def observe(self, view, method, status, seconds, queries=None, db_seconds=None, size=None):
+        method = method if method in METHODS else 'OTHER'
+        with self._lock:
+            stats = self._views.get(view)
+            if stats is None:
+                stats = self._views[view] = ViewStats()
+            key = (method, status)
+            stats.responses[key] = stats.responses.get(key, 0) + 1
+            stats.latency.observe(seconds)
+            if queries is not None:
+                stats.queries_total += queries
+                stats.queries.observe(queries)
+                stats.db_time.observe(db_seconds)
+            if size is not None:
+                stats.size.observe(size)
+
+    def render(self):
+        with self._lock:
+            views = sorted(self._views.items())
+            lines = []
+            families = (
+                ('http_requests_total', 'counter', 'Responses by view, method and status code.'),
+                ('http_request_duration_seconds', 'histogram', 'Time from request to response headers.'),
+                ('db_queries_total', 'counter', 'SQL queries run by the view.'),
+                ('db_queries_per_request', 'histogram', 'SQL queries per request.'),
+                ('db_duration_seconds', 'histogram', 'Time spent in SQL per request.'),
+                ('http_response_size_bytes', 'histogram', 'Response body size (streamed bodies excluded).'),
+            )
+            for family, kind, help_text in families:
+                name = f'{PREFIX}_{family}'
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+                for view, stats in views:
+                    labels = f'view="{view}"'
+                    if family == 'http_requests_total':
+                        lines += [f'{name}{{{labels},method="{m}",status="{s}"}} {n}'
+                                  for (m, s), n in sorted(stats.responses.items())]
+                    elif family == 'db_queries_total':
+                        lines.append(f'{name}{{{labels}}} {stats.queries_total}')
+                    else:
+                        histogram = {
+                            'http_request_duration_seconds': stats.latency,
+                            'db_queries_per_request': stats.queries,
+                            'db_duration_seconds': stats.db_time,
+                            'http_response_size_bytes': stats.size,
+                        }[family]
+                        lines += histogram.render(name, labels)
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class _QueryTimer:
+    """``execute_wrapper`` hook adding up the queries of one request."""
+    __slots__ = ('queries', 'seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.queries += 1
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return (match.view_name if match else None) or UNMATCHED
+
+
+def _size(response):
+    return None if response.streaming else len(response.content)
+
+
+class MetricsMiddleware:
+    """Records every request in :data:`registry`.
+
+    Under ASGI the async ORM runs a request's queries in that request's
+    thread-sensitive worker thread, so the query hooks are installed there.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timer = _QueryTimer()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            self._hook(stack, timer)
+            response = self.get_response(request)
+        registry.observe(_view_name(request), request.method, response.status_code,
+                         time.perf_counter() - start, timer.queries, timer.seconds, _size(response))
+        return response
+
+    async def __acall__(self, request):
+        timer = _QueryTimer()
+        start = time.perf_counter()
+        stack = ExitStack()
+        await sync_to_async(self._hook)(stack, timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        registry.observe(_view_name(request), request.method, response.status_code,
+                         time.perf_counter() - start, timer.queries, timer.seconds, _size(response))
+        return response
+
+    @staticmethod
+    def _hook(stack, timer):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timer))
+
+
+def _metrics_allowed(request):
+    if request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS:
+        return True
+    token = settings.METRICS_TOKEN
+    header = request.headers.get('Authorization', '')
+    return bool(token) and hmac.compare_digest(header.encode(), f'Bearer {token}'.encode())
+
+
+def metrics_view(request):
+    """Serve the registry; off unless ``METRICS_ENABLED``, then IP- or token-gated."""
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    if not _metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
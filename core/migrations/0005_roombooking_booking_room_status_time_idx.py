@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_room_status_roombooking'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='roombooking',
+            index=models.Index(fields=['room', 'status', 'start_time', 'end_time'], name='booking_room_status_time_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:51
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    Equipment = apps.get_model('core', 'Equipment')
+    EquipmentStatusCounter = apps.get_model('core', 'EquipmentStatusCounter')
+    counters = {'all': EquipmentStatusCounter(key='all')}
+    rows = Equipment.objects.order_by().values_list('room__floor__building_id', 'status').annotate(n=Count('pk'))
+    for building_id, status, n in rows:
+        for key in ('all', f'building:{building_id}'):
+            counter = counters.setdefault(key, EquipmentStatusCounter(key=key))
+            setattr(counter, status, getattr(counter, status) + n)
+    EquipmentStatusCounter.objects.bulk_create(counters.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EquipmentStatusCounter',
+            fields=[
+                ('key', models.CharField(max_length=30, primary_key=True, serialize=False)),
+                ('ready', models.IntegerField(default=0)),
+                ('maint', models.IntegerField(default=0)),
+                ('broken', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:06
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_location_paths(apps, schema_editor):
+    # same text as Room.build_location_path(); historical models have no custom methods
+    Room = apps.get_model('core', 'Room')
+    Equipment = apps.get_model('core', 'Equipment')
+    rooms = Room.objects.select_related('floor__building').only(
+        'code', 'name', 'floor__number', 'floor__name', 'floor__building__code', 'floor__building__name')
+    batch = []
+    for room in rooms.iterator(chunk_size=2000):
+        floor, building = room.floor, room.floor.building
+        floor_part = floor.name if floor.name else f"Tầng {floor.number}"
+        room.location_path = f"{building.code} — {building.name} — {floor_part} — {f'{room.code} {room.name}'.strip()}"
+        batch.append(room)
+        if len(batch) >= 2000:
+            Room.objects.bulk_update(batch, ['location_path'])
+            batch = []
+    Room.objects.bulk_update(batch, ['location_path'])
+    Equipment.objects.update(location_path=Subquery(
+        Room.objects.filter(pk=OuterRef('room_id')).values('location_path')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_equipment_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipment',
+            name='location_path',
+            field=models.CharField(blank=True, editable=False, max_length=800),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='location_path',
+            field=models.CharField(blank=True, editable=False, max_length=800),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['location_path'], name='equipment_location_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['location_path'], name='room_location_idx'),
+        ),
+        migrations.RunPython(fill_location_paths, migrations.RunPython.noop),
+    ]
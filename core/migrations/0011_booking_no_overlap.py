@@ -0,0 +1,67 @@
+from django.db import migrations
+
+# Active (pending or approved) bookings of a room must not overlap. The check in
+# core.bookings.admit_booking is the fast path; this guard makes the database
+# refuse a double booking whatever code path writes it.
+
+SQLITE_GUARD = [
+    """
+    CREATE TRIGGER booking_no_overlap_insert
+    BEFORE INSERT ON core_roombooking
+    WHEN NEW.status IN ('pending', 'approved')
+    BEGIN
+        SELECT RAISE(ABORT, 'booking_no_overlap') FROM core_roombooking
+        WHERE room_id = NEW.room_id AND status IN ('pending', 'approved')
+          AND start_time < NEW.end_time AND end_time > NEW.start_time;
+    END
+    """,
+    """
+    CREATE TRIGGER booking_no_overlap_update
+    BEFORE UPDATE OF room_id, start_time, end_time, status ON core_roombooking
+    WHEN NEW.status IN ('pending', 'approved')
+    BEGIN
+        SELECT RAISE(ABORT, 'booking_no_overlap') FROM core_roombooking
+        WHERE room_id = NEW.room_id AND status IN ('pending', 'approved') AND id != NEW.id
+          AND start_time < NEW.end_time AND end_time > NEW.start_time;
+    END
+    """,
+]
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS booking_no_overlap_insert',
+    'DROP TRIGGER IF EXISTS booking_no_overlap_update',
+]
+
+POSTGRESQL_GUARD = [
+    'CREATE EXTENSION IF NOT EXISTS btree_gist',
+    """
+    ALTER TABLE core_roombooking ADD CONSTRAINT booking_no_overlap
+    EXCLUDE USING gist (room_id WITH =, tstzrange(start_time, end_time) WITH &&)
+    WHERE (status IN ('pending', 'approved'))
+    """,
+]
+POSTGRESQL_DROP = [
+    'ALTER TABLE core_roombooking DROP CONSTRAINT IF EXISTS booking_no_overlap',
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+    """Note: SQLite drops triggers when Django rebuilds a table, so a later
+    migration that remakes core_roombooking must create the triggers again."""
+
+    dependencies = [
+        ('core', '0010_location_path'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_GUARD, 'postgresql': POSTGRESQL_GUARD}),
+            _run({'sqlite': SQLITE_DROP, 'postgresql': POSTGRESQL_DROP}),
+        ),
+    ]
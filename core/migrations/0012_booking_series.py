@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_booking_no_overlap'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('purpose', models.TextField(verbose_name='Mục đích sử dụng')),
+                ('start_time', models.DateTimeField(verbose_name='Buổi đầu tiên bắt đầu')),
+                ('end_time', models.DateTimeField(verbose_name='Buổi đầu tiên kết thúc')),
+                ('frequency', models.CharField(choices=[('daily', 'Hằng ngày'), ('weekly', 'Hằng tuần')], default='weekly', max_length=10, verbose_name='Lặp lại')),
+                ('until', models.DateField(blank=True, null=True, verbose_name='Lặp đến ngày')),
+                ('count', models.PositiveIntegerField(blank=True, null=True, verbose_name='Số buổi')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_series', to='core.room')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_series', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='roombooking',
+            name='series',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='core.bookingseries'),
+        ),
+    ]
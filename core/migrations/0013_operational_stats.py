@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+COUNTS = ('ready', 'maint', 'broken', 'open_requests', 'rooms', 'occupied_rooms')
+
+
+def fill_stats(apps, schema_editor):
+    # same numbers as FloorStats.rebuild(), which historical models do not have
+    def get(name):
+        return apps.get_model('core', name)
+
+    FloorStats, BuildingStats = get('FloorStats'), get('BuildingStats')
+    floors = {
+        pk: FloorStats(floor_id=pk, building_id=building_id, label=name or f'Tầng {number}')
+        for pk, building_id, number, name in get('Floor').objects.values_list('pk', 'building_id', 'number', 'name')
+    }
+    equipment = get('Equipment').objects.order_by().values_list('room__floor_id', 'status').annotate(n=Count('pk'))
+    for floor_id, status, n in equipment:
+        setattr(floors[floor_id], status, n)
+    requests = get('MaintenanceRequest').objects.order_by().filter(
+        status__in=['pending', 'in_progress'], equipment__isnull=False,
+    ).values_list('equipment__room__floor_id').annotate(n=Count('pk'))
+    for floor_id, n in requests:
+        floors[floor_id].open_requests = n
+    rooms = get('Room').objects.order_by().values_list('floor_id').annotate(
+        n=Count('pk'), occupied=Count('pk', filter=Q(status='occupied')))
+    for floor_id, n, occupied in rooms:
+        floors[floor_id].rooms, floors[floor_id].occupied_rooms = n, occupied
+    FloorStats.objects.bulk_create(floors.values(), batch_size=1000)
+
+    buildings = {pk: BuildingStats(building_id=pk, label=f'{code} - {name}')
+                 for pk, code, name in get('Building').objects.values_list('pk', 'code', 'name')}
+    for values in FloorStats.objects.order_by().values('building_id').annotate(**{c: Sum(c) for c in COUNTS}):
+        row = buildings[values.pop('building_id')]
+        for column, n in values.items():
+            setattr(row, column, n)
+    BuildingStats.objects.bulk_create(buildings.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_booking_series'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BuildingStats',
+            fields=[
+                ('label', models.CharField(blank=True, max_length=300)),
+                ('ready', models.IntegerField(default=0)),
+                ('maint', models.IntegerField(default=0)),
+                ('broken', models.IntegerField(default=0)),
+                ('open_requests', models.IntegerField(default=0)),
+                ('rooms', models.IntegerField(default=0)),
+                ('occupied_rooms', models.IntegerField(default=0)),
+                ('building', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='core.building')),
+            ],
+            options={
+                'ordering': ['label'],
+            },
+        ),
+        migrations.CreateModel(
+            name='FloorStats',
+            fields=[
+                ('label', models.CharField(blank=True, max_length=300)),
+                ('ready', models.IntegerField(default=0)),
+                ('maint', models.IntegerField(default=0)),
+                ('broken', models.IntegerField(default=0)),
+                ('open_requests', models.IntegerField(default=0)),
+                ('rooms', models.IntegerField(default=0)),
+                ('occupied_rooms', models.IntegerField(default=0)),
+                ('floor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='core.floor')),
+                ('building', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='floor_stats', to='core.building')),
+            ],
+            options={
+                'ordering': ['floor_id'],
+            },
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
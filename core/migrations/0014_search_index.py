@@ -0,0 +1,115 @@
+from django.db import migrations
+
+# Full-text index over equipment, rooms and maintenance requests for core.search.
+# One FTS5 table holds all three kinds so their results rank against each other;
+# rowid is ``id * 4 + kind`` (1 equipment, 2 room, 3 maintenance request).
+# unicode61 with remove_diacritics 2 matches "may chieu" to "máy chiếu"; "đ" is a
+# letter of its own rather than an accented "d", so ``folded`` holds the same
+# text with đ -> d for queries typed without it. Triggers keep the table in step
+# with every write, bulk and raw SQL included. Other backends have no index and
+# core.search falls back to LIKE queries.
+
+TABLE = 'core_search'
+
+# kind -> (rowid offset, table, SELECT of object_id/title/body/location)
+SOURCES = {
+    'equipment': (1, 'core_equipment', """
+        SELECT id AS object_id, code || ' ' || name AS title, description AS body, location_path AS location
+        FROM core_equipment
+    """),
+    'room': (2, 'core_room', """
+        SELECT id AS object_id, trim(code || ' ' || name) AS title, '' AS body, location_path AS location
+        FROM core_room
+    """),
+    'request': (3, 'core_maintenancerequest', """
+        SELECT r.id AS object_id, coalesce(e.code || ' ' || e.name, '') AS title,
+               trim(r.description || ' ' || r.note) AS body, coalesce(e.location_path, '') AS location
+        FROM core_maintenancerequest r LEFT JOIN core_equipment e ON e.id = r.equipment_id
+    """),
+}
+# columns whose change re-indexes the row
+INDEXED_COLUMNS = {
+    'equipment': 'code, name, description, location_path',
+    'room': 'code, name, location_path',
+    'request': 'equipment_id, description, note',
+}
+
+
+def insert(kind, where=''):
+    offset, _, select = SOURCES[kind]
+    return f"""
+        INSERT INTO {TABLE}(rowid, kind, object_id, title, body, location, folded)
+        SELECT object_id * 4 + {offset}, '{kind}', object_id, title, body, location,
+               replace(replace(title || ' ' || body || ' ' || location, 'đ', 'd'), 'Đ', 'D')
+        FROM ({select}) {where}
+    """
+
+
+def _triggers(kind):
+    offset, table, _ = SOURCES[kind]
+    refresh = f"""
+        DELETE FROM {TABLE} WHERE rowid = OLD.id * 4 + {offset};
+        {insert(kind, 'WHERE object_id = NEW.id')};
+    """
+    if kind == 'equipment':
+        # the requests of the equipment show its code, name and location
+        refresh += f"""
+        DELETE FROM {TABLE} WHERE rowid IN (SELECT id * 4 + 3 FROM core_maintenancerequest WHERE equipment_id = NEW.id);
+        {insert('request', 'WHERE object_id IN (SELECT id FROM core_maintenancerequest WHERE equipment_id = NEW.id)')};
+        """
+    return [
+        f"""
+        CREATE TRIGGER search_{kind}_insert AFTER INSERT ON {table} BEGIN
+            {insert(kind, 'WHERE object_id = NEW.id')};
+        END
+        """,
+        f"""
+        CREATE TRIGGER search_{kind}_update AFTER UPDATE OF {INDEXED_COLUMNS[kind]} ON {table} BEGIN
+            {refresh}
+        END
+        """,
+        f"""
+        CREATE TRIGGER search_{kind}_delete AFTER DELETE ON {table} BEGIN
+            DELETE FROM {TABLE} WHERE rowid = OLD.id * 4 + {offset};
+        END
+        """,
+    ]
+
+
+SQLITE_INDEX = [
+    f"""
+    CREATE VIRTUAL TABLE {TABLE} USING fts5(
+        kind UNINDEXED, object_id UNINDEXED, title, body, location, folded,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )
+    """,
+    *(sql for kind in SOURCES for sql in _triggers(kind)),
+]
+# also used by ``manage.py rebuild_search_index``
+SQLITE_FILL = [f'DELETE FROM {TABLE}', *(insert(kind) for kind in SOURCES), f"INSERT INTO {TABLE}({TABLE}) VALUES ('optimize')"]
+SQLITE_DROP = [
+    *(f'DROP TRIGGER IF EXISTS search_{kind}_{event}' for kind in SOURCES for event in ('insert', 'update', 'delete')),
+    f'DROP TABLE IF EXISTS {TABLE}',
+]
+
+
+def _run(*statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'sqlite':
+            for sql in (sql for group in statements for sql in group):
+                schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+    """Note: SQLite drops triggers when Django rebuilds a table, so a later
+    migration that remakes core_equipment, core_room or core_maintenancerequest
+    must create the triggers again."""
+
+    dependencies = [
+        ('core', '0013_operational_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(SQLITE_INDEX, SQLITE_FILL), _run(SQLITE_DROP)),
+    ]
@@ -1,5 +1,12 @@
-from django.db import models
+from collections import Counter
+
+from django.db import models, transaction
+from django.db.models import CharField, Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Concat, NullIf, Trim
 from django.conf import settings
+from django.core.exceptions import ValidationError
+
+from . import versions
 
 
 class Building(models.Model):
@@ -10,6 +17,15 @@ class Building(models.Model):
     def __str__(self):
         return f"{self.code} - {self.name}"
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            old = None
+            if not self._state.adding:
+                old = Building.objects.filter(pk=self.pk).values_list('code', 'name').first()
+            super().save(*args, **kwargs)
+            if old and old != (self.code, self.name):
+                Room.objects.filter(floor__building=self).refresh_location_path()
+
 
 class Floor(models.Model):
     building = models.ForeignKey(Building, on_delete=models.CASCADE, related_name='floors')
@@ -24,6 +40,70 @@ class Floor(models.Model):
         floor_part = self.name if self.name else f"Tầng {self.number}"
         return f"{building_part} — {floor_part}"
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            old = None
+            if not self._state.adding:
+                old = Floor.objects.filter(pk=self.pk).values_list('building_id', 'number', 'name').first()
+            super().save(*args, **kwargs)
+            if old and old != (self.building_id, self.number, self.name):
+                Room.objects.filter(floor=self).refresh_location_path()
+
+
+# longest code/name parts of building, floor and room plus the separators
+LOCATION_PATH_LENGTH = 800
+
+
+class RoomQuerySet(models.QuerySet):
+    """Keeps :class:`FloorStats`, :class:`EquipmentStatusCounter` and the hierarchy version stamps
+    in sync when a bulk write changes ``status`` or ``floor``; it bypasses ``save()`` and the
+    model signals."""
+
+    def update(self, **kwargs):
+        # bulk_update() also ends up here, once per batch
+        if not {'status', 'floor', 'floor_id'} & set(kwargs):
+            return super().update(**kwargs)
+        moving = 'floor' in kwargs or 'floor_id' in kwargs
+        with transaction.atomic(using=self.db):
+            floor_ids = set(self.order_by().values_list('floor_id', flat=True).distinct())
+            if moving:
+                touched = self.model.objects.filter(pk__in=list(self.values_list('pk', flat=True)))
+            rows = super().update(**kwargs)
+            if not rows:
+                return rows
+            if moving:
+                floor_ids.update(touched.order_by().values_list('floor_id', flat=True).distinct())
+                touched.refresh_location_path()
+            building_ids = set(Floor.objects.filter(pk__in=floor_ids).values_list('building_id', flat=True))
+            # the touched floors are recomputed, not patched
+            FloorStats.refresh(floor_ids)
+            if moving:
+                EquipmentStatusCounter.refresh(building_ids)
+            versions.bump(versions.FLOOR, *floor_ids)
+            versions.bump_tree(*building_ids)
+        return rows
+
+    def refresh_location_path(self):
+        """Recompute ``location_path`` of these rooms and of their equipment, in two UPDATEs.
+
+        Same text as :meth:`Room.build_location_path`, built by the database so a
+        building or floor rename costs two statements however many rows it touches.
+        """
+        floor_label = Concat(
+            'building__code', Value(' — '), 'building__name', Value(' — '),
+            Coalesce(NullIf('name', Value('')), Concat(Value('Tầng '), 'number')),
+            output_field=CharField(),
+        )
+        floor = Floor.objects.filter(pk=OuterRef('floor_id')).values(label=floor_label)[:1]
+        with transaction.atomic(using=self.db):
+            rows = self.update(location_path=Concat(
+                Subquery(floor), Value(' — '), Trim(Concat('code', Value(' '), 'name')), output_field=CharField(),
+            ))
+            Equipment.objects.filter(room__in=self).update(location_path=Subquery(
+                Room.objects.filter(pk=OuterRef('room_id')).values('location_path')[:1]
+            ))
+        return rows
+
 
 class Room(models.Model):
     ROOM_READY = 'ready'
@@ -44,14 +124,115 @@ class Room(models.Model):
         choices=ROOM_STATUS_CHOICES,
         default=ROOM_READY
     )
+    # "building — floor — room" label, kept by save() and RoomQuerySet.refresh_location_path()
+    location_path = models.CharField(max_length=LOCATION_PATH_LENGTH, blank=True, editable=False)
+
+    objects = RoomQuerySet.as_manager()
 
     class Meta:
         unique_together = ('floor', 'code')
+        indexes = [
+            models.Index(fields=['location_path'], name='room_location_idx'),
+        ]
 
     def __str__(self):
-        floor_label = str(self.floor)
+        return self.location_path or self.build_location_path()
+
+    def build_location_path(self):
+        floor = self.floor
+        if not Floor.building.is_cached(floor):
+            floor = Floor.objects.select_related('building').get(pk=self.floor_id)
         room_label = f"{self.code} {self.name}".strip()
-        return f"{floor_label} — {room_label}"
+        return f"{floor} — {room_label}"
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not {'floor', 'floor_id', 'code', 'name'} & set(update_fields):
+            return super().save(*args, **kwargs)
+        old_path = self.location_path
+        self.location_path = self.build_location_path()
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'location_path'}
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if old_path and old_path != self.location_path:
+                Equipment.objects.filter(room=self).update(location_path=self.location_path)
+
+
+class EquipmentQuerySet(models.QuerySet):
+    """Keeps :class:`EquipmentStatusCounter`, :class:`FloorStats` and the hierarchy version stamps
+    in sync on bulk writes, which bypass ``save()`` and the model signals."""
+
+    def update(self, **kwargs):
+        # bulk_update() also ends up here, once per batch
+        room = kwargs.get('room', kwargs.get('room_id'))
+        status = kwargs.get('status')
+        if room is None and status is None:
+            return super().update(**kwargs)
+        building_id = floor_id = None
+        if room is not None and not hasattr(room, 'resolve_expression'):
+            building_id, floor_id, kwargs['location_path'] = Room.objects.filter(
+                pk=getattr(room, 'pk', room)).values_list('floor__building_id', 'floor_id', 'location_path').first() \
+                or (None, None, '')
+
+        with transaction.atomic(using=self.db):
+            before = EquipmentStatusCounter.distribution(self)
+            # floor stats of the touched floors are recomputed, not patched
+            floor_ids = {floor_id, *self.order_by().values_list('room__floor_id', flat=True).distinct()}
+            room_ids = set(self.order_by().values_list('room_id', flat=True).distinct())
+            building_ids = {building_id for building_id, _ in before}
+            if hasattr(room, 'resolve_expression') or hasattr(status, 'resolve_expression'):
+                # new values only known to the database: count the same rows again afterwards
+                touched = self.model.objects.filter(pk__in=list(self.values_list('pk', flat=True)))
+                rows = super().update(**kwargs)
+                if hasattr(room, 'resolve_expression'):
+                    touched.update(location_path=Subquery(
+                        Room.objects.filter(pk=OuterRef('room_id')).values('location_path')[:1]
+                    ))
+                deltas = EquipmentStatusCounter.distribution(touched)
+                versions.bump(versions.ROOM, *room_ids, *touched.order_by().values_list('room_id', flat=True).distinct())
+                versions.bump_tree(*building_ids, *{building_id for building_id, _ in deltas})
+                deltas.subtract(before)
+                EquipmentStatusCounter.apply(deltas)
+                FloorStats.refresh(floor_ids.union(touched.order_by().values_list('room__floor_id', flat=True)))
+                return rows
+
+            rows = super().update(**kwargs)
+            versions.bump(versions.ROOM, *room_ids, getattr(room, 'pk', room))
+            versions.bump_tree(*building_ids, building_id)
+            deltas = Counter()
+            for (old_building, old_status), n in before.items():
+                deltas[(old_building, old_status)] -= n
+                deltas[(building_id or old_building, status or old_status)] += n
+            EquipmentStatusCounter.apply(deltas)
+            FloorStats.refresh(floor_ids)
+        return rows
+
+    def bulk_create(self, objs, *args, counters=True, **kwargs):
+        """``counters=False`` skips the status counters and floor stats, for callers that
+        rebuild them once after a large batch of upserts (see core.inventory)."""
+        objs = list(objs)
+        with transaction.atomic(using=self.db):
+            rooms = {pk: (building_id, floor_id, path) for pk, building_id, floor_id, path in Room.objects.filter(
+                pk__in={o.room_id for o in objs}).values_list('pk', 'floor__building_id', 'floor_id', 'location_path')}
+            for obj in objs:
+                if not obj.location_path and obj.room_id in rooms:
+                    obj.location_path = rooms[obj.room_id][2]
+            objs = super().bulk_create(objs, *args, **kwargs)
+            buildings = {pk: building_id for pk, (building_id, _, _) in rooms.items()}
+            floors = {pk: floor_id for pk, (_, floor_id, _) in rooms.items()}
+            versions.bump(versions.ROOM, *buildings)
+            versions.bump_tree(*buildings.values())
+            if not counters:
+                return objs
+            if kwargs.get('update_conflicts') or kwargs.get('ignore_conflicts'):
+                # cannot tell inserted rows from updated/skipped ones
+                EquipmentStatusCounter.rebuild()
+                FloorStats.refresh(floors.values())
+            else:
+                EquipmentStatusCounter.apply(Counter((buildings[o.room_id], o.status) for o in objs))
+                FloorStats.apply(Counter((floors[o.room_id], o.status) for o in objs))
+        return objs
 
 
 class Equipment(models.Model):
@@ -70,12 +251,170 @@ class Equipment(models.Model):
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_READY)
+    # copy of room.location_path
+    location_path = models.CharField(max_length=LOCATION_PATH_LENGTH, blank=True, editable=False)
+
+    objects = EquipmentQuerySet.as_manager()
 
     class Meta:
         unique_together = ('room', 'code')
+        indexes = [
+            models.Index(fields=['status'], name='equipment_status_idx'),
+            # prefix search in api_equipment_search
+            models.Index(fields=['code'], name='equipment_code_idx'),
+            models.Index(fields=['name'], name='equipment_name_idx'),
+            models.Index(fields=['location_path'], name='equipment_location_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.code} - {self.name} ({self.room})"
+        return f"{self.code} - {self.name} ({self.location_path or self.room})"
+
+    def save(self, *args, **kwargs):
+        # the counter update commits or rolls back together with the row;
+        # deletions are counted by the post_delete receiver in core.signals
+        with transaction.atomic():
+            old = None
+            if not self._state.adding:
+                old = Equipment.objects.filter(pk=self.pk).values_list('room_id', 'status').first()
+            if not old or old[0] != self.room_id or not self.location_path:
+                self.location_path = self.room.location_path
+                if kwargs.get('update_fields') is not None:
+                    kwargs['update_fields'] = {*kwargs['update_fields'], 'location_path'}
+            super().save(*args, **kwargs)
+            if old != (self.room_id, self.status):
+                deltas, stats = Counter(), Counter()
+                rooms = {pk: (building_id, floor_id) for pk, building_id, floor_id in Room.objects.filter(
+                    pk__in={self.room_id, old[0] if old else None}
+                ).values_list('pk', 'floor__building_id', 'floor_id')}
+                building_id, floor_id = rooms[self.room_id]
+                if old:
+                    old_building, old_floor = rooms.get(old[0], (None, None))
+                    deltas[(old_building, old[1])] -= 1
+                    stats[(old_floor, old[1])] -= 1
+                    if old_floor != floor_id:
+                        # its open requests move along
+                        moved = self.requests.filter(status__in=MaintenanceRequest.OPEN_STATUSES).count()
+                        stats[(old_floor, 'open_requests')] -= moved
+                        stats[(floor_id, 'open_requests')] += moved
+                deltas[(building_id, self.status)] += 1
+                stats[(floor_id, self.status)] += 1
+                EquipmentStatusCounter.apply(deltas)
+                FloorStats.apply(stats)
+
+
+class EquipmentStatusCounter(models.Model):
+    """Denormalized equipment counts per status.
+
+    One row for the whole campus (``GLOBAL_KEY``) and one per building, so the
+    dashboard reads its numbers with a single primary-key lookup. Kept in sync by
+    ``Equipment.save``, ``EquipmentQuerySet`` and the receivers in core.signals; run
+    ``manage.py rebuild_equipment_counters`` to repair any drift.
+    """
+    GLOBAL_KEY = 'all'
+
+    key = models.CharField(max_length=30, primary_key=True)
+    # one column per Equipment.STATUS_* value
+    ready = models.IntegerField(default=0)
+    maint = models.IntegerField(default=0)
+    broken = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.key}: {self.as_dict()}"
+
+    @property
+    def total(self):
+        return self.ready + self.maint + self.broken
+
+    def as_dict(self):
+        return {'ready': self.ready, 'maint': self.maint, 'broken': self.broken}
+
+    @staticmethod
+    def building_key(building_id):
+        return f'building:{building_id}'
+
+    @classmethod
+    def for_building(cls, building_id=None):
+        """Counter row for a building, or the global one; zeros if it does not exist yet."""
+        key = cls.GLOBAL_KEY if building_id is None else cls.building_key(building_id)
+        return cls.objects.filter(pk=key).first() or cls(key=key)
+
+    @classmethod
+    async def afor_building(cls, building_id=None):
+        """Async :meth:`for_building`."""
+        key = cls.GLOBAL_KEY if building_id is None else cls.building_key(building_id)
+        return await cls.objects.filter(pk=key).afirst() or cls(key=key)
+
+    @staticmethod
+    def distribution(equipments):
+        """``Counter`` of ``(building_id, status) -> rows`` for an Equipment queryset."""
+        rows = equipments.order_by().values_list('room__floor__building_id', 'status').annotate(n=Count('pk'))
+        return Counter({(building_id, status): n for building_id, status, n in rows})
+
+    @classmethod
+    def apply(cls, deltas):
+        """Add ``(building_id, status) -> delta`` changes to the building and global rows."""
+        per_key = {}
+        for (building_id, status), n in deltas.items():
+            if not n:
+                continue
+            for key in (cls.GLOBAL_KEY, cls.building_key(building_id)):
+                per_key.setdefault(key, Counter())[status] += n
+
+        for key, changes in per_key.items():
+            changes = {status: F(status) + n for status, n in changes.items() if n}
+            if not changes:
+                continue
+            if not cls.objects.filter(pk=key).update(**changes):
+                cls.objects.get_or_create(pk=key)
+                cls.objects.filter(pk=key).update(**changes)
+
+    @classmethod
+    def refresh(cls, building_ids):
+        """Recompute the rows of ``building_ids`` from the Equipment table and move the
+        global row by the difference; rows of deleted buildings are dropped."""
+        building_ids = set(building_ids) - {None}
+        if not building_ids:
+            return
+        keys = {cls.building_key(pk): pk for pk in building_ids}
+        with transaction.atomic():
+            deltas = cls.distribution(Equipment.objects.filter(room__floor__building_id__in=building_ids))
+            for counter in cls.objects.filter(pk__in=keys):
+                deltas.subtract({(keys[counter.key], status): n for status, n in counter.as_dict().items()})
+            cls.apply(deltas)
+            gone = building_ids.difference(Building.objects.filter(pk__in=building_ids).values_list('pk', flat=True))
+            cls.objects.filter(pk__in=[cls.building_key(pk) for pk in gone]).delete()
+
+    @classmethod
+    def rebuild(cls):
+        """Recompute every counter row from the Equipment table."""
+        counters = {cls.GLOBAL_KEY: cls(key=cls.GLOBAL_KEY)}
+        for (building_id, status), n in cls.distribution(Equipment.objects.all()).items():
+            for key in (cls.GLOBAL_KEY, cls.building_key(building_id)):
+                counter = counters.setdefault(key, cls(key=key))
+                setattr(counter, status, getattr(counter, status) + n)
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(counters.values())
+
+
+class MaintenanceRequestQuerySet(models.QuerySet):
+    """Keeps the open request counts of :class:`FloorStats` in sync on bulk writes, which
+    bypass the model signals."""
+
+    def update(self, **kwargs):
+        if not {'status', 'equipment', 'equipment_id'} & set(kwargs):
+            return super().update(**kwargs)
+        moving = 'equipment' in kwargs or 'equipment_id' in kwargs
+        with transaction.atomic(using=self.db):
+            floor_ids = set(self.order_by().values_list('equipment__room__floor_id', flat=True).distinct())
+            if moving:
+                touched = self.model.objects.filter(pk__in=list(self.values_list('pk', flat=True)))
+            rows = super().update(**kwargs)
+            if moving:
+                floor_ids.update(touched.order_by().values_list('equipment__room__floor_id', flat=True).distinct())
+            if rows:
+                FloorStats.refresh(floor_ids)
+        return rows
 
 
 class MaintenanceRequest(models.Model):
@@ -88,6 +427,8 @@ class MaintenanceRequest(models.Model):
         (STATUS_IN_PROGRESS, 'Đang xử lý'),
         (STATUS_DONE, 'Hoàn thành'),
     ]
+    # counted as open requests by FloorStats
+    OPEN_STATUSES = [STATUS_PENDING, STATUS_IN_PROGRESS]
 
     equipment = models.ForeignKey(Equipment, on_delete=models.CASCADE, related_name='requests', null=True, blank=True)
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
@@ -97,10 +438,49 @@ class MaintenanceRequest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = MaintenanceRequestQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='maint_created_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='maint_status_created_idx'),
+            models.Index(fields=['equipment', 'status'], name='maint_equipment_status_idx'),
+        ]
+
     def __str__(self):
         return f"Yêu cầu #{self.id} - {self.equipment} - {self.get_status_display()}"
 
 
+class BookingSeries(models.Model):
+    """A recurring booking: the first occurrence repeated daily or weekly, until a date or ``count`` times.
+
+    Its occurrences are ordinary RoomBooking rows linked through ``RoomBooking.series``.
+    """
+    FREQ_DAILY = 'daily'
+    FREQ_WEEKLY = 'weekly'
+
+    FREQ_CHOICES = [
+        (FREQ_DAILY, 'Hằng ngày'),
+        (FREQ_WEEKLY, 'Hằng tuần'),
+    ]
+
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='booking_series')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='booking_series')
+    purpose = models.TextField('Mục đích sử dụng')
+    start_time = models.DateTimeField('Buổi đầu tiên bắt đầu')
+    end_time = models.DateTimeField('Buổi đầu tiên kết thúc')
+    frequency = models.CharField('Lặp lại', max_length=10, choices=FREQ_CHOICES, default=FREQ_WEEKLY)
+    until = models.DateField('Lặp đến ngày', null=True, blank=True)
+    count = models.PositiveIntegerField('Số buổi', null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.room.name} - {self.get_frequency_display()} - {self.start_time}"
+
+
 class RoomBooking(models.Model):
     STATUS_PENDING = 'pending'
     STATUS_APPROVED = 'approved'
@@ -124,11 +504,209 @@ class RoomBooking(models.Model):
         choices=STATUS_CHOICES,
         default=STATUS_PENDING
     )
+    series = models.ForeignKey(BookingSeries, on_delete=models.CASCADE, null=True, blank=True, related_name='bookings')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # overlap checks: room = ? AND status IN (...) AND start_time < ? AND end_time > ?
+            models.Index(fields=['room', 'status', 'start_time', 'end_time'], name='booking_room_status_time_idx'),
+            models.Index(fields=['-created_at', '-id'], name='booking_created_idx'),
+            models.Index(fields=['user', '-created_at', '-id'], name='booking_user_created_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.room.name} - {self.user.username} - {self.start_time}"
\ No newline at end of file
+        return f"{self.room.name} - {self.user.username} - {self.start_time}"
+
+    def clean(self):
+        # form-level message for the admin; core.bookings.admit_booking() and the
+        # booking_no_overlap guard (migration 0011) enforce it on every write
+        if self.room_id and self.start_time and self.end_time and self.status in (self.STATUS_PENDING, self.STATUS_APPROVED):
+            clash = RoomBooking.objects.filter(
+                room_id=self.room_id, status__in=[self.STATUS_PENDING, self.STATUS_APPROVED],
+                start_time__lt=self.end_time, end_time__gt=self.start_time,
+            ).exclude(pk=self.pk)
+            if clash.exists():
+                raise ValidationError('Phòng đã được đặt trong khoảng thời gian này!')
+
+
+def _add_counts(model, pk, changes):
+    """Add ``{column: delta}`` to one stats row with ``F()``; False if the row does not exist."""
+    changes = {column: F(column) + n for column, n in changes.items() if n}
+    return not changes or bool(model.objects.filter(pk=pk).update(**changes))
+
+
+def _grows(changes):
+    return any(n > 0 for n in changes.values())
+
+
+class OperationalStats(models.Model):
+    """Counts shown by the statistics dashboard, for one floor or one building."""
+    # floor or building name, copied so the dashboard never joins
+    label = models.CharField(max_length=300, blank=True)
+    # one column per Equipment.STATUS_* value
+    ready = models.IntegerField(default=0)
+    maint = models.IntegerField(default=0)
+    broken = models.IntegerField(default=0)
+    open_requests = models.IntegerField(default=0)
+    rooms = models.IntegerField(default=0)
+    occupied_rooms = models.IntegerField(default=0)
+
+    COUNTS = ('ready', 'maint', 'broken', 'open_requests', 'rooms', 'occupied_rooms')
+
+    class Meta:
+        abstract = True
+
+    @property
+    def equipment(self):
+        return self.ready + self.maint + self.broken
+
+    def as_dict(self):
+        return {column: getattr(self, column) for column in self.COUNTS}
+
+
+class FloorStats(OperationalStats):
+    """Materialized :class:`OperationalStats` of one floor.
+
+    Kept in sync by the receivers in core.signals with small ``F()`` updates
+    (see :meth:`apply`) and, on bulk writes, by the Equipment, Room and
+    MaintenanceRequest querysets. Raw SQL and ``_update()`` bypass both. Occupied rooms are rooms whose ``Room.status`` is
+    occupied, which approving a booking and the booking reaper maintain. Run
+    ``manage.py rebuild_stats`` to repair any drift.
+    """
+    floor = models.OneToOneField(Floor, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    building = models.ForeignKey(Building, on_delete=models.CASCADE, related_name='floor_stats')
+
+    class Meta:
+        ordering = ['floor_id']
+
+    def __str__(self):
+        return f"{self.label}: {self.as_dict()}"
+
+    @staticmethod
+    def floor_label(number, name):
+        return name or f"Tầng {number}"
+
+    @classmethod
+    def compute(cls, floor_ids=None):
+        """Unsaved rows recomputed from the source tables, for ``floor_ids`` or every floor."""
+        def only(qs, lookup):
+            return qs.order_by() if floor_ids is None else qs.order_by().filter(**{f'{lookup}__in': floor_ids})
+
+        rows = {
+            pk: cls(floor_id=pk, building_id=building_id, label=cls.floor_label(number, name))
+            for pk, building_id, number, name in only(Floor.objects, 'pk').values_list(
+                'pk', 'building_id', 'number', 'name')
+        }
+        equipment = only(Equipment.objects, 'room__floor_id').values_list('room__floor_id', 'status')
+        for floor_id, status, n in equipment.annotate(n=Count('pk')):
+            setattr(rows[floor_id], status, n)
+        requests = only(MaintenanceRequest.objects.filter(status__in=MaintenanceRequest.OPEN_STATUSES),
+                        'equipment__room__floor_id').values_list('equipment__room__floor_id')
+        for floor_id, n in requests.annotate(n=Count('pk')):
+            if floor_id is not None:
+                rows[floor_id].open_requests = n
+        rooms = only(Room.objects, 'floor_id').values_list('floor_id').annotate(
+            n=Count('pk'), occupied=Count('pk', filter=models.Q(status=Room.ROOM_OCCUPIED)))
+        for floor_id, n, occupied in rooms:
+            rows[floor_id].rooms, rows[floor_id].occupied_rooms = n, occupied
+        return rows
+
+    @classmethod
+    def refresh(cls, floor_ids):
+        """Recompute the rows of ``floor_ids`` and of their buildings."""
+        floor_ids = set(floor_ids) - {None}
+        if not floor_ids:
+            return
+        with transaction.atomic():
+            rows = cls.compute(floor_ids)
+            cls.objects.bulk_create(rows.values(), update_conflicts=True, unique_fields=['floor'],
+                                    update_fields=['building', 'label', *cls.COUNTS])
+            BuildingStats.refresh({row.building_id for row in rows.values()})
+
+    @classmethod
+    def apply(cls, deltas):
+        """Add ``(floor_id, column) -> delta`` changes to the floor rows and their building rows.
+
+        A floor without a row yet is recomputed instead. Negative changes to a
+        missing row are dropped: the row went with its floor in a cascading delete.
+        """
+        per_floor = {}
+        for (floor_id, column), n in deltas.items():
+            if n and floor_id is not None:
+                per_floor.setdefault(floor_id, Counter())[column] += n
+        if not per_floor:
+            return
+        buildings = dict(Floor.objects.filter(pk__in=per_floor).values_list('pk', 'building_id'))
+        per_building, missing = {}, set()
+        with transaction.atomic():
+            for floor_id, changes in per_floor.items():
+                if floor_id not in buildings:
+                    continue
+                if _add_counts(cls, floor_id, changes) or not _grows(changes):
+                    per_building.setdefault(buildings[floor_id], Counter()).update(changes)
+                else:
+                    missing.add(floor_id)
+            # refresh() also recomputes these buildings from their floor rows
+            cls.refresh(missing)
+            refreshed = {buildings[floor_id] for floor_id in missing}
+            for building_id, changes in per_building.items():
+                if building_id not in refreshed and not _add_counts(BuildingStats, building_id, changes) \
+                        and _grows(changes):
+                    BuildingStats.refresh([building_id])
+
+    @classmethod
+    def rebuild(cls):
+        """Recompute every floor and building row from the source tables."""
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(cls.compute().values(), batch_size=1000)
+            BuildingStats.rebuild()
+
+
+class BuildingStats(OperationalStats):
+    """:class:`OperationalStats` of one building: the sum of its :class:`FloorStats` rows."""
+    building = models.OneToOneField(Building, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+
+    class Meta:
+        ordering = ['label']
+
+    def __str__(self):
+        return f"{self.label}: {self.as_dict()}"
+
+    @staticmethod
+    def building_label(code, name):
+        return f"{code} - {name}"
+
+    @classmethod
+    def compute(cls, building_ids=None):
+        buildings = Building.objects.order_by()
+        floors = FloorStats.objects.order_by()
+        if building_ids is not None:
+            buildings = buildings.filter(pk__in=building_ids)
+            floors = floors.filter(building_id__in=building_ids)
+        rows = {pk: cls(building_id=pk, label=cls.building_label(code, name))
+                for pk, code, name in buildings.values_list('pk', 'code', 'name')}
+        sums = floors.values('building_id').annotate(**{c: Sum(c) for c in cls.COUNTS})
+        for values in sums:
+            row = rows.get(values.pop('building_id'))
+            if row:
+                for column, n in values.items():
+                    setattr(row, column, n)
+        return rows
+
+    @classmethod
+    def refresh(cls, building_ids):
+        """Re-add the floor rows of ``building_ids``."""
+        building_ids = set(building_ids) - {None}
+        if building_ids:
+            cls.objects.bulk_create(cls.compute(building_ids).values(), update_conflicts=True,
+                                    unique_fields=['building'], update_fields=['label', *cls.COUNTS])
+
+    @classmethod
+    def rebuild(cls):
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(cls.compute().values(), batch_size=1000)
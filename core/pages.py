@@ -0,0 +1,44 @@
+"""Versioned cache for the bodies of the asset browsing pages.
+
+A page body is stored per view, object and role of the viewer (admins see edit
+links) together with the version stamps (core.versions) of everything it
+shows. It is served while all of those stamps are unchanged, so only the
+save/delete signals that bump them end its life; a page that also shows what is
+happening now (the current booking of a room) additionally carries the time at
+which that changes. A hit costs one or two cache reads and no query.
+"""
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from . import versions
+
+# stale entries are never read again; the timeout only lets the backend drop them
+PAGE_TIMEOUT = 24 * 3600
+
+
+def role(user):
+    return 'admin' if user.is_superuser else 'user'
+
+
+def _key(name, pk, role):
+    return f'asset-page:{name}:{pk}:{role}'
+
+
+def cached_page(request, name, pk, build):
+    """``(title, body)`` of page ``name`` for object ``pk``, from the cache or ``build()``.
+
+    ``build()`` returns ``(title, body, stamps, expires)``: ``stamps`` is the
+    ``{(kind, pk): version}`` dict the body depends on, read with
+    :func:`core.versions.get_versions` *before* querying so that a change made
+    while the page renders still invalidates it, and ``expires`` is an optional
+    datetime after which the body is stale anyway. ``build()`` may raise Http404.
+    """
+    key = _key(name, pk, role(request.user))
+    entry = cache.get(key)
+    if entry is not None and (entry['expires'] is None or timezone.now() < entry['expires']):
+        if versions.get_versions(*entry['stamps']) == entry['stamps']:
+            return entry['title'], mark_safe(entry['body'])
+    title, body, stamps, expires = build()
+    cache.set(key, {'title': title, 'body': str(body), 'stamps': stamps, 'expires': expires}, PAGE_TIMEOUT)
+    return title, mark_safe(body)
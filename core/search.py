@@ -0,0 +1,181 @@
+"""Global search over equipment, rooms and maintenance requests.
+
+On SQLite the ``core_search`` FTS5 table (migration 0014) answers the query:
+every word of ``q`` must appear in the code/name, description or location of a
+row (the last word as a prefix, for search-as-you-type), accents optional.
+FTS5 returns the newest ``RANK_WINDOW`` rows with every word in the code/name,
+then the newest ``RANK_WINDOW`` matches anywhere; those are ranked here by where
+the words matched, code/name weighted highest, so an old device whose name
+matches exactly is not pushed out by newer requests that only mention it.
+bm25() would rank every match, but it reads the full posting lists of common
+words ("máy", "phòng") and costs hundreds of milliseconds at a million rows,
+where the windows keep any query within a few milliseconds.
+
+Other backends have no index and use ``icontains`` filters with the same
+all-words rule and weights, without accent folding.
+
+Hits are ``dict`` rows with highlighted HTML (matches in ``<mark>``) ready for
+the ``/search/`` page and the JSON API.
+"""
+import re
+from importlib import import_module
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.urls import reverse
+from django.utils.html import escape
+
+from .models import Equipment, MaintenanceRequest, Room
+
+SEARCH_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+# words of a query beyond this are ignored
+MAX_TERMS = 8
+KINDS = {
+    'equipment': 'Thiết bị',
+    'room': 'Phòng',
+    'request': 'Yêu cầu bảo trì',
+}
+# rowid of an index row is ``id * 4 + offset`` (migration 0014)
+ROWID_OFFSETS = {'equipment': 1, 'room': 2, 'request': 3}
+TABLE = 'core_search'
+# matches ranked per query and pass, newest first; see the module docstring
+RANK_WINDOW = 500
+# weight of one matched word in the title, body, location and folded columns
+WEIGHTS = (10, 2, 4, 1)
+SNIPPET_TOKENS = 16
+# markers around matches, escaped text first, then turned into <mark>
+_OPEN, _CLOSE = '\ue000', '\ue001'
+_WORD = re.compile(r'\w+')
+
+
+def terms(q):
+    return _WORD.findall(q)[:MAX_TERMS]
+
+
+def match_expression(q):
+    """FTS5 query: every word of ``q`` quoted, so no operator syntax leaks through.
+
+    The last word is a prefix unless it is a single character, whose prefix
+    query would expand to a large part of the vocabulary.
+    """
+    words = terms(q)
+    return ' '.join(f'"{w}"' + ('*' if n == len(words) - 1 and len(w) > 1 else '') for n, w in enumerate(words))
+
+
+def _marked_html(text):
+    return escape(text).replace(_OPEN, '<mark>').replace(_CLOSE, '</mark>')
+
+
+def fts_available():
+    # migration 0014 creates the table on every SQLite database
+    return connection.vendor == 'sqlite'
+
+
+def search(q, kind=None, limit=SEARCH_LIMIT, user=None):
+    """Best ``limit`` hits for ``q``, optionally of one ``kind`` only."""
+    if not terms(q):
+        return []
+    hits = _fts_search(q, kind, limit) if fts_available() else _fallback_search(q, kind, limit)
+    return _with_urls(hits, user)
+
+
+def _fts_search(q, kind, limit):
+    marks = ', '.join(f'highlight({TABLE}, {column}, %s, %s)' for column in (2, 4, 5))
+    sql = f"""
+        SELECT rowid, kind, object_id, snippet({TABLE}, 3, %s, %s, '…', %s), {marks}
+        FROM {TABLE} WHERE {TABLE} MATCH %s {'AND kind = %s' if kind else ''}
+        ORDER BY rowid DESC LIMIT %s
+    """
+    expression = match_expression(q)
+    # the title pass repeats the whole expression so highlight() still marks the
+    # other columns; overlapping marks in the title are merged
+    passes = (f'({expression}) AND title : ({expression})', expression)
+    rows = {}
+    with connection.cursor() as cursor:
+        for match in passes:
+            params = [_OPEN, _CLOSE, SNIPPET_TOKENS, *[_OPEN, _CLOSE] * 3, match, *([kind] if kind else [])]
+            cursor.execute(sql, [*params, RANK_WINDOW])
+            for rowid, *row in cursor.fetchall():
+                rows.setdefault(rowid, row)
+    hits = []
+    for rowid in sorted(rows, reverse=True):
+        k, pk, body, title, location, folded = rows[rowid]
+        score = sum(w * text.count(_OPEN) for w, text in zip(WEIGHTS, (title, body, location, folded)))
+        hits.append({'kind': k, 'id': pk, 'title': title, 'snippet': body, 'location': location, 'score': score})
+    # stable: equal scores stay newest first
+    hits.sort(key=lambda hit: -hit['score'])
+    for hit in hits[:limit]:
+        for field in ('title', 'snippet', 'location'):
+            hit[field] = _marked_html(hit[field])
+    return hits[:limit]
+
+
+# kind -> (queryset, searched lookups, title/body/location values)
+def _fallback_sources():
+    return {
+        'equipment': (Equipment.objects.all(), ('code', 'name', 'description', 'location_path'),
+                      lambda e: (f'{e.code} {e.name}', e.description, e.location_path)),
+        'room': (Room.objects.all(), ('code', 'name', 'location_path'),
+                 lambda r: (f'{r.code} {r.name}'.strip(), '', r.location_path)),
+        'request': (MaintenanceRequest.objects.select_related('equipment'),
+                    ('description', 'note', 'equipment__code', 'equipment__name', 'equipment__location_path'),
+                    lambda m: (f'{m.equipment.code} {m.equipment.name}' if m.equipment else '',
+                               f'{m.description} {m.note}'.strip(),
+                               m.equipment.location_path if m.equipment else '')),
+    }
+
+
+def _fallback_search(q, kind, limit):
+    words = terms(q)
+    pattern = re.compile('|'.join(re.escape(escape(w)) for w in sorted(words, key=len, reverse=True)), re.IGNORECASE)
+    hits = []
+    for name, (queryset, lookups, values) in _fallback_sources().items():
+        if kind and kind != name:
+            continue
+        for word in words:
+            any_field = Q()
+            for lookup in lookups:
+                any_field |= Q(**{f'{lookup}__icontains': word})
+            queryset = queryset.filter(any_field)
+        for obj in queryset.order_by('-pk')[:limit]:
+            title, body, location = values(obj)
+            texts = [text.lower() for text in (title, body, location)]
+            score = sum(weight * text.count(w.lower()) for w in words for weight, text in zip(WEIGHTS, texts))
+            hits.append({
+                'kind': name, 'id': obj.pk, 'score': score,
+                'title': pattern.sub(r'<mark>\g<0></mark>', escape(title)),
+                'snippet': pattern.sub(r'<mark>\g<0></mark>', escape(body)),
+                'location': pattern.sub(r'<mark>\g<0></mark>', escape(location)),
+            })
+    # ties newest first, like the index's rowid order
+    hits.sort(key=lambda hit: (-hit['score'], -(hit['id'] * 4 + ROWID_OFFSETS[hit['kind']])))
+    return hits[:limit]
+
+
+def _with_urls(hits, user):
+    rooms = dict(Equipment.objects.filter(
+        pk__in=[hit['id'] for hit in hits if hit['kind'] == 'equipment']
+    ).values_list('pk', 'room_id'))
+    for hit in hits:
+        if hit['kind'] == 'room':
+            hit['url'] = reverse('asset_room_detail', args=[hit['id']])
+        elif hit['kind'] == 'equipment':
+            hit['url'] = reverse('asset_room_detail', args=[rooms[hit['id']]]) if hit['id'] in rooms else None
+        elif user is not None and user.is_superuser:
+            hit['url'] = reverse('maintenance_update', args=[hit['id']])
+        else:
+            hit['url'] = reverse('maintenance_list')
+    return hits
+
+
+def rebuild_index():
+    """Refill the FTS5 table from the source tables; returns its row count (``None`` off SQLite)."""
+    if not fts_available():
+        return None
+    index = import_module('core.migrations.0014_search_index')
+    with transaction.atomic(), connection.cursor() as cursor:
+        for sql in index.SQLITE_FILL:
+            cursor.execute(sql)
+        cursor.execute(f'SELECT count(*) FROM {TABLE}')
+        return cursor.fetchone()[0]
@@ -0,0 +1,176 @@
+"""Deterministic synthetic campus for benchmarks and capacity tests.
+
+Everything is written with ``bulk_create`` in large batches and generated from
+one ``random.Random(seed)``, so the same arguments always produce the same
+rows. Booking history is laid out per room on a grid of two-hour slots:
+completed, approved and pending bookings never overlap in their room, while
+rejected requests land anywhere, overlapping the others as real refused
+requests do.
+"""
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from . import versions
+from .models import (
+    Building, Floor, Room, Equipment, EquipmentStatusCounter, FloorStats, MaintenanceRequest, RoomBooking,
+)
+
+BATCH_SIZE = 10_000
+# bookable two-hour slots per day, starting 07:00
+SLOT_HOURS = (7, 9, 11, 13, 15, 17, 19)
+FUTURE_DAYS = 60
+EQUIPMENT_NAMES = ('Máy tính', 'Máy chiếu', 'Điều hòa', 'Loa', 'Micro', 'Bảng tương tác', 'Máy in')
+PURPOSES = ('Họp bộ môn', 'Lớp học bù', 'Seminar', 'Bảo vệ đồ án', 'Sinh hoạt CLB')
+
+
+@contextmanager
+def _history_timestamps(*models):
+    """Let bulk_create keep explicit ``created_at``/``updated_at`` values."""
+    fields = [f for m in models for f in m._meta.fields if getattr(f, 'auto_now', False) or getattr(f, 'auto_now_add', False)]
+    saved = [(f, f.auto_now, f.auto_now_add) for f in fields]
+    for f in fields:
+        f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in saved:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+def _insert(model, objs, stats, **kwargs):
+    """Bulk insert an iterable in batches without holding more than one batch."""
+    batch = []
+    done = 0
+    for obj in objs:
+        batch.append(obj)
+        if len(batch) >= BATCH_SIZE:
+            model.objects.bulk_create(batch, batch_size=BATCH_SIZE, **kwargs)
+            done += len(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch, batch_size=BATCH_SIZE, **kwargs)
+        done += len(batch)
+    stats[model.__name__] = stats.get(model.__name__, 0) + done
+
+
+def seed_campus(buildings, floors, rooms, devices, bookings, requests=None, users=50, years=2, seed=1,
+                now=None, progress=None):
+    """Create ``buildings`` × ``floors`` × ``rooms`` rooms with ``devices`` each, plus history.
+
+    ``bookings`` and ``requests`` are campus-wide totals (``requests`` defaults to
+    half the bookings). Returns ``{model name: rows created}``.
+    """
+    rng = random.Random(seed)
+    now = (now or timezone.now()).replace(minute=0, second=0, microsecond=0)
+    requests = bookings // 2 if requests is None else requests
+    stats = {}
+
+    def step(name):
+        if progress:
+            progress(name, stats.get(name, 0))
+
+    password = make_password(None)
+    prefix = f's{seed}'
+    _insert(User, (User(username=f'{prefix}-user-{i:04d}', password=password) for i in range(users)), stats)
+    user_ids = list(User.objects.filter(username__startswith=f'{prefix}-user-').values_list('pk', flat=True))
+    step('User')
+
+    with transaction.atomic():
+        _insert(Building, (Building(code=f'{prefix.upper()}-B{b:03d}', name=f'Tòa {b + 1}') for b in range(buildings)), stats)
+        building_ids = list(Building.objects.filter(code__startswith=f'{prefix.upper()}-B').order_by('pk')
+                            .values_list('pk', flat=True))
+        _insert(Floor, (Floor(building_id=b, number=str(n), name='') for b in building_ids
+                        for n in range(1, floors + 1)), stats)
+        floor_ids = list(Floor.objects.filter(building_id__in=building_ids).order_by('pk')
+                         .values_list('pk', 'number'))
+        _insert(Room, (Room(floor_id=f, code=f'{number}{r + 1:02d}', name=rng.choice(('', 'Phòng học', 'Phòng máy', 'Hội trường')))
+                       for f, number in floor_ids for r in range(rooms)), stats)
+        room_qs = Room.objects.filter(floor__building_id__in=building_ids)
+        room_qs.refresh_location_path()
+        room_ids = list(room_qs.order_by('pk').values_list('pk', flat=True))
+    step('Room')
+
+    statuses = [Equipment.STATUS_READY] * 17 + [Equipment.STATUS_MAINT] * 2 + [Equipment.STATUS_BROKEN]
+    with transaction.atomic():
+        _insert(Equipment, (
+            Equipment(room_id=r, code=f'TB{d + 1:03d}', name=rng.choice(EQUIPMENT_NAMES), status=rng.choice(statuses))
+            for r in room_ids for d in range(devices)
+        ), stats, counters=False)
+        # once, instead of per batch
+        EquipmentStatusCounter.rebuild()
+    step('Equipment')
+
+    history_days = int(365 * years)
+    if bookings and room_ids:
+        with transaction.atomic(), _history_timestamps(RoomBooking):
+            _insert(RoomBooking, _bookings(rng, now, room_ids, user_ids, bookings, history_days), stats)
+        step('RoomBooking')
+
+    if requests and room_ids and devices:
+        equipment = list(Equipment.objects.filter(room_id__in=room_ids).values_list('pk', 'status'))
+        broken = [pk for pk, status in equipment if status != Equipment.STATUS_READY] or [pk for pk, _ in equipment]
+        with transaction.atomic(), _history_timestamps(MaintenanceRequest):
+            _insert(MaintenanceRequest, _requests(rng, now, equipment, broken, user_ids, requests, history_days), stats)
+        step('MaintenanceRequest')
+
+    # bulk writes skip the signals that keep the hierarchy stamps and the floor stats
+    FloorStats.rebuild()
+    versions.bump(versions.CAMPUS, versions.TREE_ALL)
+    versions.bump_tree(*building_ids)
+    return stats
+
+
+def _bookings(rng, now, room_ids, user_ids, total, history_days):
+    first_day = now - timedelta(days=history_days)
+    days = history_days + FUTURE_DAYS
+    slots = days * len(SLOT_HOURS)
+    per_room, extra = divmod(total, len(room_ids))
+    for i, room_id in enumerate(room_ids):
+        count = per_room + (i < extra)
+        rejected = count // 6
+        booked = min(count - rejected, slots)
+        rejected = count - booked
+        for slot in rng.sample(range(slots), booked):
+            day, hour = divmod(slot, len(SLOT_HOURS))
+            start = first_day.replace(hour=SLOT_HOURS[hour]) + timedelta(days=day)
+            end = start + timedelta(hours=rng.choice((1, 2)))
+            if end <= now:
+                status = RoomBooking.STATUS_COMPLETED
+            elif start <= now:
+                status = RoomBooking.STATUS_APPROVED
+            else:
+                status = rng.choice((RoomBooking.STATUS_APPROVED, RoomBooking.STATUS_PENDING))
+            yield _booking(rng, room_id, user_ids, start, end, status)
+        for _ in range(rejected):
+            start = first_day + timedelta(minutes=30 * rng.randrange(days * 48))
+            yield _booking(rng, room_id, user_ids, start, start + timedelta(hours=rng.choice((1, 2, 3))),
+                           RoomBooking.STATUS_REJECTED)
+
+
+def _booking(rng, room_id, user_ids, start, end, status):
+    created = start - timedelta(hours=rng.randrange(1, 24 * 14))
+    return RoomBooking(room_id=room_id, user_id=rng.choice(user_ids), purpose=rng.choice(PURPOSES),
+                       start_time=start, end_time=end, status=status, created_at=created, updated_at=created)
+
+
+def _requests(rng, now, equipment, broken, user_ids, total, history_days):
+    for _ in range(total):
+        age = timedelta(minutes=rng.randrange(history_days * 24 * 60))
+        created = now - age
+        if age < timedelta(days=14) and rng.random() < 0.6:
+            status = rng.choice((MaintenanceRequest.STATUS_PENDING, MaintenanceRequest.STATUS_IN_PROGRESS))
+            equipment_id = rng.choice(broken)
+        else:
+            status = MaintenanceRequest.STATUS_DONE
+            equipment_id = rng.choice(equipment)[0]
+        yield MaintenanceRequest(
+            equipment_id=equipment_id, created_by_id=rng.choice(user_ids), description='Thiết bị gặp sự cố',
+            status=status, created_at=created,
+            updated_at=min(now, created + timedelta(hours=rng.randrange(1, 24 * 7))),
+        )
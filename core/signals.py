@@ -0,0 +1,275 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import versions
+from .events import broadcaster
+from .models import (
+    BuildingStats, Building, Equipment, EquipmentStatusCounter, Floor, FloorStats, MaintenanceRequest, Room,
+    RoomBooking,
+)
+
+# child model -> (version kind of its parent, parent FK attname)
+HIERARCHY_PARENTS = {
+    Floor: (versions.BUILDING, 'building_id'),
+    Room: (versions.FLOOR, 'floor_id'),
+    Equipment: (versions.ROOM, 'room_id'),
+}
+
+
+def _building_ids(sender, instance):
+    """Buildings containing ``instance`` now and before a move; looked up once per signal round."""
+    if not hasattr(instance, '_building_ids'):
+        if sender is Building:
+            ids = {instance.pk}
+        elif sender is Floor:
+            ids = {instance.building_id, getattr(instance, '_old_parent_id', None)}
+        else:
+            parents = {getattr(instance, HIERARCHY_PARENTS[sender][1]), getattr(instance, '_old_parent_id', None)}
+            lookup = 'building_id' if sender is Room else 'floor__building_id'
+            parent_model = Floor if sender is Room else Room
+            ids = set(parent_model.objects.filter(pk__in=parents - {None}).values_list(lookup, flat=True))
+        instance._building_ids = ids - {None}
+    return instance._building_ids
+
+
+def _cascade(origin):
+    """Keys of the stats touched by a delete started on buildings, floors or rooms, or
+    ``None`` for any other delete.
+
+    Such a delete removes whole subtrees: rather than patching the counters once
+    per cascaded row, the receivers collect the buildings and floors involved on
+    the origin (instance or queryset) and :func:`refresh_cascade_stats`
+    recomputes them once when the origin rows are gone.
+    """
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if model not in (Building, Floor, Room):
+        return None
+    if not hasattr(origin, '_stats_cascade'):
+        origin._stats_cascade = {'buildings': set(), 'floors': set(), 'done': False}
+    return origin._stats_cascade
+
+
+@receiver(pre_delete, sender=Building)
+@receiver(pre_delete, sender=Floor)
+@receiver(pre_delete, sender=Room)
+def remember_cascade_keys(sender, instance, origin=None, **kwargs):
+    keys = _cascade(origin)
+    if keys is None:
+        return
+    if sender is Building:
+        keys['buildings'].add(instance.pk)
+    elif sender is Floor:
+        keys['floors'].add(instance.pk)
+        keys['buildings'].add(instance.building_id)
+    else:
+        keys['floors'].add(instance.floor_id)
+
+
+@receiver(post_delete, sender=Building)
+@receiver(post_delete, sender=Floor)
+@receiver(post_delete, sender=Room)
+def refresh_cascade_stats(sender, origin=None, **kwargs):
+    keys = _cascade(origin)
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    # the origin rows are deleted last, all in one statement before their post_delete
+    if keys is None or sender is not model or keys['done']:
+        return
+    keys['done'] = True
+    floors = dict(Floor.objects.filter(pk__in=keys['floors']).values_list('pk', 'building_id'))
+    buildings = keys['buildings'].union(floors.values())
+    FloorStats.refresh(floors)
+    BuildingStats.refresh(keys['buildings'])
+    EquipmentStatusCounter.refresh(buildings)
+    versions.bump_tree(*buildings)
+
+
+@receiver(post_delete, sender=Equipment)
+def equipment_deleted(sender, instance, origin=None, **kwargs):
+    # also fires per row for queryset deletes, inside their transaction
+    if _cascade(origin) is not None:
+        return
+    building_id = next(iter(_building_ids(sender, instance)), None)
+    EquipmentStatusCounter.apply(Counter({(building_id, instance.status): -1}))
+    # its open requests are counted by maintenance_request_deleted
+    floor_id = Room.objects.filter(pk=instance.room_id).values_list('floor_id', flat=True).first()
+    FloorStats.apply(Counter({(floor_id, instance.status): -1}))
+
+
+# model -> fields whose old values the floor stats receivers compare;
+# Equipment.save keeps its own floor stats like its status counters
+STATS_FIELDS = {
+    Room: ('floor_id', 'status'),
+    MaintenanceRequest: ('equipment_id', 'status'),
+}
+
+
+@receiver(pre_save, sender=Room)
+@receiver(pre_save, sender=MaintenanceRequest)
+def remember_stats_fields(sender, instance, **kwargs):
+    instance._stats_old = None
+    if not instance._state.adding:
+        instance._stats_old = sender.objects.filter(pk=instance.pk).values_list(*STATS_FIELDS[sender]).first()
+
+
+def _room_stats(floor_id, status, sign):
+    return Counter({(floor_id, 'rooms'): sign, (floor_id, 'occupied_rooms'): sign * (status == Room.ROOM_OCCUPIED)})
+
+
+@receiver(post_save, sender=Room)
+def room_saved_stats(sender, instance, **kwargs):
+    old = instance.__dict__.pop('_stats_old', None)
+    if old == (instance.floor_id, instance.status):
+        return
+    deltas = _room_stats(instance.floor_id, instance.status, 1)
+    if old:
+        old_floor = old[0]
+        deltas.update(_room_stats(*old, -1))
+        if old_floor != instance.floor_id:
+            # the room takes its equipment and their open requests along
+            for status, n in instance.equipments.order_by().values_list('status').annotate(n=Count('pk')):
+                deltas[(old_floor, status)] -= n
+                deltas[(instance.floor_id, status)] += n
+            moved = MaintenanceRequest.objects.filter(
+                equipment__room=instance, status__in=MaintenanceRequest.OPEN_STATUSES).count()
+            deltas[(old_floor, 'open_requests')] -= moved
+            deltas[(instance.floor_id, 'open_requests')] += moved
+            if len(_building_ids(sender, instance)) > 1:
+                # and to the other building's status counters
+                EquipmentStatusCounter.refresh(_building_ids(sender, instance))
+    FloorStats.apply(deltas)
+
+
+@receiver(post_delete, sender=Room)
+def room_deleted_stats(sender, instance, origin=None, **kwargs):
+    if _cascade(origin) is not None:
+        return
+    FloorStats.apply(_room_stats(instance.floor_id, instance.status, -1))
+
+
+def _equipment_floors(*equipment_ids):
+    return dict(Equipment.objects.filter(pk__in=set(equipment_ids) - {None}).values_list('pk', 'room__floor_id'))
+
+
+@receiver(post_save, sender=MaintenanceRequest)
+def maintenance_request_saved(sender, instance, **kwargs):
+    old = instance.__dict__.pop('_stats_old', None)
+    old_equipment, was_open = (old[0], old[1] in MaintenanceRequest.OPEN_STATUSES) if old else (None, False)
+    is_open = instance.status in MaintenanceRequest.OPEN_STATUSES
+    if was_open == is_open and (old_equipment == instance.equipment_id or not is_open):
+        return
+    floors = _equipment_floors(old_equipment, instance.equipment_id)
+    deltas = Counter()
+    deltas[(floors.get(old_equipment), 'open_requests')] -= was_open
+    deltas[(floors.get(instance.equipment_id), 'open_requests')] += is_open
+    FloorStats.apply(deltas)
+
+
+@receiver(pre_delete, sender=MaintenanceRequest)
+def remember_request_floor(sender, instance, origin=None, **kwargs):
+    # the FK is nullable, so a cascade may delete the equipment before its requests
+    if _cascade(origin) is None and instance.status in MaintenanceRequest.OPEN_STATUSES:
+        instance._stats_floor = _equipment_floors(instance.equipment_id).get(instance.equipment_id)
+
+
+@receiver(post_delete, sender=MaintenanceRequest)
+def maintenance_request_deleted(sender, instance, origin=None, **kwargs):
+    if _cascade(origin) is not None:
+        return
+    floor_id = instance.__dict__.pop('_stats_floor', None)
+    FloorStats.apply(Counter({(floor_id, 'open_requests'): -1}))
+
+
+@receiver(post_save, sender=Building)
+def building_saved_stats(sender, instance, created, **kwargs):
+    label = BuildingStats.building_label(instance.code, instance.name)
+    if created:
+        BuildingStats.objects.create(building=instance, label=label)
+    else:
+        BuildingStats.objects.filter(pk=instance.pk).update(label=label)
+
+
+@receiver(post_save, sender=Floor)
+def floor_saved_stats(sender, instance, created, **kwargs):
+    old_building = getattr(instance, '_old_parent_id', None)
+    if old_building not in (None, instance.building_id):
+        # the floor's counts move to the other building
+        FloorStats.refresh([instance.pk])
+        BuildingStats.refresh([old_building])
+        EquipmentStatusCounter.refresh([old_building, instance.building_id])
+    elif created:
+        FloorStats.objects.create(floor=instance, building_id=instance.building_id,
+                                  label=FloorStats.floor_label(instance.number, instance.name))
+    else:
+        FloorStats.objects.filter(pk=instance.pk).update(label=FloorStats.floor_label(instance.number, instance.name))
+
+
+@receiver(post_save, sender=Equipment)
+@receiver(post_delete, sender=Equipment)
+def wake_dashboard_events(sender, **kwargs):
+    # push the change to open dashboards without waiting for the next tick, once
+    # it is committed: a snapshot taken earlier would still read the old rows
+    transaction.on_commit(broadcaster.notify)
+
+
+# Each save or delete starts by resetting what the previous round cached on the
+# instance (_building_ids, _old_parent_id), whatever order the receivers ran in.
+
+@receiver(pre_save, sender=Floor)
+@receiver(pre_save, sender=Room)
+@receiver(pre_save, sender=Equipment)
+def remember_hierarchy_parent(sender, instance, **kwargs):
+    instance.__dict__.pop('_building_ids', None)
+    # a row moved to another parent must also invalidate the old parent's list
+    instance._old_parent_id = None
+    if not instance._state.adding:
+        _, field = HIERARCHY_PARENTS[sender]
+        instance._old_parent_id = sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+
+
+@receiver(pre_delete, sender=Floor)
+@receiver(pre_delete, sender=Room)
+@receiver(pre_delete, sender=Equipment)
+def forget_hierarchy_parent(sender, instance, **kwargs):
+    instance.__dict__.pop('_building_ids', None)
+    instance.__dict__.pop('_old_parent_id', None)
+
+
+@receiver(post_save, sender=Floor)
+@receiver(post_delete, sender=Floor)
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+@receiver(post_save, sender=Equipment)
+@receiver(post_delete, sender=Equipment)
+def bump_hierarchy_version(sender, instance, **kwargs):
+    kind, field = HIERARCHY_PARENTS[sender]
+    versions.bump(kind, getattr(instance, field), getattr(instance, '_old_parent_id', None))
+
+
+@receiver(post_save, sender=RoomBooking)
+@receiver(post_delete, sender=RoomBooking)
+def bump_bookings_version(sender, instance, **kwargs):
+    versions.bump(versions.BOOKINGS, instance.room_id)
+
+
+@receiver(post_save, sender=Building)
+@receiver(post_delete, sender=Building)
+def bump_campus_version(sender, **kwargs):
+    versions.bump(versions.CAMPUS, versions.TREE_ALL)
+
+
+@receiver(post_save, sender=Building)
+@receiver(post_delete, sender=Building)
+@receiver(post_save, sender=Floor)
+@receiver(post_delete, sender=Floor)
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+@receiver(post_save, sender=Equipment)
+@receiver(post_delete, sender=Equipment)
+def bump_tree_version(sender, instance, origin=None, **kwargs):
+    # cascades are bumped once by refresh_cascade_stats
+    if _cascade(origin) is None:
+        versions.bump_tree(*_building_ids(sender, instance))
@@ -0,0 +1,155 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.admin import _hierarchy_lookups
+from core.models import Building, Floor, Room, Equipment, EquipmentStatusCounter, MaintenanceRequest, RoomBooking
+
+
+class CopyToRoomTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', password='x')
+        floor = Floor.objects.create(building=Building.objects.create(code='A', name='Nhà A'), number='1')
+        cls.source = Room.objects.create(floor=floor, code='101')
+        cls.target = Room.objects.create(floor=floor, code='102')
+        cls.empty = Room.objects.create(floor=floor, code='103')
+        Equipment.objects.bulk_create(
+            Equipment(room=cls.source, code=f'PC{i}', name='Máy tính') for i in range(50)
+        )
+        # PC0 already has two copies in the target room
+        Equipment.objects.bulk_create([
+            Equipment(room=cls.target, code=code, name='Máy tính') for code in ('PC0', 'PC0-copy', 'PC1')
+        ])
+
+    def _copy(self, rooms):
+        self.client.force_login(self.admin)
+        ids = ','.join(str(pk) for pk in Equipment.objects.filter(room=self.source).values_list('pk', flat=True))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(f'/admin/core/equipment/copy-to-room/?ids={ids}', {'room': [r.pk for r in rooms]})
+        self.assertEqual(response.status_code, 302)
+        return response, len(ctx.captured_queries)
+
+    def test_bulk_copy_to_several_rooms(self):
+        response, queries = self._copy([self.target, self.empty])
+        self.assertEqual(Equipment.objects.filter(room=self.empty).count(), 50)
+        self.assertEqual(Equipment.objects.filter(room=self.target).count(), 53)
+        codes = set(Equipment.objects.filter(room=self.target).values_list('code', flat=True))
+        self.assertTrue({'PC0-copy-2', 'PC1-copy', 'PC2'} <= codes)
+        self.assertEqual(
+            [str(m) for m in get_messages(response.wsgi_request)],
+            [f'Created 100 copies in 2 room(s): {self.target}, {self.empty}. (2 were renamed to avoid duplicates)'],
+        )
+        self.assertEqual(EquipmentStatusCounter.for_building().ready, 153)
+
+        # copying again costs the same number of queries however many codes collide
+        _, again = self._copy([self.target, self.empty])
+        self.assertEqual(queries, again)
+        self.assertLess(queries, 25)
+        self.assertIn('PC0-copy-3', set(Equipment.objects.filter(room=self.target).values_list('code', flat=True)))
+
+    def test_no_room_selected(self):
+        self._copy([])
+        self.assertEqual(Equipment.objects.count(), 53)
+
+    def test_invalid_room_ids_are_rejected(self):
+        self.client.force_login(self.admin)
+        ids = Equipment.objects.filter(room=self.source).first().pk
+        response = self.client.post(f'/admin/core/equipment/copy-to-room/?ids={ids}', {'room': ['x', self.empty.pk]})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(get_messages(response.wsgi_request)), 1)
+        self.assertEqual(Equipment.objects.count(), 53)
+
+    def test_copy_codes_fit_the_column(self):
+        code = 'X' * 50
+        Equipment.objects.bulk_create([Equipment(room=room, code=code, name='Máy chiếu')
+                                       for room in (self.source, self.target)])
+        self.client.force_login(self.admin)
+        ids = Equipment.objects.get(room=self.source, code=code).pk
+        for _ in range(2):
+            self.client.post(f'/admin/core/equipment/copy-to-room/?ids={ids}', {'room': [self.target.pk]})
+        codes = set(Equipment.objects.filter(room=self.target, name='Máy chiếu').values_list('code', flat=True))
+        self.assertEqual(codes, {code, 'X' * 45 + '-copy', 'X' * 43 + '-copy-2'})
+
+
+class ChangelistQueryCountTest(TestCase):
+    ROWS = 10_000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', password='x')
+        buildings = Building.objects.bulk_create(Building(code=f'B{i}', name=f'Nhà {i}') for i in range(5))
+        floors = Floor.objects.bulk_create(Floor(building=b, number=str(n)) for b in buildings for n in range(4))
+        rooms = Room.objects.bulk_create(Room(floor=f, code=f'{f.number}{n:02}') for f in floors for n in range(10))
+        Room.objects.all().refresh_location_path()
+        equipments = Equipment.objects.bulk_create(
+            (Equipment(room=rooms[i % len(rooms)], code=f'PC{i}', name='Máy tính') for i in range(cls.ROWS)),
+            batch_size=2000,
+        )
+        MaintenanceRequest.objects.bulk_create(
+            (MaintenanceRequest(equipment=eq, created_by=cls.admin, description='Hỏng') for eq in equipments),
+            batch_size=2000,
+        )
+        start = timezone.now()
+        RoomBooking.objects.bulk_create(
+            (RoomBooking(room=rooms[i % len(rooms)], user=cls.admin, purpose='Họp',
+                         start_time=start + timedelta(hours=i), end_time=start + timedelta(hours=i, minutes=50))
+             for i in range(cls.ROWS)),
+            batch_size=2000,
+        )
+        cls.building, cls.floor, cls.room = buildings[0], floors[0], rooms[0]
+        cls.equipment, cls.request = equipments[0], MaintenanceRequest.objects.first()
+        cls.booking = RoomBooking.objects.first()
+
+    def setUp(self):
+        _hierarchy_lookups.cache_clear()
+        self.client.force_login(self.admin)
+
+    def queries(self, url, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, url)
+        return len(ctx.captured_queries)
+
+    def test_changelists(self):
+        # 100 rows per page; a per-row lookup would add hundreds of queries
+        pages = {
+            'floor': {'building__id__exact': self.building.pk},
+            'room': {'building': self.building.pk, 'floor': self.floor.pk},
+            'equipment': {'building': self.building.pk, 'floor': self.floor.pk},
+            'maintenancerequest': {},
+            'roombooking': {'booking_building': self.building.pk, 'booking_floor': self.floor.pk},
+        }
+        for model, params in pages.items():
+            url = f'/admin/core/{model}/'
+            self.assertLess(self.queries(url, **params), 15, model)
+
+    def test_change_forms(self):
+        for obj in (self.floor, self.room, self.equipment, self.request, self.booking):
+            url = f'/admin/core/{obj._meta.model_name}/{obj.pk}/change/'
+            self.assertLess(self.queries(url), 12, url)
+
+    def test_autocomplete(self):
+        for model, field in (('room', 'equipment'), ('equipment', 'maintenancerequest')):
+            self.assertLess(self.queries(
+                '/admin/autocomplete/', term='1', app_label='core', model_name=field,
+                field_name='room' if model == 'room' else 'equipment',
+            ), 8, model)
+
+    def test_filter_lookups_cached_per_version(self):
+        url = '/admin/core/equipment/'
+        params = {'building': self.building.pk, 'floor': self.floor.pk}
+        first = self.queries(url, **params)
+        self.assertEqual(self.queries(url, **params), first - 3)
+        # renaming a room invalidates only the room list of its floor
+        with self.captureOnCommitCallbacks(execute=True):
+            self.room.name = 'Phòng mới'
+            self.room.save()
+        self.assertEqual(self.queries(url, **params), first - 2)
+        response = self.client.get(url, params)
+        self.assertContains(response, 'Phòng mới')
@@ -0,0 +1,23 @@
+from contextlib import redirect_stderr
+from io import StringIO
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from benchmarks import views as bench
+from core.urls import urlpatterns
+
+
+class ViewBenchmarkUrlsTest(SimpleTestCase):
+    def test_every_route_gets_a_case(self):
+        objs = {kind: SimpleNamespace(pk=n) for n, kind in enumerate(
+            ('admin', 'user', 'building', 'floor', 'room', 'equipment', 'request', 'booking'), start=1)}
+        objs['now'] = timezone.now()
+        stderr = StringIO()
+        with redirect_stderr(stderr):
+            cases = list(bench.url_cases(objs))
+        self.assertEqual(stderr.getvalue(), '')
+        names = {name for name, *_ in cases}
+        routes = {pattern.name for pattern in urlpatterns if pattern.name} - bench.SKIP
+        self.assertEqual(routes - names, set())
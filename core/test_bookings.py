@@ -0,0 +1,205 @@
+import random
+from datetime import datetime, time, timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, OperationalError, transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from core.bookings import (
+    MAX_OCCURRENCES, SERIES_STEPS, BookingConflict, SeriesConflict, admit_booking, admit_series, expand_series,
+    find_conflicts, overlapping_bookings,
+)
+from core.models import BookingSeries, Building, Floor, Room, RoomBooking
+
+
+def _room():
+    building = Building.objects.create(code='A', name='Nhà A')
+    return Room.objects.create(floor=Floor.objects.create(building=building, number='1'), code='101')
+
+
+class BookingAdmissionTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('booker', password='x')
+        cls.room = _room()
+        cls.start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        cls.taken = RoomBooking.objects.create(
+            room=cls.room, user=cls.user, purpose='Họp', start_time=cls.start, end_time=cls.start + timedelta(hours=2),
+        )
+
+    def booking(self, start_hours, end_hours, **kwargs):
+        return RoomBooking(
+            room=self.room, user=self.user, purpose='Lớp', start_time=self.start + timedelta(hours=start_hours),
+            end_time=self.start + timedelta(hours=end_hours), **kwargs,
+        )
+
+    def test_admits_free_slots_and_refuses_overlaps(self):
+        admit_booking(self.booking(2, 3))
+        admit_booking(self.booking(-1, 0))
+        for hours in ((1, 3), (-1, 1), (0, 2), (0.5, 1)):
+            with self.assertRaises(BookingConflict):
+                admit_booking(self.booking(*hours))
+        admit_booking(self.booking(0, 1, status=RoomBooking.STATUS_REJECTED))
+        self.assertEqual(RoomBooking.objects.filter(room=self.room).count(), 4)
+
+    def test_database_refuses_double_bookings(self):
+        with self.assertRaisesMessage(IntegrityError, 'booking_no_overlap'), transaction.atomic():
+            self.booking(1, 3).save()
+
+        rejected = self.booking(1, 3, status=RoomBooking.STATUS_REJECTED)
+        rejected.save()
+        rejected.status = RoomBooking.STATUS_APPROVED
+        with self.assertRaisesMessage(IntegrityError, 'booking_no_overlap'), transaction.atomic():
+            rejected.save()
+        with self.assertRaises(BookingConflict):
+            admit_booking(rejected)
+
+        # a booking may still be edited in place
+        self.taken.end_time += timedelta(hours=1)
+        admit_booking(self.taken)
+
+    def test_model_validation(self):
+        with self.assertRaises(ValidationError):
+            self.booking(1, 3).full_clean()
+        self.booking(2, 3).full_clean()
+        self.taken.full_clean()
+
+    def test_views_report_the_conflict(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('room_booking_create', args=[self.room.pk]), {
+            'purpose': 'Trùng giờ',
+            'start_time': timezone.localtime(self.start + timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M'),
+            'end_time': timezone.localtime(self.start + timedelta(hours=3)).strftime('%Y-%m-%dT%H:%M'),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Phòng đã được đặt trong khoảng thời gian này!', [str(m) for m in get_messages(response.wsgi_request)])
+        self.assertEqual(RoomBooking.objects.count(), 1)
+
+        rejected = self.booking(1, 3, status=RoomBooking.STATUS_REJECTED)
+        rejected.save()
+        self.client.force_login(User.objects.create_superuser('boss', password='x'))
+        self.client.post(reverse('room_booking_update', args=[rejected.pk]), {'status': RoomBooking.STATUS_APPROVED})
+        rejected.refresh_from_db()
+        self.assertEqual(rejected.status, RoomBooking.STATUS_REJECTED)
+
+
+class BookingRetryTest(TransactionTestCase):
+    def test_retries_when_the_database_is_busy(self):
+        room = _room()
+        start = timezone.now() + timedelta(days=1)
+        booking = RoomBooking(room=room, user=User.objects.create_user('booker'), purpose='Họp',
+                              start_time=start, end_time=start + timedelta(hours=1))
+        locked = OperationalError('database is locked')
+        with mock.patch('core.bookings._lock_room', side_effect=[locked, locked, None]), \
+                mock.patch('core.bookings.time.sleep') as sleep:
+            admit_booking(booking)
+        self.assertEqual(sleep.call_count, 2)
+        self.assertEqual(RoomBooking.objects.get().pk, booking.pk)
+
+        with mock.patch('core.bookings._lock_room', side_effect=locked), mock.patch('core.bookings.time.sleep'):
+            with self.assertRaises(OperationalError):
+                admit_booking(RoomBooking(room=room, user=booking.user, purpose='Họp',
+                                          start_time=start + timedelta(hours=1), end_time=start + timedelta(hours=2)))
+        self.assertEqual(RoomBooking.objects.count(), 1)
+
+
+class BookingSeriesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('lecturer', password='x')
+        cls.room = _room()
+        # a Monday morning, two weeks from now
+        today = timezone.localdate()
+        monday = today + timedelta(days=14 - today.weekday())
+        cls.start = timezone.make_aware(datetime.combine(monday, time(8)))
+        cls.end = cls.start + timedelta(hours=2)
+
+    def series(self, **kwargs):
+        return BookingSeries(room=self.room, user=self.user, purpose='Giải tích', start_time=self.start,
+                             end_time=self.end, **kwargs)
+
+    def book(self, start, end, status=RoomBooking.STATUS_APPROVED):
+        return RoomBooking.objects.create(room=self.room, user=self.user, purpose='Khác', start_time=start,
+                                          end_time=end, status=status)
+
+    def test_expand(self):
+        weekly = expand_series(self.start, self.end, BookingSeries.FREQ_WEEKLY, count=15)
+        self.assertEqual(len(weekly), 15)
+        self.assertEqual(weekly[0], (self.start, self.end))
+        self.assertEqual(weekly[-1][0], self.start + timedelta(weeks=14))
+        self.assertTrue(all(end - start == timedelta(hours=2) for start, end in weekly))
+
+        until = timezone.localtime(self.start).date() + timedelta(days=6)
+        self.assertEqual(len(expand_series(self.start, self.end, BookingSeries.FREQ_DAILY, until=until)), 7)
+        self.assertEqual(len(expand_series(self.start, self.end, BookingSeries.FREQ_DAILY, count=10 ** 6)),
+                         MAX_OCCURRENCES)
+
+    def test_sweep_matches_pairwise_check(self):
+        rng = random.Random(7)
+        hour = timedelta(hours=1)
+        for _ in range(40):
+            t = self.start + hour * rng.randrange(24 * 30)
+            try:
+                admit_booking(RoomBooking(room=self.room, user=self.user, purpose='Khác', start_time=t,
+                                          end_time=t + hour * rng.randint(1, 5),
+                                          status=rng.choice([s for s, _ in RoomBooking.STATUS_CHOICES])))
+            except BookingConflict:
+                pass
+        existing = list(overlapping_bookings(self.start, self.start + timedelta(days=60))
+                        .filter(room=self.room).values_list('start_time', 'end_time'))
+        for frequency in SERIES_STEPS:
+            occurrences = expand_series(self.start, self.end, frequency, count=40)
+            expected = [(n, s, e) for n, (s, e) in enumerate(occurrences)
+                        if any(bs < e and be > s for bs, be in existing)]
+            with self.assertNumQueries(1):
+                self.assertEqual(find_conflicts(self.room.pk, occurrences), expected)
+
+    def test_conflicting_series_is_refused_and_reported(self):
+        self.book(self.start + timedelta(weeks=2, hours=1), self.end + timedelta(weeks=2, hours=1))
+        self.book(self.start + timedelta(weeks=5), self.end + timedelta(weeks=5))
+        self.book(self.start + timedelta(weeks=3), self.end + timedelta(weeks=3), RoomBooking.STATUS_REJECTED)
+        occurrences = expand_series(self.start, self.end, BookingSeries.FREQ_WEEKLY, count=15)
+        with self.assertRaises(SeriesConflict) as raised:
+            admit_series(self.series(count=15), occurrences)
+        self.assertEqual([n for n, _, _ in raised.exception.conflicts], [2, 5])
+        self.assertFalse(BookingSeries.objects.exists())
+        self.assertEqual(RoomBooking.objects.count(), 3)
+
+        # one transaction: lock, one range query, series insert and one bulk insert
+        with self.assertNumQueries(6):
+            bookings, conflicts = admit_series(self.series(count=15), occurrences, skip_conflicts=True)
+        self.assertEqual(len(bookings), 13)
+        self.assertEqual([n for n, _, _ in conflicts], [2, 5])
+        series = BookingSeries.objects.get()
+        self.assertEqual(series.bookings.filter(status=RoomBooking.STATUS_PENDING).count(), 13)
+
+    def test_view(self):
+        self.book(self.start + timedelta(weeks=1), self.end + timedelta(weeks=1))
+        self.client.force_login(self.user)
+        url = reverse('room_booking_series_create', args=[self.room.pk])
+        data = {
+            'purpose': 'Giải tích',
+            'start_time': timezone.localtime(self.start).strftime('%Y-%m-%dT%H:%M'),
+            'end_time': timezone.localtime(self.end).strftime('%Y-%m-%dT%H:%M'),
+            'frequency': BookingSeries.FREQ_WEEKLY,
+            'count': 15,
+        }
+        response = self.client.post(url, data)
+        self.assertContains(response, 'Chưa đặt buổi nào, 1 buổi bị trùng lịch')
+        self.assertContains(response, 'Buổi 2:')
+
+        response = self.client.post(url, {**data, 'skip_conflicts': 'on'})
+        self.assertContains(response, 'Đã đặt 14 buổi, bỏ qua 1 buổi bị trùng lịch')
+        self.assertEqual(RoomBooking.objects.filter(series__isnull=False).count(), 14)
+
+        response = self.client.post(url, {**data, 'start_time': data['start_time'].replace('T08', 'T12'),
+                                           'end_time': data['end_time'].replace('T10', 'T14')})
+        self.assertRedirects(response, reverse('room_booking_list'))
+
+        response = self.client.post(url, {**data, 'until': '2099-01-01'})
+        self.assertContains(response, 'Chọn một trong hai')
@@ -0,0 +1,108 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import Building, Floor, Room, Equipment, EquipmentStatusCounter
+
+
+class EquipmentStatusCounterTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.a = Building.objects.create(code='A', name='Nhà A')
+        cls.b = Building.objects.create(code='B', name='Nhà B')
+        cls.room_a = Room.objects.create(floor=Floor.objects.create(building=cls.a, number='1'), code='A101')
+        cls.room_b = Room.objects.create(floor=Floor.objects.create(building=cls.b, number='1'), code='B101')
+
+    def counts(self, building=None):
+        return EquipmentStatusCounter.for_building(building.pk if building else None).as_dict()
+
+    def assertConsistent(self):
+        expected = {k: v.as_dict() for k, v in ((c.key, c) for c in EquipmentStatusCounter.objects.all())}
+        EquipmentStatusCounter.rebuild()
+        rebuilt = {c.key: c.as_dict() for c in EquipmentStatusCounter.objects.all()}
+        for key, counts in rebuilt.items():
+            self.assertEqual(expected.get(key), counts, key)
+
+    def test_save_and_delete(self):
+        eq = Equipment.objects.create(room=self.room_a, code='PC1', name='Máy tính')
+        Equipment.objects.create(room=self.room_a, code='PC2', name='Máy tính', status=Equipment.STATUS_BROKEN)
+        self.assertEqual(self.counts(), {'ready': 1, 'maint': 0, 'broken': 1})
+
+        eq.status = Equipment.STATUS_MAINT
+        eq.save()
+        eq.room = self.room_b
+        eq.save()
+        self.assertEqual(self.counts(self.a), {'ready': 0, 'maint': 0, 'broken': 1})
+        self.assertEqual(self.counts(self.b), {'ready': 0, 'maint': 1, 'broken': 0})
+
+        eq.delete()
+        self.assertEqual(self.counts(), {'ready': 0, 'maint': 0, 'broken': 1})
+        self.assertConsistent()
+
+    def test_bulk_operations(self):
+        Equipment.objects.bulk_create(
+            Equipment(room=self.room_a, code=f'C{i}', name='Ghế') for i in range(5)
+        )
+        self.assertEqual(self.counts(self.a)['ready'], 5)
+
+        Equipment.objects.filter(code__in=['C0', 'C1']).update(status=Equipment.STATUS_BROKEN)
+        Equipment.objects.filter(code='C2').update(room=self.room_b)
+        self.assertEqual(self.counts(self.a), {'ready': 2, 'maint': 0, 'broken': 2})
+        self.assertEqual(self.counts(self.b), {'ready': 1, 'maint': 0, 'broken': 0})
+
+        objs = list(Equipment.objects.filter(code__in=['C3', 'C4']))
+        for o in objs:
+            o.status = Equipment.STATUS_MAINT
+        Equipment.objects.bulk_update(objs, ['status'])
+        self.assertEqual(self.counts(self.a), {'ready': 0, 'maint': 2, 'broken': 2})
+
+        Equipment.objects.filter(status=Equipment.STATUS_BROKEN).delete()
+        self.a.delete()
+        self.assertEqual(self.counts(), {'ready': 1, 'maint': 0, 'broken': 0})
+        self.assertConsistent()
+
+    def test_room_and_floor_moves_carry_their_counts(self):
+        Equipment.objects.create(room=self.room_a, code='PC1', name='Máy tính')
+        Equipment.objects.create(room=self.room_a, code='PC2', name='Máy tính', status=Equipment.STATUS_BROKEN)
+        floor = Floor.objects.create(building=self.b, number='2')
+        self.room_a.floor = floor
+        self.room_a.save()
+        self.assertEqual(self.counts(self.a), {'ready': 0, 'maint': 0, 'broken': 0})
+        self.assertEqual(self.counts(self.b), {'ready': 1, 'maint': 0, 'broken': 1})
+
+        floor.building = self.a
+        floor.save()
+        self.assertEqual(self.counts(self.a), {'ready': 1, 'maint': 0, 'broken': 1})
+        self.assertEqual(self.counts(self.b), {'ready': 0, 'maint': 0, 'broken': 0})
+        self.assertEqual(self.counts(), {'ready': 1, 'maint': 0, 'broken': 1})
+        self.assertConsistent()
+
+    def test_cascading_delete_is_set_based(self):
+        rooms = [Room.objects.create(floor=self.room_a.floor, code=f'A{n}') for n in range(3)]
+        Equipment.objects.bulk_create(
+            Equipment(room=rooms[i % 3], code=f'C{i}', name='Ghế') for i in range(60)
+        )
+        Equipment.objects.create(room=self.room_b, code='PC1', name='Máy tính')
+        # one query per table of the cascade plus one refresh, however many devices
+        with CaptureQueriesContext(connection) as ctx:
+            self.a.delete()
+        self.assertLess(len(ctx.captured_queries), 30)
+        self.assertEqual(self.counts(), {'ready': 1, 'maint': 0, 'broken': 0})
+        self.assertFalse(EquipmentStatusCounter.objects.filter(pk=EquipmentStatusCounter.building_key(self.a.pk)))
+        self.assertConsistent()
+
+    def test_rebuild_command_repairs_drift(self):
+        Equipment.objects.create(room=self.room_a, code='PC1', name='Máy tính')
+        EquipmentStatusCounter.objects.update(ready=42)
+        call_command('rebuild_equipment_counters', stdout=StringIO())
+        self.assertEqual(self.counts(), {'ready': 1, 'maint': 0, 'broken': 0})
+
+    def test_api_reads_one_row(self):
+        Equipment.objects.create(room=self.room_b, code='PC1', name='Máy tính')
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('api_status_counts'), {'building': self.b.pk})
+        self.assertEqual(response.json(), {'ready': 1, 'maint': 0, 'broken': 0})
@@ -0,0 +1,46 @@
+import os
+from unittest import mock
+
+from django.conf import settings
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.db import configure_connection
+
+
+class SqliteProfileTest(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_on_connect(self):
+        # the test database is in memory, where journal_mode stays 'memory'
+        self.assertEqual(self.pragma('synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma('busy_timeout'), settings.SQLITE_PRAGMAS['busy_timeout'])
+        self.assertEqual(self.pragma('cache_size'), settings.SQLITE_PRAGMAS['cache_size'])
+        self.assertEqual(self.pragma('temp_store'), 2)  # MEMORY
+
+    def test_persistent_connections_only_when_asked(self):
+        # facility_mgmt.wsgi asks for 600 seconds; ASGI and commands close them per request
+        self.assertEqual(connection.settings_dict['CONN_MAX_AGE'], int(os.environ.get('DB_CONN_MAX_AGE', 0)))
+        self.assertTrue(connection.settings_dict['CONN_HEALTH_CHECKS'])
+
+    def test_reapplied_from_settings(self):
+        # only pragmas that may change inside the test's transaction
+        restore = {'busy_timeout': settings.SQLITE_PRAGMAS['busy_timeout']}
+        with override_settings(SQLITE_PRAGMAS={'busy_timeout': 1234}):
+            configure_connection(sender=None, connection=connection)
+        self.addCleanup(self.apply, restore)
+        self.assertEqual(self.pragma('busy_timeout'), 1234)
+
+    def apply(self, pragmas):
+        with override_settings(SQLITE_PRAGMAS=pragmas):
+            configure_connection(sender=None, connection=connection)
+
+
+class OtherBackendTest(SimpleTestCase):
+    def test_non_sqlite_untouched(self):
+        fake = mock.Mock(vendor='postgresql')
+        configure_connection(sender=None, connection=fake)
+        fake.cursor.assert_not_called()
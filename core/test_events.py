@@ -0,0 +1,80 @@
+import asyncio
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.events import CLIENT_QUEUE_SIZE, ChangeBroadcaster, diff_snapshots
+from core.models import Building, Floor, Room, Equipment
+
+
+class ChangeBroadcasterTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        building = Building.objects.create(code='A', name='Nhà A')
+        cls.room = Room.objects.create(floor=Floor.objects.create(building=building, number='1'), code='101')
+        Equipment.objects.create(room=cls.room, code='PC0', name='Máy tính')
+
+    async def _run_clients(self, clients):
+        broadcaster = ChangeBroadcaster(interval=60)
+        queues = [broadcaster.subscribe() for _ in range(clients)]
+        initial = [await asyncio.wait_for(q.get(), 5) for q in queues]
+
+        await sync_to_async(Equipment.objects.create)(room=self.room, code=f'PC{clients}', name='Máy tính')
+        broadcaster.notify()
+        updates = [await asyncio.wait_for(q.get(), 5) for q in queues]
+
+        for q in queues:
+            broadcaster.unsubscribe(q)
+        return initial, updates
+
+    def test_queries_stay_flat_as_clients_grow(self):
+        query_counts = []
+        for clients in (1, 10, 200):
+            with CaptureQueriesContext(connection) as ctx:
+                initial, updates = async_to_sync(self._run_clients)(clients)
+            query_counts.append(len(ctx.captured_queries))
+
+            self.assertEqual(len(updates), clients)
+            self.assertTrue(all(event == 'counts' for event, _ in initial))
+            self.assertEqual({data['ready'] for _, data in updates}, {Equipment.objects.count()})
+        self.assertEqual(len(set(query_counts)), 1, query_counts)
+
+    def test_client_that_falls_behind_gets_the_full_state(self):
+        broadcaster = ChangeBroadcaster(interval=60)
+        queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        broadcaster._subscribers.add(queue)
+        broadcaster.snapshot = {'counts': {'ready': 1, 'maint': 0, 'broken': 0}}
+        for n in range(CLIENT_QUEUE_SIZE):
+            broadcaster._publish([('counts', {'ready': n, 'maint': 0, 'broken': 0})])
+        self.assertTrue(queue.full())
+
+        broadcaster.snapshot = {'counts': {'ready': 1, 'maint': 1, 'broken': 0}}
+        broadcaster._publish([('maint', 1)])
+        backlog = [queue.get_nowait() for _ in range(queue.qsize())]
+        self.assertEqual(backlog, diff_snapshots(None, broadcaster.snapshot))
+
+    def test_signals_wake_the_producer_after_commit(self):
+        with mock.patch('core.signals.broadcaster') as broadcaster:
+            with self.captureOnCommitCallbacks(execute=True):
+                Equipment.objects.create(room=self.room, code='PC9', name='Máy tính')
+                broadcaster.notify.assert_not_called()
+            broadcaster.notify.assert_called()
+
+    def test_stream_requires_asgi(self):
+        self.client.force_login(User.objects.create_user('viewer'))
+        self.assertEqual(self.client.get(reverse('dashboard_events')).status_code, 503)
+
+    async def test_stream_sends_current_state(self):
+        user = await User.objects.acreate(username='viewer')
+        await self.async_client.aforce_login(user)
+        response = await self.async_client.get(reverse('dashboard_events'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        first = await asyncio.wait_for(anext(stream), 5)
+        await stream.aclose()
+        self.assertTrue(first.startswith(b'event: counts\ndata: {"ready": 1'))
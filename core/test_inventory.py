@@ -0,0 +1,99 @@
+import io
+import os
+import tempfile
+import unittest
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.inventory import COLUMNS, import_inventory, read_rows
+from core.models import Building, Floor, Room, Equipment, EquipmentStatusCounter
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+HEADER = ','.join(COLUMNS)
+
+
+def csv_rows(*lines):
+    text = '\n'.join((HEADER,) + lines) + '\n'
+    return read_rows(io.BytesIO(text.encode('utf-8-sig')), 'inventory.csv')
+
+
+class InventoryImportTest(TestCase):
+    def test_creates_hierarchy_and_upserts(self):
+        result = import_inventory(csv_rows(
+            'A,Nhà A,1,Tầng 1,A101,Phòng 101,PC1,Máy tính,,ready',
+            'A,Nhà A,1,Tầng 1,A101,Phòng 101,PC2,Máy chiếu,,Đã hỏng',
+            'A,Nhà A,2,,A201,,PC1,Máy tính,,',
+            'B,,1,,B101,,PC1,Máy tính,,maint',
+        ), chunk_size=2)
+        self.assertEqual((result.imported, result.rejected), (4, []))
+        self.assertEqual(Building.objects.count(), 2)
+        self.assertEqual(Building.objects.get(code='B').name, 'B')
+        self.assertEqual(Floor.objects.count(), 3)
+        self.assertEqual(Room.objects.count(), 3)
+        self.assertEqual(Equipment.objects.get(room__code='A101', code='PC2').status, Equipment.STATUS_BROKEN)
+        self.assertEqual(Equipment.objects.get(room__code='A101', code='PC2').location_path,
+                         'A — Nhà A — Tầng 1 — A101 Phòng 101')
+        self.assertEqual(EquipmentStatusCounter.for_building().as_dict(), {'ready': 2, 'maint': 1, 'broken': 1})
+
+        with self.assertNumQueries(28):
+            # one chunk: three parent lookups, one upsert, then a single counter and stats rebuild
+            result = import_inventory(csv_rows(
+                'A,Nhà A,1,Tầng 1,A101,Phòng 101,PC1,Máy tính mới,Đã thay,broken',
+            ))
+        self.assertEqual(result.imported, 1)
+        self.assertEqual(Equipment.objects.count(), 4)
+        eq = Equipment.objects.get(room__code='A101', code='PC1')
+        self.assertEqual((eq.name, eq.description, eq.status), ('Máy tính mới', 'Đã thay', Equipment.STATUS_BROKEN))
+        self.assertEqual(EquipmentStatusCounter.for_building().as_dict(), {'ready': 1, 'maint': 1, 'broken': 2})
+
+    def test_rejected_rows(self):
+        result = import_inventory(csv_rows(
+            'A,Nhà A,1,,A101,,PC1,Máy tính,,ready',
+            'A,Nhà A,1,,A101,,,Máy tính,,ready',
+            'A,Nhà A,1,,A101,,PC2,Máy tính,,lost',
+            'A,Nhà A,1,,A101,,' + 'X' * 60 + ',Máy tính,,',
+        ))
+        self.assertEqual(result.imported, 1)
+        self.assertEqual([line for line, _ in result.rejected], [3, 4, 5])
+        self.assertIn('equipment_code', result.rejected[0][1])
+        self.assertIn('lost', result.rejected[1][1])
+        self.assertEqual(Equipment.objects.count(), 1)
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as f:
+            f.write(HEADER + '\nA,Nhà A,1,,A101,,PC1,Máy tính,,\nA,,,,,,,,,\n')
+        self.addCleanup(os.unlink, f.name)
+        out, err = StringIO(), StringIO()
+        call_command('import_inventory', f.name, stdout=out, stderr=err)
+        self.assertIn('1 imported, 1 rejected', out.getvalue())
+        self.assertIn('line 3', err.getvalue())
+        self.assertTrue(Equipment.objects.filter(code='PC1').exists())
+
+    def test_admin_upload(self):
+        admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(admin)
+        upload = SimpleUploadedFile('inventory.csv', (HEADER + '\nA,Nhà A,1,,A101,,PC1,Máy tính,,\n').encode())
+        response = self.client.post('/admin/core/equipment/import/', {'file': upload})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Equipment.objects.filter(room__code='A101', code='PC1').exists())
+
+    @unittest.skipUnless(openpyxl, 'openpyxl is not installed')
+    def test_xlsx(self):
+        book = openpyxl.Workbook()
+        sheet = book.active
+        sheet.append(COLUMNS)
+        sheet.append(['A', 'Nhà A', 1, None, 'A101', None, 'PC1', 'Máy tính', None, 'ready'])
+        data = io.BytesIO()
+        book.save(data)
+        data.seek(0)
+        result = import_inventory(read_rows(data, 'inventory.xlsx'))
+        self.assertEqual((result.imported, result.rejected), (1, []))
+        self.assertEqual(Floor.objects.get().number, '1')
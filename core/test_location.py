@@ -0,0 +1,84 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from core.models import Building, Floor, Room, Equipment, MaintenanceRequest
+
+
+class LocationPathTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.building = Building.objects.create(code='A', name='Nhà A')
+        cls.floor = Floor.objects.create(building=cls.building, number='1')
+        cls.other_floor = Floor.objects.create(building=cls.building, number='2', name='Tầng kỹ thuật')
+        cls.room = Room.objects.create(floor=cls.floor, code='101', name='Phòng học')
+        Room.objects.bulk_create(Room(floor=cls.floor, code=f'1{i:02}') for i in range(2, 30))
+        Room.objects.filter(location_path='').refresh_location_path()
+        cls.eq = Equipment.objects.create(room=cls.room, code='PC1', name='Máy tính')
+        Equipment.objects.bulk_create(Equipment(room=cls.room, code=f'PC{i}', name='Máy tính') for i in range(2, 30))
+
+    def paths(self, model):
+        return set(model.objects.values_list('location_path', flat=True))
+
+    def assertPathsMatchPython(self):
+        for room in Room.objects.all():
+            self.assertEqual(room.location_path, room.build_location_path())
+            self.assertEqual(set(room.equipments.values_list('location_path', flat=True)) - {room.location_path}, set())
+
+    def test_labels_need_no_queries(self):
+        room = Room.objects.get(pk=self.room.pk)
+        eq = Equipment.objects.get(pk=self.eq.pk)
+        request = MaintenanceRequest.objects.select_related('equipment').get(
+            pk=MaintenanceRequest.objects.create(equipment=eq, description='Hỏng').pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(str(room), 'A — Nhà A — Tầng 1 — 101 Phòng học')
+            self.assertEqual(str(eq), 'PC1 - Máy tính (A — Nhà A — Tầng 1 — 101 Phòng học)')
+            self.assertIn('(A — Nhà A — Tầng 1 — 101 Phòng học)', str(request))
+        self.assertPathsMatchPython()
+
+    def test_renames_cascade_in_constant_queries(self):
+        self.building.name = 'Nhà B'
+        # includes the label of the building's stats row
+        with self.assertNumQueries(9):
+            self.building.save()
+        self.assertPathsMatchPython()
+        self.assertTrue(all(p.startswith('A — Nhà B — Tầng 1 — ') for p in self.paths(Equipment)))
+
+        self.floor.name = 'Tầng trệt'
+        self.floor.save()
+        self.assertPathsMatchPython()
+        self.assertEqual(Equipment.objects.get(pk=self.eq.pk).location_path, 'A — Nhà B — Tầng trệt — 101 Phòng học')
+
+    def test_moves(self):
+        room = Room.objects.get(pk=self.room.pk)
+        room.floor = self.other_floor
+        room.save()
+        self.assertEqual(Equipment.objects.get(pk=self.eq.pk).location_path, 'A — Nhà A — Tầng kỹ thuật — 101 Phòng học')
+
+        target = Room.objects.create(floor=self.floor, code='999')
+        eq = Equipment.objects.get(pk=self.eq.pk)
+        eq.room = target
+        eq.save()
+        self.assertEqual(Equipment.objects.get(pk=eq.pk).location_path, 'A — Nhà A — Tầng 1 — 999')
+
+        Equipment.objects.filter(code='PC2').update(room=target)
+        rows = list(Equipment.objects.filter(code__in=['PC3', 'PC4']))
+        for row in rows:
+            row.room = target
+        Equipment.objects.bulk_update(rows, ['room'])
+        self.assertEqual(
+            set(Equipment.objects.filter(code__in=['PC2', 'PC3', 'PC4']).values_list('location_path', flat=True)),
+            {'A — Nhà A — Tầng 1 — 999'},
+        )
+        self.assertPathsMatchPython()
+
+    def test_location_prefix_search(self):
+        self.client.force_login(User.objects.create_user('tech', password='x'))
+        room = Room.objects.create(floor=self.other_floor, code='201')
+        Equipment.objects.create(room=room, code='PC1', name='Máy tính')
+        data = self.client.get(reverse('api_equipment_search'), {'location': 'A — Nhà A — Tầng kỹ'}).json()
+        self.assertEqual([e['label'] for e in data], ['PC1 - Máy tính (A / 2 / 201)'])
+        data = self.client.get(reverse('api_equipment_search'), {'q': 'pc1', 'location': 'A — Nhà A — Tầng 1'}).json()
+        labels = [e['label'] for e in data]
+        self.assertIn('PC1 - Máy tính (A / 1 / 101)', labels)
+        self.assertNotIn('PC1 - Máy tính (A / 2 / 201)', labels)
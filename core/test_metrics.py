@@ -0,0 +1,88 @@
+import re
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.metrics import Histogram, registry
+from core.models import Building
+
+
+def sample(text, name, **labels):
+    pattern = re.escape(name) + r'\{([^}]*)\} (\S+)'
+    for label_text, value in re.findall(pattern, text):
+        found = dict(re.findall(r'(\w+)="([^"]*)"', label_text))
+        if all(found.get(k) == str(v) for k, v in labels.items()):
+            return float(value)
+    return None
+
+
+@override_settings(METRICS_ENABLED=True, METRICS_ALLOWED_IPS=['127.0.0.1'], METRICS_TOKEN='')
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('tech', password='x')
+        Building.objects.create(code='A', name='Nhà A')
+
+    def setUp(self):
+        registry.reset()
+        self.client.force_login(self.user)
+
+    def metrics(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        return response.content.decode()
+
+    def test_counts_requests_queries_and_sizes(self):
+        for _ in range(3):
+            response = self.client.get(reverse('api_status_counts'))
+        text = self.metrics()
+        view = 'api_status_counts'
+        self.assertEqual(sample(text, 'facility_http_requests_total', view=view, method='GET', status=200), 3)
+        self.assertEqual(sample(text, 'facility_http_request_duration_seconds_count', view=view), 3)
+        self.assertEqual(sample(text, 'facility_http_request_duration_seconds_bucket', view=view, le='+Inf'), 3)
+        # session + user lookups and the counter read, all counted
+        self.assertGreaterEqual(sample(text, 'facility_db_queries_total', view=view), 3)
+        self.assertGreater(sample(text, 'facility_db_duration_seconds_sum', view=view), 0)
+        self.assertEqual(sample(text, 'facility_http_response_size_bytes_sum', view=view), 3 * len(response.content))
+
+    async def test_counts_queries_of_async_views_under_asgi(self):
+        for _ in range(2):
+            response = await self.async_client.get(reverse('api_status_counts_async'))
+            self.assertEqual(response.status_code, 200)
+        text = registry.render()
+        view = 'api_status_counts_async'
+        self.assertEqual(sample(text, 'facility_http_requests_total', view=view, method='GET', status=200), 2)
+        self.assertEqual(sample(text, 'facility_db_queries_total', view=view), 2)
+
+    def test_unmatched_paths_share_one_label(self):
+        for i in range(20):
+            self.client.get(f'/no-such-page-{i}/')
+        text = self.metrics()
+        self.assertEqual(sample(text, 'facility_http_requests_total', view='unmatched', status=404), 20)
+        self.assertNotIn('no-such-page', text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        h = Histogram((1, 5))
+        for value in (0.5, 1, 3, 7):
+            h.observe(value)
+        self.assertEqual(list(h.render('x', 'view="v"')), [
+            'x_bucket{view="v",le="1"} 2',
+            'x_bucket{view="v",le="5"} 3',
+            'x_bucket{view="v",le="+Inf"} 4',
+            'x_sum{view="v"} 11.5',
+            'x_count{view="v"} 4',
+        ])
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled_by_setting(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+    def test_other_addresses_are_refused(self):
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.7').status_code, 403)
+
+    @override_settings(METRICS_ALLOWED_IPS=[], METRICS_TOKEN='s3cret')
+    def test_token_grants_access(self):
+        self.client.logout()
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
@@ -0,0 +1,71 @@
+import re
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Building, Floor, Room, Equipment, MaintenanceRequest, RoomBooking
+
+# "SCAN core_equipment" (or "SCAN TABLE core_equipment" on older SQLite) with no
+# index: a full table scan. "SCAN ... USING [COVERING] INDEX" is fine.
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?(?P<table>\w+)( AS \w+)?$')
+
+
+@skipUnlessDBFeature('supports_explaining_query_execution')
+class HotQueryPlanTest(TestCase):
+    """Every SELECT issued by the hot views must be served by an index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', password='x')
+        cls.user = User.objects.create_user('user', password='x')
+        building = Building.objects.create(code='A', name='Nhà A')
+        cls.floor = Floor.objects.create(building=building, number='1')
+        cls.room = Room.objects.create(floor=cls.floor, code='101')
+        eq = Equipment.objects.create(room=cls.room, code='PC1', name='Máy tính')
+        MaintenanceRequest.objects.create(equipment=eq, created_by=cls.user, description='Hỏng')
+        now = timezone.now()
+        RoomBooking.objects.create(
+            room=cls.room, user=cls.user, purpose='Học', status=RoomBooking.STATUS_APPROVED,
+            start_time=now - timedelta(hours=1), end_time=now + timedelta(hours=1),
+        )
+
+    def assertNoFullScans(self, user, method, url, data=None):
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, data)
+        self.assertLess(response.status_code, 400)
+
+        selects = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('SELECT')]
+        self.assertTrue(selects)
+        for sql in selects:
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                plan = [row[-1] for row in cursor.fetchall()]
+            scans = [d for d in plan if FULL_SCAN.match(d)]
+            self.assertFalse(scans, f'{url}: full table scan in plan {plan} for {sql}')
+
+    def test_dashboard(self):
+        self.assertNoFullScans(self.user, 'get', reverse('dashboard'))
+
+    def test_room_list(self):
+        self.assertNoFullScans(self.user, 'get', reverse('room_list', args=[self.floor.pk]))
+
+    def test_maintenance_list(self):
+        self.assertNoFullScans(self.user, 'get', reverse('maintenance_list'))
+
+    def test_room_booking_list(self):
+        self.assertNoFullScans(self.user, 'get', reverse('room_booking_list'))
+        self.assertNoFullScans(self.admin, 'get', reverse('room_booking_list'))
+
+    def test_room_booking_create(self):
+        start = timezone.now() + timedelta(days=1)
+        self.assertNoFullScans(self.user, 'post', reverse('room_booking_create', args=[self.room.pk]), {
+            'purpose': 'Họp',
+            'start_time': start.strftime('%Y-%m-%dT%H:%M'),
+            'end_time': (start + timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M'),
+        })
@@ -0,0 +1,103 @@
+import json
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from core import search
+from core.models import Building, Equipment, Floor, MaintenanceRequest, Room
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        building = Building.objects.create(code='A2', name='Nhà A2')
+        floor = Floor.objects.create(building=building, number='3')
+        cls.room = Room.objects.create(floor=floor, code='301', name='Phòng học')
+        cls.other = Room.objects.create(floor=floor, code='302', name='Hội trường')
+        cls.projector = Equipment.objects.create(room=cls.room, code='MC01', name='Máy chiếu',
+                                                 description='Epson, bóng đèn thay năm 2024')
+        cls.aircon = Equipment.objects.create(room=cls.other, code='DH01', name='Điều hòa')
+        cls.request = MaintenanceRequest.objects.create(equipment=cls.projector, description='Máy chiếu không lên hình')
+        cls.user = User.objects.create_user('tech', password='x')
+
+    def hits(self, q, **kwargs):
+        return [(hit['kind'], hit['id']) for hit in search.search(q, **kwargs)]
+
+    def test_ranked_and_accent_insensitive(self):
+        # the request repeats the words in its description
+        self.assertEqual(self.hits('máy chiếu phòng A2'), [
+            ('request', self.request.pk), ('equipment', self.projector.pk),
+        ])
+        self.assertEqual(self.hits('may chieu'), self.hits('MÁY CHIẾU'))
+        # "đ" is folded separately from the other accents
+        self.assertEqual(self.hits('dieu hoa'), [('equipment', self.aircon.pk)])
+        self.assertEqual(self.hits('hội trườ'), [('room', self.other.pk), ('equipment', self.aircon.pk)])
+        self.assertEqual(self.hits('301', kind='room'), [('room', self.room.pk)])
+        # quotes and FTS5 operators are not syntax
+        self.assertEqual(self.hits('"chiếu")* -^'), self.hits('chiếu'))
+        self.assertEqual(self.hits('chiếu OR xyz'), [])
+        self.assertEqual(self.hits('  '), [])
+
+    def test_title_matches_outside_the_recency_window(self):
+        # newer requests that only mention the words fill the window of newest matches
+        for n in range(3):
+            MaintenanceRequest.objects.create(equipment=self.aircon, description=f'Cắm máy chiếu vào ổ {n}')
+        with mock.patch.object(search, 'RANK_WINDOW', 2):
+            self.assertEqual(self.hits('máy chiếu')[:2], [('request', self.request.pk), ('equipment', self.projector.pk)])
+            self.assertEqual(self.hits('máy chiếu', kind='equipment'), [('equipment', self.projector.pk)])
+
+    def test_index_follows_writes(self):
+        self.projector.name = 'Máy quay'
+        self.projector.save()
+        self.assertEqual(self.hits('máy chiếu'), [('request', self.request.pk)])
+        self.assertEqual(self.hits('quay'), [('request', self.request.pk), ('equipment', self.projector.pk)])
+
+        # bulk and cascading writes go through the triggers too
+        Room.objects.filter(pk=self.room.pk).refresh_location_path()
+        Building.objects.filter(code='A2').update(name='Nhà B7')
+        Room.objects.all().refresh_location_path()
+        self.assertEqual(self.hits('B7', kind='equipment'), [('equipment', self.aircon.pk), ('equipment', self.projector.pk)])
+        Equipment.objects.bulk_create([Equipment(room=self.room, code='MC02', name='Máy chiếu')])
+        self.assertEqual(len(self.hits('máy chiếu', kind='equipment')), 1)
+        self.room.delete()
+        self.assertEqual(self.hits('quay'), [])
+        self.assertEqual(self.hits('không lên hình'), [])
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.TABLE}')
+        call_command('rebuild_search_index', stdout=mock.MagicMock())
+        self.assertEqual(self.hits('điều hòa'), [('equipment', self.aircon.pk)])
+
+    def test_highlight_escapes_html(self):
+        self.aircon.description = 'Điều hòa <b>kêu to</b>'
+        self.aircon.save()
+        hit = search.search('kêu')[0]
+        self.assertIn('&lt;b&gt;<mark>kêu</mark> to&lt;/b&gt;', hit['snippet'])
+        self.assertEqual(hit['url'], reverse('asset_room_detail', args=[self.other.pk]))
+
+    def test_fallback_matches_the_index(self):
+        for q in ('máy chiếu phòng A2', 'hội trường', '301'):
+            expected = self.hits(q)
+            with mock.patch('core.search.fts_available', return_value=False):
+                self.assertEqual(self.hits(q), expected, q)
+        with mock.patch('core.search.fts_available', return_value=False):
+            self.assertIn('<mark>Máy</mark> <mark>chiếu</mark>', search.search('máy chiếu')[0]['title'])
+
+    def test_views(self):
+        url = reverse('api_search')
+        self.assertEqual(self.client.get(url, {'q': 'máy'}).status_code, 302)
+        self.client.force_login(self.user)
+        data = json.loads(self.client.get(url, {'q': 'máy chiếu', 'limit': 1}).content)
+        self.assertEqual(len(data['results']), 1)
+        self.assertEqual(data['results'][0]['title'], 'MC01 <mark>Máy</mark> <mark>chiếu</mark>')
+        self.assertEqual(self.client.get(url, {'q': 'máy', 'kind': 'building'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'q': 'máy', 'limit': '-1'}).status_code, 400)
+
+        response = self.client.get(reverse('search'), {'q': 'may chieu'})
+        self.assertContains(response, '<mark>Máy</mark> <mark>chiếu</mark> không lên hình')
+        self.assertContains(response, reverse('maintenance_list'))
+        self.assertContains(self.client.get(reverse('search'), {'q': 'xyz'}), 'Không tìm thấy kết quả')
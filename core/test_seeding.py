@@ -0,0 +1,58 @@
+from datetime import datetime, timezone as dt_timezone
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.models import Building, Room, Equipment, EquipmentStatusCounter, MaintenanceRequest, RoomBooking
+from core.seeding import seed_campus
+
+NOW = datetime(2026, 3, 2, 10, tzinfo=dt_timezone.utc)
+
+
+class SeedCampusTest(TestCase):
+    def snapshot(self):
+        return (
+            list(Room.objects.order_by('location_path').values_list('location_path', 'name')),
+            list(Equipment.objects.order_by('location_path', 'code').values_list('location_path', 'code', 'name', 'status')),
+            list(RoomBooking.objects.order_by('room__location_path', 'start_time', 'status').values_list(
+                'room__location_path', 'user__username', 'start_time', 'end_time', 'status', 'created_at')),
+            list(MaintenanceRequest.objects.order_by('created_at', 'equipment__code').values_list(
+                'equipment__location_path', 'equipment__code', 'status', 'created_at')),
+        )
+
+    def test_counts_and_determinism(self):
+        stats = seed_campus(2, 2, 3, 4, 300, requests=100, users=5, seed=7, now=NOW)
+        self.assertEqual(stats, {'User': 5, 'Building': 2, 'Floor': 4, 'Room': 12, 'Equipment': 48,
+                                 'RoomBooking': 300, 'MaintenanceRequest': 100})
+        first = self.snapshot()
+        for model in (Building, User):
+            model.objects.all().delete()
+        seed_campus(2, 2, 3, 4, 300, requests=100, users=5, seed=7, now=NOW)
+        self.assertEqual(self.snapshot(), first)
+
+    def test_history_is_realistic(self):
+        seed_campus(1, 2, 2, 3, 400, requests=200, users=5, years=1, seed=1, now=NOW)
+        self.assertFalse(Room.objects.filter(location_path='').exists())
+        self.assertEqual(EquipmentStatusCounter.for_building().total, 12)
+
+        statuses = set(RoomBooking.objects.values_list('status', flat=True))
+        self.assertEqual(statuses, {s for s, _ in RoomBooking.STATUS_CHOICES})
+        self.assertFalse(RoomBooking.objects.filter(status=RoomBooking.STATUS_COMPLETED, end_time__gt=NOW).exists())
+        self.assertTrue(RoomBooking.objects.filter(created_at__lt=NOW.replace(year=2025, month=6)).exists())
+
+        # bookings that hold the room never overlap; rejected requests may
+        held = RoomBooking.objects.exclude(status=RoomBooking.STATUS_REJECTED)
+        for booking in held:
+            self.assertFalse(held.filter(room=booking.room_id, start_time__lt=booking.end_time,
+                                         end_time__gt=booking.start_time).exclude(pk=booking.pk).exists())
+
+        open_requests = MaintenanceRequest.objects.exclude(status=MaintenanceRequest.STATUS_DONE)
+        self.assertTrue(open_requests.exists())
+        self.assertFalse(open_requests.filter(equipment__status=Equipment.STATUS_READY).exists())
+
+    def test_command(self):
+        out = StringIO()
+        call_command('seed_campus', buildings=1, floors=1, rooms=2, devices=2, bookings=10, users=2, stdout=out)
+        self.assertIn('Created 25 rows', out.getvalue())
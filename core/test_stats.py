@@ -0,0 +1,183 @@
+from collections import Counter
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from core.bookings import reconcile_room_status
+from core.models import (
+    Building, BuildingStats, Equipment, EquipmentStatusCounter, Floor, FloorStats, MaintenanceRequest, Room,
+    RoomBooking,
+)
+
+
+class OperationalStatsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.a = Building.objects.create(code='A', name='Nhà A')
+        cls.b = Building.objects.create(code='B', name='Nhà B')
+        cls.a1 = Floor.objects.create(building=cls.a, number='1')
+        cls.a2 = Floor.objects.create(building=cls.a, number='2', name='Tầng kỹ thuật')
+        cls.b1 = Floor.objects.create(building=cls.b, number='1')
+        cls.room_a1 = Room.objects.create(floor=cls.a1, code='A101')
+        cls.room_a2 = Room.objects.create(floor=cls.a2, code='201')
+        cls.room_b1 = Room.objects.create(floor=cls.b1, code='B101')
+        cls.user = User.objects.create_user('manager', password='x')
+
+    def snapshot(self):
+        return (
+            {s.pk: (s.building_id, s.label, s.as_dict()) for s in FloorStats.objects.all()},
+            {s.pk: (s.label, s.as_dict()) for s in BuildingStats.objects.all()},
+        )
+
+    def assertConsistent(self):
+        live = self.snapshot()
+        FloorStats.rebuild()
+        self.assertEqual(live, self.snapshot())
+
+    def stats(self, obj):
+        return (FloorStats if isinstance(obj, Floor) else BuildingStats).objects.get(pk=obj.pk).as_dict()
+
+    def test_equipment_and_requests(self):
+        pc = Equipment.objects.create(room=self.room_a1, code='PC1', name='Máy tính')
+        Equipment.objects.create(room=self.room_a2, code='PC2', name='Máy tính', status=Equipment.STATUS_BROKEN)
+        request = MaintenanceRequest.objects.create(equipment=pc, description='Không lên nguồn')
+        MaintenanceRequest.objects.create(equipment=pc, description='Đã thay', status=MaintenanceRequest.STATUS_DONE)
+        self.assertEqual(self.stats(self.a1), {'ready': 1, 'maint': 0, 'broken': 0, 'open_requests': 1,
+                                               'rooms': 1, 'occupied_rooms': 0})
+        self.assertEqual(self.stats(self.a)['broken'], 1)
+        self.assertConsistent()
+
+        request.status = MaintenanceRequest.STATUS_IN_PROGRESS
+        request.save()
+        pc.status = Equipment.STATUS_MAINT
+        pc.save()
+        self.assertConsistent()
+
+        # the open request follows its equipment to the other building
+        pc.room = self.room_b1
+        pc.save()
+        self.assertEqual(self.stats(self.b1)['open_requests'], 1)
+        self.assertEqual(self.stats(self.a)['open_requests'], 0)
+        self.assertConsistent()
+
+        request.status = MaintenanceRequest.STATUS_DONE
+        request.save()
+        MaintenanceRequest.objects.create(equipment=pc, description='Lại hỏng')
+        pc.delete()
+        self.assertEqual(self.stats(self.b), {'ready': 0, 'maint': 0, 'broken': 0, 'open_requests': 0,
+                                              'rooms': 1, 'occupied_rooms': 0})
+        self.assertConsistent()
+
+    def test_bulk_writes(self):
+        Equipment.objects.bulk_create(
+            [Equipment(room=self.room_a1, code=f'PC{i}', name='Máy tính') for i in range(5)]
+            + [Equipment(room=self.room_b1, code='PR1', name='Máy in', status=Equipment.STATUS_BROKEN)]
+        )
+        self.assertEqual(self.stats(self.a1)['ready'], 5)
+        self.assertConsistent()
+
+        MaintenanceRequest.objects.create(equipment=Equipment.objects.get(code='PC0'), description='Hỏng')
+        Equipment.objects.filter(code__in=['PC0', 'PC1']).update(status=Equipment.STATUS_BROKEN)
+        Equipment.objects.filter(code='PC0').update(room=self.room_b1)
+        self.assertEqual(self.stats(self.b1), {'ready': 0, 'maint': 0, 'broken': 2, 'open_requests': 1,
+                                               'rooms': 1, 'occupied_rooms': 0})
+        self.assertConsistent()
+
+        # queryset updates of rooms and requests bypass save() and the signals too
+        Room.objects.filter(pk__in=[self.room_a1.pk, self.room_b1.pk]).update(status=Room.ROOM_OCCUPIED)
+        self.assertEqual(self.stats(self.b1)['occupied_rooms'], 1)
+        MaintenanceRequest.objects.update(status=MaintenanceRequest.STATUS_DONE)
+        self.assertEqual(self.stats(self.b1)['open_requests'], 0)
+        MaintenanceRequest.objects.update(status=MaintenanceRequest.STATUS_PENDING,
+                                          equipment=Equipment.objects.get(code='PC2'))
+        self.assertEqual(self.stats(self.a1)['open_requests'], 1)
+        self.assertConsistent()
+
+        Room.objects.filter(pk=self.room_a1.pk).update(floor=self.b1)
+        self.assertEqual(self.stats(self.b1)['ready'], 3)
+        self.assertEqual(self.stats(self.a)['rooms'], 1)
+        self.assertEqual(Equipment.objects.get(code='PC2').location_path, 'B — Nhà B — Tầng 1 — A101')
+        # the equipment counts move to the other building (rebuild() drops empty rows)
+        counters = {c.key: c.as_dict() for c in EquipmentStatusCounter.objects.all() if c.total}
+        EquipmentStatusCounter.rebuild()
+        self.assertEqual(counters, {c.key: c.as_dict() for c in EquipmentStatusCounter.objects.all()})
+        self.assertConsistent()
+
+    def test_rooms_floors_and_bookings(self):
+        Equipment.objects.create(room=self.room_a1, code='PC1', name='Máy tính')
+        MaintenanceRequest.objects.create(equipment=Equipment.objects.get(), description='Hỏng')
+        self.room_a1.status = Room.ROOM_OCCUPIED
+        self.room_a1.save()
+        self.assertEqual(self.stats(self.a)['occupied_rooms'], 1)
+
+        # a room moves with its equipment and their requests
+        self.room_a1.floor = self.b1
+        self.room_a1.save()
+        self.assertEqual(self.stats(self.b1)['open_requests'], 1)
+        self.assertEqual(self.stats(self.b)['occupied_rooms'], 1)
+        self.assertConsistent()
+
+        # the reaper frees the room, then an approved booking running now occupies another
+        now = timezone.now()
+        RoomBooking.objects.create(room=self.room_a2, user=self.user, purpose='Họp', status=RoomBooking.STATUS_APPROVED,
+                                   start_time=now - timedelta(hours=1), end_time=now + timedelta(hours=1))
+        self.assertEqual(reconcile_room_status(now=now), (1, 1))
+        self.assertEqual(self.stats(self.a2)['occupied_rooms'], 1)
+        self.assertEqual(self.stats(self.b)['occupied_rooms'], 0)
+        self.assertConsistent()
+
+        self.a2.building = self.b
+        self.a2.name = 'Tầng hai'
+        self.a2.save()
+        self.b.name = 'Nhà B mới'
+        self.b.save()
+        self.assertEqual(FloorStats.objects.get(pk=self.a2.pk).label, 'Tầng hai')
+        self.assertEqual(self.stats(self.b)['rooms'], 3)
+        self.assertConsistent()
+
+        self.room_a2.refresh_from_db()
+        self.room_a2.delete()
+        self.b1.delete()
+        self.assertEqual(self.stats(self.b), dict.fromkeys(FloorStats.COUNTS, 0))
+        new = Floor.objects.create(building=self.a, number='3')
+        self.assertEqual(self.stats(new), dict.fromkeys(FloorStats.COUNTS, 0))
+        self.assertConsistent()
+        self.b.delete()
+        self.assertConsistent()
+
+    def test_apply_creates_missing_rows(self):
+        FloorStats.objects.all().delete()
+        BuildingStats.objects.all().delete()
+        Equipment.objects.create(room=self.room_a1, code='PC1', name='Máy tính')
+        self.assertEqual(self.stats(self.a)['ready'], 1)
+        FloorStats.apply(Counter({(self.b1.pk, 'ready'): -1}))
+        self.assertFalse(FloorStats.objects.filter(pk=self.b1.pk).exists())
+
+    def test_dashboard_reads_only_the_stats_tables(self):
+        Equipment.objects.create(room=self.room_a2, code='PC1', name='Máy tính', status=Equipment.STATUS_BROKEN)
+        self.client.force_login(self.user)
+        self.client.get(reverse('stats_dashboard'))
+        # session and user, then one query on the stats table
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('stats_dashboard'))
+        self.assertContains(response, reverse('stats_building', args=[self.a.pk]))
+        self.assertEqual(response.context['summary'].rooms, 3)
+        self.assertEqual(response.context['summary'].broken, 1)
+
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('stats_building', args=[self.a.pk]))
+        self.assertContains(response, 'Tầng kỹ thuật')
+        self.assertEqual([row.pk for row in response.context['rows']], [self.a1.pk, self.a2.pk])
+        self.assertEqual(self.client.get(reverse('stats_building', args=[0])).status_code, 404)
+
+    def test_rebuild_command(self):
+        FloorStats.objects.update(ready=42)
+        out = StringIO()
+        call_command('rebuild_stats', stdout=out)
+        self.assertIn('Rebuilt 3 floor and 2 building rows', out.getvalue())
+        self.assertEqual(self.stats(self.a)['ready'], 0)
@@ -0,0 +1,597 @@
+import csv
+import json
+import os
+import sqlite3
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core import hierarchy, versions, views
+from core.bookings import reconcile_room_status
+from core.forms import MaintenanceRequestForm
+from core.models import Building, Floor, Room, Equipment, MaintenanceRequest, RoomBooking
+
+
+class FloorRoomListingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('viewer', password='x')
+        building = Building.objects.create(code='A', name='Nhà A')
+        cls.floor = Floor.objects.create(building=building, number='1')
+
+    def _add_rooms(self, count):
+        now = timezone.now()
+        start = Room.objects.filter(floor=self.floor).count()
+        for i in range(start, start + count):
+            room = Room.objects.create(floor=self.floor, code=f'R{i}', status=Room.ROOM_OCCUPIED)
+            # one expired approved booking and one booking active right now
+            RoomBooking.objects.create(
+                room=room, user=self.user, purpose='old', status=RoomBooking.STATUS_APPROVED,
+                start_time=now - timedelta(hours=3), end_time=now - timedelta(hours=2),
+            )
+            if i % 2:
+                RoomBooking.objects.create(
+                    room=room, user=self.user, purpose='now', status=RoomBooking.STATUS_APPROVED,
+                    start_time=now - timedelta(hours=1), end_time=now + timedelta(hours=1),
+                )
+
+    def _count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_query_count_does_not_grow_with_rooms(self):
+        self.client.force_login(self.user)
+        for name in ('room_list', 'asset_floor_detail'):
+            url = reverse(name, args=[self.floor.pk])
+            self._add_rooms(2)
+            small, _ = self._count_queries(url)
+            self._add_rooms(20)
+            large, _ = self._count_queries(url)
+            self.assertEqual(small, large, name)
+
+    def test_annotates_rooms_without_writing(self):
+        self._add_rooms(2)
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('asset_floor_detail', args=[self.floor.pk]))
+
+        self.assertFalse([q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "core_')])
+        rooms = {r.code: r for r in response.context['rooms']}
+        self.assertFalse(rooms['R0'].is_booked_now)
+        self.assertIsNone(rooms['R0'].current_booking)
+        self.assertTrue(rooms['R1'].is_booked_now)
+        self.assertEqual(rooms['R1'].current_booking.purpose, 'now')
+
+    def test_booking_reaper_once(self):
+        self._add_rooms(2)
+        RoomBooking.objects.filter(purpose='old', room__code='R0').update(status=RoomBooking.STATUS_PENDING)
+        call_command('run_booking_reaper', '--once', '--batch-size', '1', stdout=StringIO())
+
+        statuses = dict(RoomBooking.objects.filter(purpose='old').values_list('room__code', 'status'))
+        self.assertEqual(statuses, {'R0': RoomBooking.STATUS_REJECTED, 'R1': RoomBooking.STATUS_COMPLETED})
+        rooms = dict(Room.objects.values_list('code', 'status'))
+        self.assertEqual(rooms, {'R0': Room.ROOM_READY, 'R1': Room.ROOM_OCCUPIED})
+
+    def test_reconciled_statuses_invalidate_cached_pages(self):
+        self._add_rooms(2)
+        stamps = [(versions.FLOOR, self.floor.pk), (versions.TREE, self.floor.building_id)]
+        before = versions.get_versions(*stamps)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(reconcile_room_status(), (1, 0))
+        after = versions.get_versions(*stamps)
+        self.assertFalse([stamp for stamp in stamps if before[stamp] == after[stamp]])
+
+
+class AvailableRoomsApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('booker', password='x')
+        cls.building = Building.objects.create(code='B', name='Nhà B')
+        other = Building.objects.create(code='C', name='Nhà C')
+        floor = Floor.objects.create(building=cls.building, number='2')
+        Room.objects.create(floor=Floor.objects.create(building=other, number='1'), code='OTHER')
+
+        cls.start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        cls.end = cls.start + timedelta(hours=2)
+        bookings = {
+            'FREE': None,
+            'APPROVED': (RoomBooking.STATUS_APPROVED, 1),
+            'PENDING': (RoomBooking.STATUS_PENDING, -1),
+            'REJECTED': (RoomBooking.STATUS_REJECTED, 0),
+            'ADJACENT': (RoomBooking.STATUS_APPROVED, 2),
+        }
+        for code, booking in bookings.items():
+            room = Room.objects.create(floor=floor, code=code)
+            if booking:
+                status, offset = booking
+                start = cls.start + timedelta(hours=offset)
+                RoomBooking.objects.create(
+                    room=room, user=cls.user, purpose=code, status=status,
+                    start_time=start, end_time=start + timedelta(hours=2),
+                )
+        Room.objects.create(floor=floor, code='MAINT', status=Room.ROOM_MAINTENANCE)
+
+    def test_lists_free_rooms_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('api_available_rooms'), {
+                'building': self.building.pk,
+                'start': self.start.isoformat(),
+                'end': self.end.isoformat(),
+            })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['code'] for r in response.json()], ['ADJACENT', 'FREE', 'REJECTED'])
+
+    def test_rejects_bad_parameters(self):
+        url = reverse('api_available_rooms')
+        window = {'start': self.start.isoformat(), 'end': self.end.isoformat()}
+        self.assertEqual(self.client.get(url, window).status_code, 400)
+        self.assertEqual(self.client.get(url, {'building': self.building.pk}).status_code, 400)
+        reversed_window = {'building': self.building.pk, 'start': window['end'], 'end': window['start']}
+        self.assertEqual(self.client.get(url, reversed_window).status_code, 400)
+
+
+class KeysetPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('tech', password='x')
+        building = Building.objects.create(code='A', name='Nhà A')
+        room = Room.objects.create(floor=Floor.objects.create(building=building, number='1'), code='101')
+        eq = Equipment.objects.create(room=room, code='PC1', name='Máy tính')
+        MaintenanceRequest.objects.bulk_create(
+            MaintenanceRequest(equipment=eq, created_by=cls.user, description=f'#{i}') for i in range(7)
+        )
+        # ties on created_at must be broken by id
+        base = timezone.now()
+        for i, pk in enumerate(MaintenanceRequest.objects.order_by('pk').values_list('pk', flat=True)):
+            MaintenanceRequest.objects.filter(pk=pk).update(created_at=base - timedelta(minutes=i // 2))
+
+    def _page(self, **params):
+        response = self.client.get(reverse('maintenance_list'), {'size': 3, **params})
+        page = response.context['page']
+        return [r.pk for r in page], page
+
+    def test_walks_all_pages_both_ways(self):
+        self.client.force_login(self.user)
+        expected = list(MaintenanceRequest.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+
+        seen, pages, params = [], [], {}
+        while True:
+            with CaptureQueriesContext(connection) as ctx:
+                ids, page = self._page(**params)
+            pages.append((ids, page, len(ctx.captured_queries)))
+            seen += ids
+            if not page.has_next:
+                break
+            params = {'after': page.next_cursor}
+        self.assertEqual(seen, expected)
+        self.assertEqual([len(ids) for ids, _, _ in pages], [3, 3, 1])
+        self.assertEqual(len({queries for _, _, queries in pages[1:]}), 1)
+
+        ids, page = self._page(before=pages[-1][1].prev_cursor)
+        self.assertEqual(ids, pages[1][0])
+        ids, page = self._page(before=page.prev_cursor)
+        self.assertEqual(ids, pages[0][0])
+        self.assertFalse(page.has_previous)
+
+    def test_cursor_page_seeks_the_index(self):
+        self.client.force_login(self.user)
+        _, page = self._page()
+        with CaptureQueriesContext(connection) as ctx:
+            self._page(after=page.next_cursor)
+        sql = next(q['sql'] for q in ctx.captured_queries if 'FROM "core_maintenancerequest"' in q['sql'])
+        self.assertNotIn('OFFSET', sql)
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('SEARCH core_maintenancerequest USING INDEX maint_created_idx (created_at<?)', plan)
+
+    def test_filters_and_size_cap(self):
+        self.client.force_login(self.user)
+        MaintenanceRequest.objects.filter(description='#0').update(status=MaintenanceRequest.STATUS_DONE)
+        ids, _ = self._page(status=MaintenanceRequest.STATUS_DONE)
+        self.assertEqual(len(ids), 1)
+        ids, page = self._page(size=10000, building=999)
+        self.assertEqual((ids, page.size), ([], 100))
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('tech', password='x')
+        cls.other = User.objects.create_user('other', password='x')
+        cls.admin = User.objects.create_superuser('admin', password='x')
+        building = Building.objects.create(code='A', name='Nhà A')
+        cls.room = Room.objects.create(floor=Floor.objects.create(building=building, number='1'), code='101')
+        eq = Equipment.objects.create(room=cls.room, code='PC1', name='Máy tính')
+        MaintenanceRequest.objects.bulk_create(
+            MaintenanceRequest(equipment=eq, created_by=cls.user, description=f'Hỏng, lần {i}') for i in range(5)
+        )
+        MaintenanceRequest.objects.filter(description='Hỏng, lần 0').update(status=MaintenanceRequest.STATUS_DONE)
+        start = timezone.now() + timedelta(days=1)
+        for hours, user in enumerate((cls.user, cls.other)):
+            RoomBooking.objects.create(room=cls.room, user=user, purpose='Họp', start_time=start + timedelta(hours=hours),
+                                       end_time=start + timedelta(hours=hours + 1))
+
+    def _get(self, name, **params):
+        response = self.client.get(reverse(name), params)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode('utf-8')
+
+    def test_csv_streams_without_model_instances(self):
+        self.client.force_login(self.user)
+        with mock.patch.object(MaintenanceRequest, '__init__', side_effect=AssertionError('instance built')):
+            response, body = self._get('maintenance_export')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment; filename="maintenance-', response['Content-Disposition'])
+        lines = body.lstrip('\ufeff').splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'status', 'created_at'])
+        self.assertEqual(len(lines), 6)
+        self.assertIn('"Hỏng, lần 4"', lines[1])
+
+    def test_csv_neutralizes_formulas(self):
+        self.client.force_login(self.user)
+        for text in ('=HYPERLINK("http://x")', '+1', '-1', '@SUM(A1)', '\tx', '\rx', 'Họp = 2'):
+            RoomBooking.objects.filter(user=self.user).update(purpose=text)
+            _, body = self._get('room_booking_export')
+            rows = list(csv.reader(StringIO(body.lstrip('\ufeff'))))
+            self.assertEqual(rows[1][-1], text if text == 'Họp = 2' else "'" + text)
+        # JSON Lines is not opened by spreadsheets and keeps the text as entered
+        _, body = self._get('room_booking_export', format='jsonl')
+        self.assertEqual(json.loads(body)['purpose'], 'Họp = 2')
+
+    def test_jsonl_with_filters(self):
+        self.client.force_login(self.user)
+        response, body = self._get('maintenance_export', format='jsonl', status=MaintenanceRequest.STATUS_DONE)
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual((rows[0]['description'], rows[0]['building'], rows[0]['created_by']),
+                         ('Hỏng, lần 0', 'A', 'tech'))
+        _, body = self._get('maintenance_export', format='jsonl', to=(timezone.localdate() - timedelta(days=1)).isoformat())
+        self.assertEqual(body, '')
+        self.assertEqual(self.client.get(reverse('maintenance_export'), {'format': 'xml'}).status_code, 400)
+
+    def test_bookings_scoped_to_user(self):
+        self.client.force_login(self.user)
+        _, body = self._get('room_booking_export', format='jsonl')
+        self.assertEqual([json.loads(line)['user'] for line in body.splitlines()], ['tech'])
+        self.client.force_login(self.admin)
+        _, body = self._get('room_booking_export', format='jsonl')
+        self.assertEqual(len(body.splitlines()), 2)
+
+
+class HierarchyApiCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.building = Building.objects.create(code='A', name='Nhà A')
+        cls.floor = Floor.objects.create(building=cls.building, number='1')
+        cls.room = Room.objects.create(floor=cls.floor, code='101')
+        cls.eq = Equipment.objects.create(room=cls.room, code='PC1', name='Máy tính')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_revisits_cost_no_queries(self):
+        for name, param, pk in (('api_floors', 'building', self.building.pk),
+                                ('api_rooms', 'floor', self.floor.pk),
+                                ('api_equipments', 'room', self.room.pk)):
+            url = reverse(name)
+            first = self.client.get(url, {param: pk})
+            self.assertEqual(first.status_code, 200)
+            self.assertEqual(len(first.json()), 1)
+            with self.assertNumQueries(0):
+                again = self.client.get(url, {param: pk})
+                not_modified = self.client.get(url, {param: pk}, HTTP_IF_NONE_MATCH=first['ETag'])
+            self.assertEqual(again.content, first.content)
+            self.assertEqual(not_modified.status_code, 304)
+
+    async def test_async_twins_under_asgi(self):
+        sync = await self.async_client.get(reverse('api_rooms'), {'floor': self.floor.pk})
+        response = await self.async_client.get(reverse('api_rooms_async'), {'floor': self.floor.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [{'id': self.room.pk, 'code': '101', 'name': ''}])
+        # same stamp, same ETag as the sync view
+        self.assertEqual(response['ETag'], sync['ETag'])
+        again = await self.async_client.get(reverse('api_rooms_async'), {'floor': self.floor.pk},
+                                            headers={'if-none-match': response['ETag']})
+        self.assertEqual(again.status_code, 304)
+        invalid = await self.async_client.get(reverse('api_floors_async'), {'building': 'x'})
+        self.assertEqual(invalid.status_code, 400)
+        response = await self.async_client.get(reverse('api_status_counts_async'), {'building': self.building.pk})
+        self.assertEqual(response.json()['ready'], 1)
+
+    def test_changes_bump_the_version(self):
+        url = reverse('api_equipments')
+        first = self.client.get(url, {'room': self.room.pk})
+
+        # stamps are bumped when the writing transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            self.eq.status = Equipment.STATUS_BROKEN
+            self.eq.save()
+        changed = self.client.get(url, {'room': self.room.pk}, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()[0]['status'], Equipment.STATUS_BROKEN)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Equipment.objects.filter(pk=self.eq.pk).update(status=Equipment.STATUS_READY)
+        bulk = self.client.get(url, {'room': self.room.pk}, HTTP_IF_NONE_MATCH=changed['ETag'])
+        self.assertEqual(bulk.json()[0]['status'], Equipment.STATUS_READY)
+
+        other = Room.objects.create(floor=self.floor, code='102')
+        moved = self.client.get(url, {'room': self.room.pk})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.eq.room = other
+            self.eq.save()
+        self.assertEqual(self.client.get(url, {'room': self.room.pk}, HTTP_IF_NONE_MATCH=moved['ETag']).json(), [])
+
+    def test_versions_change_after_commit(self):
+        before = versions.get_version(versions.ROOM, self.room.pk)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Equipment.objects.filter(pk=self.eq.pk).update(status=Equipment.STATUS_BROKEN)
+            # a reader inside the transaction window still sees the old stamp
+            self.assertEqual(versions.get_version(versions.ROOM, self.room.pk), before)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(versions.get_version(versions.ROOM, self.room.pk), before)
+
+
+class HierarchyTreeApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.a = Building.objects.create(code='A', name='Nhà A')
+        b = Building.objects.create(code='B', name='Nhà B')
+        for building in (cls.a, b):
+            for n in ('1', '2'):
+                floor = Floor.objects.create(building=building, number=n)
+                room = Room.objects.create(floor=floor, code=f'{building.code}{n}01')
+                Equipment.objects.create(room=room, code='PC1', name='Máy tính')
+                Equipment.objects.create(room=room, code='PC2', name='Máy in')
+
+    def setUp(self):
+        cache.clear()
+        views._building_tree_json.cache_clear()
+
+    def _decode(self, tree):
+        """Rebuild 'building/floor/room/equipment' paths from the columnar arrays."""
+        b, f, r, e = tree['buildings'], tree['floors'], tree['rooms'], tree['equipments']
+        paths = []
+        for i, code in enumerate(e['code']):
+            room = e['parent'][i]
+            floor = r['parent'][room]
+            building = f['parent'][floor]
+            paths.append(f"{b['code'][building]}/{f['number'][floor]}/{r['code'][room]}/{code}")
+        return sorted(paths)
+
+    def test_building_tree_in_four_queries_then_cached(self):
+        url = reverse('api_hierarchy')
+        with self.assertNumQueries(4):
+            response = self.client.get(url, {'building': self.a.pk})
+        self.assertEqual(self._decode(response.json()), [
+            'A/1/A101/PC1', 'A/1/A101/PC2', 'A/2/A201/PC1', 'A/2/A201/PC2',
+        ])
+        with self.assertNumQueries(0):
+            cached = self.client.get(url, {'building': self.a.pk})
+            not_modified = self.client.get(url, {'building': self.a.pk}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(not_modified.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Equipment.objects.filter(room__floor__building=self.a, code='PC2').update(status=Equipment.STATUS_BROKEN)
+        changed = self.client.get(url, {'building': self.a.pk}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()['equipments']['status'].count(Equipment.STATUS_BROKEN), 2)
+
+    def test_spooled_columns_and_orphans(self):
+        # tiny chunks and spools: every column goes through a temporary file in many pieces
+        with mock.patch.object(hierarchy, 'CHUNK_ROWS', 1), mock.patch.object(hierarchy, 'SPOOL_MAX_SIZE', 8):
+            tree = json.loads(''.join(hierarchy.hierarchy_chunks()))
+        self.assertEqual(len(self._decode(tree)), 8)
+
+        # rows whose parent is missing from the level above are left out
+        querysets = hierarchy._querysets(None)
+        querysets['floors'] = querysets['floors'].exclude(number='2')
+        with mock.patch.object(hierarchy, '_querysets', return_value=querysets):
+            tree = json.loads(''.join(hierarchy.hierarchy_chunks()))
+        self.assertEqual(self._decode(tree), ['A/1/A101/PC1', 'A/1/A101/PC2', 'B/1/B101/PC1', 'B/1/B101/PC2'])
+
+    def test_campus_tree_is_streamed(self):
+        response = self.client.get(reverse('api_hierarchy'))
+        self.assertTrue(response.streaming)
+        tree = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(len(self._decode(tree)), 8)
+        self.assertEqual(tree['floors']['parent'], [0, 0, 1, 1])
+
+
+class HierarchySnapshotTest(SimpleTestCase):
+    """The tree read against an on-disk WAL database, outside any test transaction."""
+    databases = {'default'}
+
+    def setUp(self):
+        previous = connections[DEFAULT_DB_ALIAS]
+        if previous.vendor != 'sqlite':
+            self.skipTest('SQLite locking')
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'db.sqlite3')
+        db = type(previous)({**previous.settings_dict, 'NAME': self.path})
+        connections[DEFAULT_DB_ALIAS] = db
+        self.addCleanup(setattr, connections._connections, DEFAULT_DB_ALIAS, previous)
+        self.addCleanup(db.close)
+        with db.schema_editor() as editor:
+            for model in (Building, Floor, Room, Equipment):
+                editor.create_model(model)
+        # bulk_create: the signal receivers write to tables this database lacks
+        [building] = Building.objects.bulk_create([Building(code='A', name='Nhà A')])
+        [floor] = Floor.objects.bulk_create([Floor(building=building, number='1')])
+        Room.objects.bulk_create([Room(floor=floor, code='101')])
+
+    def test_writers_are_not_blocked_during_the_read(self):
+        writer = sqlite3.connect(self.path, timeout=0)
+        self.addCleanup(writer.close)
+        read_level = hierarchy._read_level
+
+        def write_between_levels(queryset, *args, **kwargs):
+            if queryset.model is Room:
+                try:
+                    writer.execute("UPDATE core_room SET name = 'Phòng mới'")
+                    writer.commit()
+                except sqlite3.OperationalError as e:
+                    self.fail(f'the hierarchy read blocks writers: {e}')
+            return read_level(queryset, *args, **kwargs)
+
+        with mock.patch.object(hierarchy, '_read_level', write_between_levels):
+            tree = json.loads(''.join(hierarchy.hierarchy_chunks()))
+        # the rooms come from the snapshot taken before the write
+        self.assertEqual(tree['rooms']['name'], [''])
+        self.assertFalse(connection.connection.in_transaction)
+        self.assertEqual(Room.objects.get().name, 'Phòng mới')
+
+
+class AssetPageCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('viewer', password='x')
+        cls.admin = User.objects.create_superuser('boss', password='x')
+        cls.building = Building.objects.create(code='A', name='Nhà A')
+        cls.floor = Floor.objects.create(building=cls.building, number='1', name='Một')
+        cls.room = Room.objects.create(floor=cls.floor, code='101', name='Lab')
+        Equipment.objects.create(room=cls.room, code='PC1', name='Máy tính')
+        cls.urls = (
+            reverse('asset_hierarchy'),
+            reverse('asset_building_detail', args=[cls.building.pk]),
+            reverse('asset_room_detail', args=[cls.room.pk]),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def _get(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        # session and user lookups aside
+        return response, [q['sql'] for q in ctx.captured_queries if 'core_' in q['sql']]
+
+    def test_repeat_views_cost_no_queries(self):
+        for url in self.urls:
+            first, queries = self._get(url)
+            self.assertTrue(queries, url)
+            again, queries = self._get(url)
+            self.assertEqual(queries, [], url)
+            self.assertEqual(again.context['page_body'], first.context['page_body'])
+
+    def test_signals_invalidate(self):
+        for url in self.urls:
+            self._get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.building.name = 'Nhà B'
+            self.building.save()
+            Floor.objects.create(building=self.building, number='2', name='Hai')
+            Equipment.objects.create(room=self.room, code='PC2', name='Máy chiếu')
+
+        hierarchy, building, room = (self._get(url)[0].content.decode() for url in self.urls)
+        self.assertIn('Nhà B', hierarchy)
+        self.assertIn('Tầng Hai', building)
+        self.assertIn('Máy chiếu', room)
+        self.assertIn('Nhà B', room)
+
+        now = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            RoomBooking.objects.create(
+                room=self.room, user=self.user, purpose='now', status=RoomBooking.STATUS_APPROVED,
+                start_time=now - timedelta(hours=1), end_time=now + timedelta(hours=1),
+            )
+        self.assertContains(self.client.get(self.urls[2]), 'Đã được đặt đến')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Room.objects.filter(pk=self.room.pk).delete()
+        self.assertEqual(self.client.get(self.urls[2]).status_code, 404)
+
+    def test_cached_per_role(self):
+        edit = reverse('equipment_create', args=[self.room.pk])
+        self.assertNotContains(self.client.get(self.urls[2]), edit)
+        self.client.force_login(self.admin)
+        self.assertContains(self.client.get(self.urls[2]), edit)
+        self.client.force_login(self.user)
+        self.assertNotContains(self.client.get(self.urls[2]), edit)
+
+    def test_room_page_expires_when_the_booking_state_changes(self):
+        start = timezone.now() + timedelta(minutes=5)
+        RoomBooking.objects.create(
+            room=self.room, user=self.user, purpose='soon', status=RoomBooking.STATUS_PENDING,
+            start_time=start, end_time=start + timedelta(hours=1),
+        )
+        self.assertNotContains(self.client.get(self.urls[2]), 'Đã được đặt đến')
+        with mock.patch('django.utils.timezone.now', return_value=start + timedelta(minutes=1)):
+            self.assertContains(self.client.get(self.urls[2]), 'Đã được đặt đến')
+
+
+class MaintenanceFormEquipmentTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reporter', password='x')
+        building = Building.objects.create(code='A', name='Nhà A')
+        cls.rooms = [
+            Room.objects.create(floor=Floor.objects.create(building=building, number=str(n)), code=f'{n}01')
+            for n in range(1, 4)
+        ]
+
+    def _add_equipment(self, count):
+        start = Equipment.objects.count()
+        Equipment.objects.bulk_create(
+            Equipment(room=self.rooms[i % 3], code=f'PC{i:03d}', name=f'Máy tính {i}')
+            for i in range(start, start + count)
+        )
+
+    def _render_queries(self, **kwargs):
+        with CaptureQueriesContext(connection) as ctx:
+            html = MaintenanceRequestForm(**kwargs).as_p()
+        return len(ctx.captured_queries), html
+
+    def test_select_render_cost_is_bounded(self):
+        self._add_equipment(5)
+        small, html = self._render_queries()
+        self.assertIn('PC000 - Máy tính 0 (A / 1 / 101)', html)
+        self._add_equipment(50)
+        large, _ = self._render_queries()
+        self.assertEqual(small, large)
+
+        scoped, html = self._render_queries(room=self.rooms[1])
+        self.assertEqual(html.count('<option value="'), 55 // 3 + 1)
+
+    @override_settings(EQUIPMENT_SELECT_LIMIT=10)
+    def test_large_inventory_switches_to_search(self):
+        self._add_equipment(30)
+        queries, html = self._render_queries()
+        self.assertEqual(queries, 1)
+        self.assertIn('class="equipment-search"', html)
+        self.assertNotIn('<option', html)
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('maintenance_create'))
+        self.assertContains(response, 'data-lookup-url="/api/equipments/search/"')
+
+    def test_search_endpoint(self):
+        self._add_equipment(30)
+        url = reverse('api_equipment_search')
+        with self.assertNumQueries(1):
+            found = self.client.get(url, {'q': 'pc01'}).json()
+        self.assertEqual([e['label'][:5] for e in found], [f'PC01{i}' for i in range(10)])
+        found = self.client.get(url, {'q': 'máy tính 2', 'room': self.rooms[2].pk}).json()
+        self.assertEqual([e['label'][:5] for e in found], ['PC002', 'PC020', 'PC023', 'PC026', 'PC029'])
+        # more matches than the limit: the first ones by code, whatever order the index returns
+        Equipment.objects.filter(code='PC000').update(code='PC999')
+        found = self.client.get(url, {'q': 'PC'}).json()
+        self.assertEqual([e['label'][:5] for e in found], [f'PC{i:03d}' for i in range(1, 21)])
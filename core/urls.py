@@ -4,6 +4,9 @@ from django.views.generic.base import RedirectView
 
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
+    path('stats/', views.stats_dashboard, name='stats_dashboard'),
+    path('stats/building/<int:pk>/', views.stats_dashboard, name='stats_building'),
+    path('search/', views.search_page, name='search'),
 
     path('buildings/', RedirectView.as_view(pattern_name='asset_hierarchy', permanent=False), name='building_list'),
     
@@ -26,6 +29,7 @@ urlpatterns = [
     # CHỈ GIỮ LẠI 1 ĐƯỜNG DẪN DUY NHẤT
     path('maintenance/create/', views.maintenance_create, name='maintenance_create'),
     path('maintenance/', views.maintenance_list, name='maintenance_list'),
+    path('maintenance/export/', views.maintenance_export, name='maintenance_export'),
     path('maintenance/<int:pk>/update/', views.maintenance_update, name='maintenance_update'),
     
     # Đường dẫn mới cho tài sản - GIAO DIỆN MỚI
@@ -37,15 +41,26 @@ urlpatterns = [
     # API endpoints for dependent selects
     path('api/floors/', views.api_floors, name='api_floors'),
     path('api/rooms/', views.api_rooms, name='api_rooms'),
+    path('api/rooms/available/', views.api_available_rooms, name='api_available_rooms'),
     path('api/equipments/', views.api_equipments, name='api_equipments'),
+    path('api/equipments/search/', views.api_equipment_search, name='api_equipment_search'),
+    path('api/search/', views.api_search, name='api_search'),
+    path('api/hierarchy/', views.api_hierarchy, name='api_hierarchy'),
     path('api/status_counts/', views.api_status_counts, name='api_status_counts'),
+    path('api/async/floors/', views.api_floors_async, name='api_floors_async'),
+    path('api/async/rooms/', views.api_rooms_async, name='api_rooms_async'),
+    path('api/async/equipments/', views.api_equipments_async, name='api_equipments_async'),
+    path('api/async/status_counts/', views.api_status_counts_async, name='api_status_counts_async'),
+    path('api/events/', views.dashboard_events, name='dashboard_events'),
     path('register/', views.register, name='register'),
     path('users/', views.user_list, name='user_list'),
     path('users/<int:user_id>/assign/', views.assign_role, name='assign_role'),
 
     # Room Booking URLs
     path('room/<int:room_pk>/booking/create/', views.room_booking_create, name='room_booking_create'),
+    path('room/<int:room_pk>/booking/series/create/', views.room_booking_series_create, name='room_booking_series_create'),
     path('bookings/', views.room_booking_list, name='room_booking_list'),
+    path('bookings/export/', views.room_booking_export, name='room_booking_export'),
     path('bookings/<int:pk>/update/', views.room_booking_update, name='room_booking_update'),
     path('room/<int:pk>/update-status/', views.update_room_status, name='update_room_status'),
 ]
\ No newline at end of file
@@ -0,0 +1,76 @@
+"""Version stamps for the building → floor → room → equipment hierarchy.
+
+Each building, floor and room has an opaque version token stored in the Django
+cache, and each building has a second one covering its whole subtree. Signals
+(core.signals) replace the token whenever a child row is saved or deleted, so
+``(kind, pk, version)`` identifies the exact content of a child list and can be
+used as an ETag and as a cache key. The stamps live in the shared ``default``
+cache (settings.CACHES), so a write made by any process (web worker,
+management command) invalidates the pages of all of them; if a token is
+evicted a new one is minted, which only costs a cache miss.
+
+New tokens are written only once the writing transaction commits: a reader
+that ran before the commit cached the old rows under the old token, never
+under the new one.
+"""
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+BUILDING = 'building'
+# the list of buildings itself (pk TREE_ALL); not bumped by changes further down
+CAMPUS = 'campus'
+FLOOR = 'floor'
+ROOM = 'room'
+# bookings of a room (pk of the room)
+BOOKINGS = 'bookings'
+# whole subtree of a building (floors, rooms and equipment); TREE_ALL covers the campus
+TREE = 'tree'
+TREE_ALL = 'all'
+
+
+def _key(kind, pk):
+    return f'hierarchy-version:{kind}:{pk}'
+
+
+def get_version(kind, pk):
+    key = _key(kind, pk)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_version(kind, pk):
+    """Async :func:`get_version`, for views running on the event loop."""
+    key = _key(kind, pk)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, uuid.uuid4().hex, timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def get_versions(*stamps):
+    """``{(kind, pk): version}`` for several ``(kind, pk)`` stamps in one cache round trip."""
+    keys = {_key(kind, pk): (kind, pk) for kind, pk in stamps}
+    found = cache.get_many(keys)
+    versions = {keys[key]: version for key, version in found.items()}
+    for key in keys.keys() - found.keys():
+        versions[keys[key]] = get_version(*keys[key])
+    return versions
+
+
+def bump(kind, *pks):
+    """Give new version tokens to the given ``kind`` rows (``None`` pks are ignored)
+    after the current transaction commits, or at once outside of one."""
+    keys = [_key(kind, pk) for pk in set(pks) if pk is not None]
+    if keys:
+        transaction.on_commit(lambda: cache.set_many({key: uuid.uuid4().hex for key in keys}, timeout=None))
+
+
+def bump_tree(*building_ids):
+    """New tree versions for the given buildings and for the whole campus."""
+    bump(TREE, TREE_ALL, *building_ids)
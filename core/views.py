@@ -1,14 +1,36 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.template.loader import render_to_string
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.urls import reverse
 from .models import Building, Floor, Room, Equipment, MaintenanceRequest, RoomBooking  # THÊM RoomBooking
+from .models import BuildingStats, EquipmentStatusCounter, FloorStats
 from django.utils import timezone
 from .forms import BuildingForm, FloorForm, RoomForm, EquipmentForm, MaintenanceRequestForm, MaintenanceUpdateForm
 from .forms import RegistrationForm, RoomBookingForm, RoomStatusForm  # THÊM RoomBookingForm, RoomStatusForm
+from .forms import BookingSeriesForm
+from .forms import equipment_option_label
 from django.contrib.auth.models import Group, User
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import condition
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from functools import lru_cache
+import json
+from . import pages, search, versions
+from .hierarchy import hierarchy_chunks
+from asgiref.sync import sync_to_async
+from .events import broadcaster
 from django.contrib.auth.views import LoginView
+from django.utils.dateparse import parse_date, parse_datetime
+from .pagination import keyset_paginate
+from .exports import BOOKING_COLUMNS, FORMATS, MAINTENANCE_COLUMNS, export_rows
+from datetime import datetime, time, timedelta
+from django.db.models import Prefetch, Q
+from .bookings import ACTIVE_STATUSES, BookingConflict, active_bookings_at, admit_booking, available_rooms
+from .bookings import SeriesConflict, admit_series, expand_series
 
 
 class CustomLoginView(LoginView):
@@ -25,43 +47,21 @@ def is_admin(user):
     return user.is_superuser
 
 
-def _expire_old_bookings_for_room(room):
-    """Expire bookings whose end_time has passed and update room status accordingly.
+def _rooms_with_current_booking(rooms):
+    """Load ``rooms`` with ``is_booked_now``/``current_booking`` set, in two queries total.
 
-    - APPROVED bookings that finished become COMPLETED
-    - PENDING bookings that expired become REJECTED
-    - If no active (approved/pending) booking remains for the room, set room.status = ROOM_READY
-    This is a best-effort, synchronous cleanup run on page views. For production you should
-    run a periodic task instead.
+    Read-only: finished bookings are expired and Room.status reconciled by the
+    ``run_booking_reaper`` management command, so GET requests never write.
     """
-    now = timezone.now()
-    try:
-        expired_qs = RoomBooking.objects.filter(
-            room=room,
-            end_time__lt=now,
-            status__in=[RoomBooking.STATUS_APPROVED, RoomBooking.STATUS_PENDING]
-        )
-        for b in expired_qs:
-            # move approved -> completed, pending -> rejected
-            if b.status == RoomBooking.STATUS_APPROVED:
-                b.status = RoomBooking.STATUS_COMPLETED
-            else:
-                b.status = RoomBooking.STATUS_REJECTED
-            b.save()
-
-        # if there are no active bookings overlapping 'now', mark room ready
-        active_exists = RoomBooking.objects.filter(
-            room=room,
-            status__in=[RoomBooking.STATUS_APPROVED, RoomBooking.STATUS_PENDING],
-            start_time__lte=now,
-            end_time__gte=now
-        ).exists()
-        if not active_exists and room.status != Room.ROOM_READY:
-            room.status = Room.ROOM_READY
-            room.save()
-    except Exception:
-        # don't break page rendering on cleanup errors
-        pass
+    active = active_bookings_at(timezone.now())
+    rooms = list(rooms.prefetch_related(
+        Prefetch('bookings', queryset=active, to_attr='active_bookings')
+    ))
+    for r in rooms:
+        # newest booking first (RoomBooking.Meta.ordering), same as .first()
+        r.current_booking = r.active_bookings[0] if r.active_bookings else None
+        r.is_booked_now = r.current_booking is not None
+    return rooms
 
 
 def index(request):
@@ -70,26 +70,36 @@ def index(request):
 
 @login_required
 def dashboard(request):
-    total_assets = Equipment.objects.count()
-    assets_maint = Equipment.objects.filter(status=Equipment.STATUS_MAINT).count()
+    counter = EquipmentStatusCounter.for_building()
     pending_requests = MaintenanceRequest.objects.filter(status=MaintenanceRequest.STATUS_PENDING).count()
 
-    # Data for chart
-    status_counts = {
-        'ready': Equipment.objects.filter(status=Equipment.STATUS_READY).count(),
-        'maint': Equipment.objects.filter(status=Equipment.STATUS_MAINT).count(),
-        'broken': Equipment.objects.filter(status=Equipment.STATUS_BROKEN).count(),
-    }
-
     context = {
-        'total_assets': total_assets,
-        'assets_maint': assets_maint,
+        'total_assets': counter.total,
+        'assets_maint': counter.maint,
         'pending_requests': pending_requests,
-        'status_counts': status_counts,
+        # Data for chart
+        'status_counts': counter.as_dict(),
     }
     return render(request, 'core/dashboard.html', context)
 
 
+@login_required
+def stats_dashboard(request, pk=None):
+    """Thống kê vận hành: toàn trường theo tòa nhà, rồi từng tầng của một tòa nhà.
+
+    Reads only the materialized BuildingStats/FloorStats rows (one query per level).
+    """
+    if pk is not None:
+        summary = get_object_or_404(BuildingStats, pk=pk)
+        rows = FloorStats.objects.filter(building_id=pk)
+    else:
+        rows = list(BuildingStats.objects.all())
+        summary = BuildingStats(label='Toàn trường', **{
+            column: sum(getattr(row, column) for row in rows) for column in BuildingStats.COUNTS
+        })
+    return render(request, 'core/stats_dashboard.html', {'summary': summary, 'rows': rows, 'building_pk': pk})
+
+
 @login_required
 def building_list(request):
     buildings = Building.objects.all()
@@ -149,7 +159,9 @@ def maintenance_create(request):
 
     if equipment_param:
         try:
-            equipment = get_object_or_404(Equipment, pk=int(equipment_param))
+            equipment = get_object_or_404(
+                Equipment.objects.select_related('room__floor__building'), pk=int(equipment_param)
+            )
             current_room = equipment.room
             current_floor = current_room.floor
             current_building = current_floor.building
@@ -194,7 +206,7 @@ def maintenance_create(request):
     else:
         # Nếu đã có thiết bị chọn sẵn thì pre-fill form
         if equipment:
-            form = MaintenanceRequestForm(initial={'equipment': equipment})
+            form = MaintenanceRequestForm(initial={'equipment': equipment}, room=current_room)
         else:
             form = MaintenanceRequestForm()
 
@@ -209,38 +221,305 @@ def maintenance_create(request):
     })
 
 
+def _hierarchy_etag(kind, param):
+    """ETag function for a child-list API: the version stamp of the parent named by ``param``."""
+    def etag(request, *args, **kwargs):
+        pk = request.GET.get(param, '')
+        return f'{kind}-{pk}-{versions.get_version(kind, pk)}' if pk.isdigit() else None
+    return etag
+
+
+# child-list JSON bodies are kept for a day under their parent's version; any change gives a new key
+HIERARCHY_BODY_TIMEOUT = 24 * 3600
+
+
+def _hierarchy_children_rows(kind, pk):
+    if kind == versions.BUILDING:
+        return Floor.objects.filter(building_id=pk).order_by('number').values('id', 'number', 'name')
+    if kind == versions.FLOOR:
+        return Room.objects.filter(floor_id=pk).values('id', 'code', 'name')
+    return Equipment.objects.filter(room_id=pk).values('id', 'code', 'name', 'status')
+
+
+def _hierarchy_children_json(kind, pk, version):
+    """JSON body of a child list, shared by all workers through the cache."""
+    key = f'hierarchy-children:{kind}:{pk}:{version}'
+    body = cache.get(key)
+    if body is None:
+        body = json.dumps(list(_hierarchy_children_rows(kind, pk)), cls=DjangoJSONEncoder)
+        cache.set(key, body, HIERARCHY_BODY_TIMEOUT)
+    return body
+
+
+async def _ahierarchy_children_json(kind, pk, version):
+    """Async :func:`_hierarchy_children_json`, reading with the async ORM on a cache miss."""
+    key = f'hierarchy-children:{kind}:{pk}:{version}'
+    body = await cache.aget(key)
+    if body is None:
+        rows = _hierarchy_children_rows(kind, pk)
+        body = json.dumps([row async for row in rows.aiterator()], cls=DjangoJSONEncoder)
+        await cache.aset(key, body, HIERARCHY_BODY_TIMEOUT)
+    return body
+
+
+def _parent_id_error(request, param):
+    pk = request.GET.get(param)
+    if not pk:
+        return JsonResponse({'error': f'missing {param} id'}, status=400)
+    if not pk.isdigit():
+        return JsonResponse({'error': f'invalid {param} id'}, status=400)
+    return None
+
+
+def _child_list_response(body, etag=None):
+    response = HttpResponse(body, content_type='application/json')
+    if etag:
+        response['ETag'] = etag
+    # let browsers keep the body but revalidate it with If-None-Match every time
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _hierarchy_children(request, kind, param):
+    error = _parent_id_error(request, param)
+    if error:
+        return error
+    pk = request.GET[param]
+    return _child_list_response(_hierarchy_children_json(kind, int(pk), versions.get_version(kind, pk)))
+
+
+async def _ahierarchy_children(request, kind, param):
+    # @condition would look the stamp up with a blocking cache call on the event loop
+    error = _parent_id_error(request, param)
+    if error:
+        return error
+    pk = request.GET[param]
+    version = await versions.aget_version(kind, pk)
+    etag = quote_etag(f'{kind}-{pk}-{version}')
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+    return _child_list_response(await _ahierarchy_children_json(kind, int(pk), version), etag)
+
+
+@condition(etag_func=_hierarchy_etag(versions.BUILDING, 'building'))
 def api_floors(request):
-    building_id = request.GET.get('building')
-    if not building_id:
-        return JsonResponse({'error': 'missing building id'}, status=400)
-    floors = Floor.objects.filter(building_id=building_id).order_by('number').values('id', 'number', 'name')
-    return JsonResponse(list(floors), safe=False)
+    return _hierarchy_children(request, versions.BUILDING, 'building')
 
 
+@condition(etag_func=_hierarchy_etag(versions.FLOOR, 'floor'))
 def api_rooms(request):
-    floor_id = request.GET.get('floor')
-    if not floor_id:
-        return JsonResponse({'error': 'missing floor id'}, status=400)
-    rooms = Room.objects.filter(floor_id=floor_id).values('id', 'code', 'name')
-    return JsonResponse(list(rooms), safe=False)
+    return _hierarchy_children(request, versions.FLOOR, 'floor')
 
 
+@condition(etag_func=_hierarchy_etag(versions.ROOM, 'room'))
 def api_equipments(request):
-    room_id = request.GET.get('room')
-    if not room_id:
-        return JsonResponse({'error': 'missing room id'}, status=400)
-    equipments = Equipment.objects.filter(room_id=room_id).values('id', 'code', 'name', 'status')
-    return JsonResponse(list(equipments), safe=False)
+    return _hierarchy_children(request, versions.ROOM, 'room')
+
+
+# Async twins of the child-list and status-count APIs (/api/async/...), for ASGI
+# deployments whose database sits across a network: they wait on it without
+# holding a worker thread. The sync views stay the default routes: on SQLite
+# the requests are CPU-bound and they serve about three times more requests/s
+# (benchmarks.asgi), and under WSGI an async view costs an event loop per request.
+
+async def api_floors_async(request):
+    return await _ahierarchy_children(request, versions.BUILDING, 'building')
+
+
+async def api_rooms_async(request):
+    return await _ahierarchy_children(request, versions.FLOOR, 'floor')
+
+
+async def api_equipments_async(request):
+    return await _ahierarchy_children(request, versions.ROOM, 'room')
+
+
+# most suggestions returned by api_equipment_search
+EQUIPMENT_SEARCH_LIMIT = 20
+
+
+def _prefix_range(field, prefix):
+    # startswith as a range, so a plain b-tree index applies (LIKE may not use it)
+    return Q(**{f'{field}__gte': prefix, f'{field}__lt': prefix + '\U0010ffff'})
+
+
+def api_equipment_search(request):
+    """Equipment whose code or name starts with ``q``, for the maintenance form's search box.
+
+    Prefixes are matched as index range scans (``code >= q AND code < q + U+10FFFF``)
+    on equipment_code_idx / equipment_name_idx, as typed, upper-cased (codes) and
+    with a capital first letter (names); ``building`` or ``room`` narrow the search.
+    ``location`` is a prefix of the stored "building — floor — room" label
+    (equipment_location_idx), e.g. ``A — Nhà A — Tầng 1`` for one floor, and may be
+    used without ``q``.
+    """
+    q = request.GET.get('q', '').strip()
+    location = request.GET.get('location', '').strip()
+    if not q and not location:
+        return JsonResponse([], safe=False)
+    equipments = Equipment.objects.select_related('room__floor__building')
+    if q:
+        prefix = Q()
+        for variant in {q, q.upper(), q[:1].upper() + q[1:]}:
+            for field in ('code', 'name'):
+                prefix |= _prefix_range(field, variant)
+        equipments = equipments.filter(prefix)
+    if location:
+        equipments = equipments.filter(_prefix_range('location_path', location))
+    room_id = request.GET.get('room', '')
+    building_id = request.GET.get('building', '')
+    if room_id.isdigit():
+        equipments = equipments.filter(room_id=int(room_id))
+    elif building_id.isdigit():
+        equipments = equipments.filter(room__floor__building_id=int(building_id))
+    # ordered before the LIMIT, so the suggestions are the first matches by code, not any 20
+    found = equipments.order_by('code', 'pk')[:EQUIPMENT_SEARCH_LIMIT]
+    return JsonResponse([{'id': e.pk, 'label': equipment_option_label(e)} for e in found], safe=False)
+
+
+def _search_params(request):
+    """``(q, kind, limit)`` from the query string; ValueError for an unknown kind or bad limit."""
+    q = request.GET.get('q', '').strip()
+    kind = request.GET.get('kind', '') or None
+    if kind is not None and kind not in search.KINDS:
+        raise ValueError('invalid kind')
+    limit = request.GET.get('limit', '')
+    if limit and not limit.isdigit():
+        raise ValueError('invalid limit')
+    return q, kind, min(int(limit or search.SEARCH_LIMIT), search.SEARCH_MAX_LIMIT)
+
+
+@login_required
+def api_search(request):
+    """Ranked full-text hits over equipment, rooms and maintenance requests (core.search).
+
+    ``title``, ``snippet`` and ``location`` are escaped HTML with the matches in ``<mark>``.
+    """
+    try:
+        q, kind, limit = _search_params(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({'q': q, 'results': search.search(q, kind, limit, request.user)})
+
+
+@login_required
+def search_page(request):
+    """Tìm kiếm thiết bị, phòng và yêu cầu bảo trì"""
+    try:
+        q, kind, limit = _search_params(request)
+    except ValueError:
+        q, kind, limit = request.GET.get('q', '').strip(), None, search.SEARCH_LIMIT
+    results = search.search(q, kind, limit, request.user)
+    for hit in results:
+        hit['kind_label'] = search.KINDS[hit['kind']]
+    return render(request, 'core/search.html', {
+        'q': q, 'kind': kind, 'kinds': search.KINDS.items(), 'results': results,
+    })
+
+
+def _tree_etag(request, *args, **kwargs):
+    building = request.GET.get('building', '')
+    key = building if building.isdigit() else (versions.TREE_ALL if not building else None)
+    return f'tree-{key}-{versions.get_version(versions.TREE, key)}' if key else None
+
+
+@lru_cache(maxsize=128)
+def _building_tree_json(building_id, version):
+    return ''.join(hierarchy_chunks(building_id))
+
+
+@condition(etag_func=_tree_etag)
+def api_hierarchy(request):
+    """Whole building → floor → room → equipment tree in one compact columnar document.
+
+    ``?building=<id>`` bodies are cached per building tree version; the campus-wide
+    tree (no parameter) is streamed.
+    """
+    building_id = request.GET.get('building')
+    if building_id and not building_id.isdigit():
+        return JsonResponse({'error': 'invalid building id'}, status=400)
+    if building_id:
+        body = _building_tree_json(int(building_id), versions.get_version(versions.TREE, building_id))
+        response = HttpResponse(body, content_type='application/json')
+    else:
+        response = StreamingHttpResponse(hierarchy_chunks(), content_type='application/json')
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _parse_api_datetime(value):
+    """Parse an ISO 8601 query parameter; naive values are taken in the current time zone."""
+    try:
+        dt = parse_datetime(value or '')
+    except ValueError:
+        return None
+    if dt is not None and timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    return dt
+
+
+def api_available_rooms(request):
+    """Rooms of a building (or floor) free for the whole ``[start, end)`` window."""
+    building_id = request.GET.get('building')
+    floor_id = request.GET.get('floor')
+    if not building_id and not floor_id:
+        return JsonResponse({'error': 'missing building or floor id'}, status=400)
+    start = _parse_api_datetime(request.GET.get('start'))
+    end = _parse_api_datetime(request.GET.get('end'))
+    if start is None or end is None:
+        return JsonResponse({'error': 'missing or invalid start/end'}, status=400)
+    if start >= end:
+        return JsonResponse({'error': 'start must be before end'}, status=400)
+
+    rooms = available_rooms(start, end)
+    try:
+        if floor_id:
+            rooms = rooms.filter(floor_id=int(floor_id))
+        if building_id:
+            rooms = rooms.filter(floor__building_id=int(building_id))
+    except ValueError:
+        return JsonResponse({'error': 'invalid building or floor id'}, status=400)
+    rooms = rooms.order_by('floor__number', 'code').values('id', 'code', 'name', 'floor_id', 'floor__number')
+    return JsonResponse(list(rooms), safe=False)
 
 
 def api_status_counts(request):
-    """Return JSON counts of equipment statuses for the dashboard to poll."""
-    counts = {
-        'ready': Equipment.objects.filter(status=Equipment.STATUS_READY).count(),
-        'maint': Equipment.objects.filter(status=Equipment.STATUS_MAINT).count(),
-        'broken': Equipment.objects.filter(status=Equipment.STATUS_BROKEN).count(),
-    }
-    return JsonResponse(counts)
+    """Return JSON counts of equipment statuses for the dashboard to poll.
+
+    ``?building=<id>`` narrows the counts to one building.
+    """
+    building_id = request.GET.get('building')
+    if building_id and not building_id.isdigit():
+        return JsonResponse({'error': 'invalid building id'}, status=400)
+    counter = EquipmentStatusCounter.for_building(int(building_id) if building_id else None)
+    return JsonResponse(counter.as_dict())
+
+
+async def api_status_counts_async(request):
+    """Async :func:`api_status_counts`."""
+    building_id = request.GET.get('building')
+    if building_id and not building_id.isdigit():
+        return JsonResponse({'error': 'invalid building id'}, status=400)
+    counter = await EquipmentStatusCounter.afor_building(int(building_id) if building_id else None)
+    return JsonResponse(counter.as_dict())
+
+
+async def dashboard_events(request):
+    """Server-Sent Events stream of the equipment status counts, sent only on change.
+
+    Needs an ASGI server (see facility_mgmt/asgi.py); under WSGI the dashboard
+    keeps polling api_status_counts.
+    """
+    if not hasattr(request, 'scope'):
+        return JsonResponse({'error': 'event stream requires an ASGI server'}, status=503)
+    is_authenticated = await sync_to_async(lambda: request.user.is_authenticated)()
+    if not is_authenticated:
+        return JsonResponse({'error': 'authentication required'}, status=403)
+    response = StreamingHttpResponse(broadcaster.stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 @login_required
@@ -291,30 +570,9 @@ def floor_delete(request, pk):
 
 @login_required
 def room_list(request, floor_pk):
-    floor = get_object_or_404(Floor, pk=floor_pk)
-    rooms = list(floor.rooms.all())
+    floor = get_object_or_404(Floor.objects.select_related('building'), pk=floor_pk)
     # annotate rooms with active booking status (treat pending and approved as blocking)
-    now = timezone.now()
-    for r in rooms:
-        try:
-            # expire any bookings that already ended for this room
-            _expire_old_bookings_for_room(r)
-
-            active = RoomBooking.objects.filter(
-                room=r,
-                status__in=[RoomBooking.STATUS_APPROVED, RoomBooking.STATUS_PENDING],
-                start_time__lte=now,
-                end_time__gte=now
-            ).first()
-            if active:
-                r.is_booked_now = True
-                r.current_booking = active
-            else:
-                r.is_booked_now = False
-                r.current_booking = None
-        except Exception:
-            r.is_booked_now = False
-            r.current_booking = None
+    rooms = _rooms_with_current_booking(floor.rooms.all())
 
     return render(request, 'core/room_list.html', {'floor': floor, 'rooms': rooms})
 
@@ -404,10 +662,74 @@ def equipment_delete(request, pk):
     return render(request, 'core/equipment_confirm_delete.html', {'equipment': eq})
 
 
+def _parse_day(value):
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        return None
+
+
+def _filter_listing(queryset, params, statuses, building_field, date_field):
+    """Apply the status / building / date range (``from``, ``to``) filters of a listing page.
+
+    Returns the filtered queryset and the cleaned filter values for the form.
+    """
+    filters = {'status': '', 'building': '', 'from': '', 'to': ''}
+    status = params.get('status')
+    if status in dict(statuses):
+        queryset = queryset.filter(status=status)
+        filters['status'] = status
+    building = params.get('building', '')
+    if building.isdigit():
+        queryset = queryset.filter(**{building_field: int(building)})
+        filters['building'] = int(building)
+    # whole days in the current time zone, as plain range bounds so indexes still apply
+    date_from = _parse_day(params.get('from'))
+    date_to = _parse_day(params.get('to'))
+    if date_from:
+        queryset = queryset.filter(**{f'{date_field}__gte': timezone.make_aware(datetime.combine(date_from, time.min))})
+        filters['from'] = date_from.isoformat()
+    if date_to:
+        end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))
+        queryset = queryset.filter(**{f'{date_field}__lt': end})
+        filters['to'] = date_to.isoformat()
+    return queryset, filters
+
+
 @login_required
 def maintenance_list(request):
-    requests = MaintenanceRequest.objects.select_related('equipment__room__floor__building', 'created_by').all().order_by('-created_at')
-    return render(request, 'core/maintenance_list.html', {'requests': requests})
+    requests = MaintenanceRequest.objects.select_related('equipment', 'created_by')
+    requests, filters = _filter_listing(
+        requests, request.GET, MaintenanceRequest.STATUS_CHOICES,
+        'equipment__room__floor__building_id', 'created_at',
+    )
+    page = keyset_paginate(requests, request.GET)
+    return render(request, 'core/maintenance_list.html', {
+        'requests': page,
+        'page': page,
+        'filters': filters,
+        'status_choices': MaintenanceRequest.STATUS_CHOICES,
+        'buildings': Building.objects.order_by('code'),
+    })
+
+
+def _export_response(request, queryset, columns, name):
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in FORMATS:
+        return JsonResponse({'error': f"format must be one of: {', '.join(FORMATS)}"}, status=400)
+    response = StreamingHttpResponse(export_rows(queryset, columns, fmt), content_type=FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{name}-{timezone.localdate():%Y%m%d}.{fmt}"'
+    return response
+
+
+@login_required
+def maintenance_export(request):
+    """Stream the filtered maintenance list as CSV or JSON Lines (``?format=csv|jsonl``)."""
+    requests, _ = _filter_listing(
+        MaintenanceRequest.objects.all(), request.GET, MaintenanceRequest.STATUS_CHOICES,
+        'equipment__room__floor__building_id', 'created_at',
+    )
+    return _export_response(request, requests.order_by('-created_at', '-id'), MAINTENANCE_COLUMNS, 'maintenance')
 
 
 @login_required
@@ -485,46 +807,36 @@ def assign_role(request, user_id):
 @login_required
 def asset_hierarchy(request):
     """Hiển thị danh sách tòa nhà - giao diện người dùng cho tài sản"""
-    buildings = Building.objects.all()
-    return render(request, 'core/asset_buildings.html', {'buildings': buildings})
+    def build():
+        stamps = versions.get_versions((versions.CAMPUS, versions.TREE_ALL))
+        body = render_to_string('core/asset_buildings_body.html', {'buildings': Building.objects.all()}, request)
+        return '', body, stamps, None
+
+    _, body = pages.cached_page(request, 'buildings', versions.TREE_ALL, build)
+    return render(request, 'core/asset_buildings.html', {'page_body': body})
 
 
 @login_required
 def asset_building_detail(request, pk):
     """Hiển thị các tầng trong một tòa nhà"""
-    building = get_object_or_404(Building, pk=pk)
-    floors = building.floors.all().order_by('number')
-    return render(request, 'core/asset_floors.html', {'building': building, 'floors': floors})
+    def build():
+        # the building's own fields (CAMPUS) and its list of floors (BUILDING)
+        stamps = versions.get_versions((versions.CAMPUS, versions.TREE_ALL), (versions.BUILDING, pk))
+        building = get_object_or_404(Building, pk=pk)
+        floors = building.floors.all().order_by('number')
+        body = render_to_string('core/asset_floors_body.html', {'building': building, 'floors': floors}, request)
+        return building.name, body, stamps, None
+
+    title, body = pages.cached_page(request, 'building', pk, build)
+    return render(request, 'core/asset_floors.html', {'page_title': title, 'page_body': body})
 
 
 @login_required
 def asset_floor_detail(request, pk):
     """Hiển thị các phòng trong một tầng"""
-    floor = get_object_or_404(Floor, pk=pk)
-    rooms = floor.rooms.all()
-    rooms = list(floor.rooms.all())
-    # mark rooms that have an approved booking active now
-    now = timezone.now()
-    for r in rooms:
-        try:
-            # expire any bookings that already ended for this room
-            _expire_old_bookings_for_room(r)
-
-            active = RoomBooking.objects.filter(
-                room=r,
-                status__in=[RoomBooking.STATUS_APPROVED, RoomBooking.STATUS_PENDING],
-                start_time__lte=now,
-                end_time__gte=now
-            ).first()
-            if active:
-                r.is_booked_now = True
-                r.current_booking = active
-            else:
-                r.is_booked_now = False
-                r.current_booking = None
-        except Exception:
-            r.is_booked_now = False
-            r.current_booking = None
+    floor = get_object_or_404(Floor.objects.select_related('building'), pk=pk)
+    # mark rooms that have a booking active now
+    rooms = _rooms_with_current_booking(floor.rooms.all())
 
     return render(request, 'core/asset_rooms.html', {'floor': floor, 'rooms': rooms})
 
@@ -532,27 +844,35 @@ def asset_floor_detail(request, pk):
 @login_required
 def asset_room_detail(request, pk):
     """Hiển thị các thiết bị trong một phòng"""
-    room = get_object_or_404(Room, pk=pk)
-    equipments = room.equipments.all()
-    # determine if room has an active approved booking now
-    now = timezone.now()
-    # expire any bookings that already ended for this room
-    _expire_old_bookings_for_room(room)
-
-    active = RoomBooking.objects.filter(
-        room=room,
-        status__in=[RoomBooking.STATUS_APPROVED, RoomBooking.STATUS_PENDING],
-        start_time__lte=now,
-        end_time__gte=now
-    ).first()
-    if active:
-        room.is_booked_now = True
+    def build():
+        ids = Room.objects.filter(pk=pk).values_list('floor_id', 'floor__building_id').first()
+        if ids is None:
+            raise Http404('No Room matches the given query.')
+        floor_id, building_id = ids
+        # equipment and bookings of the room, the room itself (FLOOR), the floor
+        # (BUILDING) and the building (CAMPUS)
+        stamps = versions.get_versions(
+            (versions.ROOM, pk), (versions.BOOKINGS, pk), (versions.FLOOR, floor_id),
+            (versions.BUILDING, building_id), (versions.CAMPUS, versions.TREE_ALL),
+        )
+        room = get_object_or_404(Room.objects.select_related('floor__building'), pk=pk)
+        equipments = room.equipments.all()
+        # determine if room has an active booking now
+        now = timezone.now()
+        active = active_bookings_at(now).filter(room=room).first()
+        room.is_booked_now = active is not None
         room.current_booking = active
-    else:
-        room.is_booked_now = False
-        room.current_booking = None
+        # the booking shown changes when it ends or the next one starts, signal or not
+        next_start = RoomBooking.objects.filter(
+            room=room, status__in=ACTIVE_STATUSES, start_time__gt=now,
+        ).order_by('start_time').values_list('start_time', flat=True).first()
+        changes = [t for t in (active and active.end_time, next_start) if t]
+        expires = min(changes) if changes else None
+        body = render_to_string('core/asset_equipment_body.html', {'room': room, 'equipments': equipments}, request)
+        return room.name, body, stamps, expires
 
-    return render(request, 'core/asset_equipment.html', {'room': room, 'equipments': equipments})
+    title, body = pages.cached_page(request, 'room', pk, build)
+    return render(request, 'core/asset_equipment.html', {'page_title': title, 'page_body': body})
 
 
 @login_required
@@ -566,18 +886,12 @@ def room_booking_create(request, room_pk):
             booking.room = room
             booking.user = request.user
             
-            # Kiểm tra xung đột lịch
-            conflicting_bookings = RoomBooking.objects.filter(
-                room=room,
-                status__in=[RoomBooking.STATUS_PENDING, RoomBooking.STATUS_APPROVED],
-                start_time__lt=booking.end_time,
-                end_time__gt=booking.start_time
-            )
-            
-            if conflicting_bookings.exists():
+            # Kiểm tra xung đột lịch và lưu trong cùng một giao dịch
+            try:
+                admit_booking(booking)
+            except BookingConflict:
                 messages.error(request, 'Phòng đã được đặt trong khoảng thời gian này!')
             else:
-                booking.save()
                 messages.success(request, 'Đã gửi yêu cầu đặt phòng!')
                 return redirect('room_booking_list')
     else:
@@ -589,6 +903,45 @@ def room_booking_create(request, room_pk):
     })
 
 
+@login_required
+def room_booking_series_create(request, room_pk):
+    """Đặt phòng định kỳ: mọi buổi được kiểm tra trùng lịch cùng lúc và lưu một lần."""
+    room = get_object_or_404(Room, pk=room_pk)
+    conflicts, created = [], None
+
+    if request.method == 'POST':
+        form = BookingSeriesForm(request.POST)
+        if form.is_valid():
+            series = form.save(commit=False)
+            series.room = room
+            series.user = request.user
+            occurrences = expand_series(
+                series.start_time, series.end_time, series.frequency, series.until, series.count,
+            )
+            try:
+                bookings, conflicts = admit_series(series, occurrences, form.cleaned_data['skip_conflicts'])
+            except SeriesConflict as e:
+                conflicts = e.conflicts
+                messages.error(request, f'{len(conflicts)}/{len(occurrences)} buổi bị trùng lịch, chưa đặt buổi nào.')
+            else:
+                broadcaster.notify()
+                created = len(bookings)
+                messages.success(request, f'Đã gửi {created} yêu cầu đặt phòng!')
+                if not conflicts:
+                    return redirect('room_booking_list')
+                # stay on the form to show which occurrences were skipped
+                form = BookingSeriesForm()
+    else:
+        form = BookingSeriesForm()
+
+    return render(request, 'core/booking_series_form.html', {
+        'form': form,
+        'room': room,
+        'conflicts': conflicts,
+        'created': created,
+    })
+
+
 @login_required
 def room_booking_list(request):
     if request.user.is_superuser:
@@ -597,12 +950,32 @@ def room_booking_list(request):
     else:
         # User chỉ xem booking của mình
         bookings = RoomBooking.objects.filter(user=request.user).select_related('room', 'user')
-    
+    bookings, filters = _filter_listing(
+        bookings, request.GET, RoomBooking.STATUS_CHOICES, 'room__floor__building_id', 'start_time',
+    )
+    page = keyset_paginate(bookings, request.GET)
+
     return render(request, 'core/room_booking_list.html', {
-        'bookings': bookings
+        'bookings': page,
+        'page': page,
+        'filters': filters,
+        'status_choices': RoomBooking.STATUS_CHOICES,
+        'buildings': Building.objects.order_by('code'),
     })
 
 
+@login_required
+def room_booking_export(request):
+    """Stream the filtered booking list as CSV or JSON Lines; users only get their own bookings."""
+    bookings = RoomBooking.objects.all()
+    if not request.user.is_superuser:
+        bookings = bookings.filter(user=request.user)
+    bookings, _ = _filter_listing(
+        bookings, request.GET, RoomBooking.STATUS_CHOICES, 'room__floor__building_id', 'start_time',
+    )
+    return _export_response(request, bookings.order_by('-created_at', '-id'), BOOKING_COLUMNS, 'bookings')
+
+
 @login_required
 @user_passes_test(is_admin)
 def room_booking_update(request, pk):
@@ -612,7 +985,11 @@ def room_booking_update(request, pk):
         new_status = request.POST.get('status')
         if new_status in [choice[0] for choice in RoomBooking.STATUS_CHOICES]:
             booking.status = new_status
-            booking.save()
+            try:
+                admit_booking(booking)
+            except BookingConflict:
+                messages.error(request, 'Phòng đã được đặt trong khoảng thời gian này!')
+                return redirect('room_booking_list')
             
             # Cập nhật trạng thái phòng nếu cần
             if new_status == RoomBooking.STATUS_APPROVED:
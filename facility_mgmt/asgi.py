@@ -1,3 +1,9 @@
+"""ASGI entry point.
+
+Serve the project through an ASGI server (e.g. ``uvicorn facility_mgmt.asgi:application``)
+to enable the dashboard's Server-Sent Events stream at /api/events/; WSGI deployments
+fall back to polling /api/status_counts/.
+"""
 import os
 from django.core.asgi import get_asgi_application
 
@@ -21,6 +21,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # first, so its timings cover the rest of the stack
+    'core.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -50,13 +52,75 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'facility_mgmt.wsgi.application'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Database profile, picked with DB_ENGINE: 'sqlite' (default) or 'postgresql'.
+if os.environ.get('DB_ENGINE', 'sqlite') == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'facility_mgmt'),
+            'USER': os.environ.get('POSTGRES_USER', 'postgres'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'CONN_HEALTH_CHECKS': True,
+            # psycopg 3 connection pool (pip install "psycopg[binary,pool]"); the pool
+            # owns the connections, so they are not also kept per thread
+            'CONN_MAX_AGE': 0,
+            'OPTIONS': {'pool': {
+                'min_size': int(os.environ.get('POSTGRES_POOL_MIN', 2)),
+                'max_size': int(os.environ.get('POSTGRES_POOL_MAX', 10)),
+                'timeout': 10,
+            }},
+        }
     }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            # facility_mgmt.wsgi sets 600: its worker threads keep their connections
+            # (and their pragmas and page cache) across requests, a dropped one is
+            # detected before reuse. Under ASGI every request may run on a new
+            # thread, so persistent connections would pile up; close them instead.
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # take the write lock at BEGIN: a deferred read-then-write transaction that loses
+                # the lock upgrade fails at once with "database is locked", whatever busy_timeout says
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+    }
+
+# Applied to every new SQLite connection by core.db.configure_connection.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',  # readers no longer block the writer and vice versa
+    'synchronous': 'NORMAL',  # safe with WAL; fsync at checkpoints only
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,  # KiB (negative), i.e. 64 MiB page cache per connection
+    'temp_store': 'MEMORY',
 }
 
+# Hierarchy version stamps (core.versions) and the pages cached under them must be
+# shared by every web worker and by the management commands that write (reaper,
+# imports, seeding); the per-process LocMemCache would leave the others stale.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_DIR', BASE_DIR / '.cache'),
+            'OPTIONS': {'MAX_ENTRIES': 20000},
+        }
+    }
+
 AUTH_PASSWORD_VALIDATORS = []
 
 LANGUAGE_CODE = 'vi'
@@ -72,6 +136,17 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Above this many devices the maintenance form's equipment field becomes a
+# search-as-you-type box instead of a <select> listing every device.
+EQUIPMENT_SELECT_LIMIT = 200
+
+# /metrics (core.metrics) answers 404 unless enabled, then only to these client
+# addresses (REMOTE_ADDR, so list the proxy's if one sits in front) or to a
+# request carrying "Authorization: Bearer <METRICS_TOKEN>" when a token is set.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED') == '1'
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip.strip()]
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
 LOGIN_URL = '/accounts/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/accounts/login/'
@@ -0,0 +1,13 @@
+"""Settings for ``manage.py test``: the project settings with a private cache.
+
+The file cache under ``BASE_DIR`` (or Redis) is shared with a running dev
+server; bodies cached from the test database under version stamps keyed by pk
+could be served there, and the tests' ``cache.clear()`` would wipe it.
+"""
+from .settings import *  # noqa: F401,F403
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
@@ -1,9 +1,12 @@
 from django.contrib import admin
 from django.urls import path, include
+from core.metrics import metrics_view
 from core.views import CustomLoginView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    # Prometheus scrape target; off by default, see METRICS_* in settings
+    path('metrics', metrics_view, name='metrics'),
     # override the default login view so admin users go straight to /admin/
     path('accounts/login/', CustomLoginView.as_view(), name='login'),
     path('accounts/', include('django.contrib.auth.urls')),
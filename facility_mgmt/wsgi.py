@@ -2,5 +2,7 @@ import os
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'facility_mgmt.settings')
+# WSGI worker threads are long-lived: keep their SQLite connections open between requests
+os.environ.setdefault('DB_CONN_MAX_AGE', '600')
 
 application = get_wsgi_application()
@@ -4,7 +4,9 @@ import sys
 
 
 def main():
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'facility_mgmt.settings')
+    # the test suite gets its own cache instead of the one the dev server uses
+    settings = 'facility_mgmt.test_settings' if sys.argv[1:2] == ['test'] else 'facility_mgmt.settings'
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings)
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc: